@@ -0,0 +1,150 @@
+#  Copyright 2022 EBRAINS AISBL
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0.
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+#  This open source software code was developed in part or in whole in the
+#  Human Brain Project, funded from the European Union's Horizon 2020
+#  Framework Programme for Research and Innovation under
+#  Specific Grant Agreements No. 720270, No. 785907, and No. 945539
+#  (Human Brain Project SGA1, SGA2 and SGA3).
+#
+
+"""
+Shared helpers of the benchmark suites: argument handling, statistics and machine-readable (JSON) reports which can be
+compared against the report of a previous run (e.g. of another SDK version) to detect regressions.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+
+def sdk_version() -> str:
+    try:
+        from importlib.metadata import version, PackageNotFoundError
+        try:
+            return version("ebrains_kg_core")
+        except PackageNotFoundError:
+            return "unknown"
+    except ImportError:
+        return "unknown"
+
+
+def summarize(durations_in_s: List[float]) -> Dict[str, float]:
+    """ latency statistics (in ms) of the given measurements """
+    if not durations_in_s:
+        return {}
+    ordered = sorted(durations_in_s)
+
+    def percentile(p: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(round(p * (len(ordered) - 1))))] * 1000, 3)
+
+    return {"count": len(ordered), "mean_ms": round(statistics.mean(ordered) * 1000, 3), "p50_ms": percentile(0.5),
+            "p90_ms": percentile(0.9), "p99_ms": percentile(0.99), "max_ms": round(ordered[-1] * 1000, 3)}
+
+
+def measure(function: Callable[[], Any], repetitions: int, warmup: int = 1) -> List[float]:
+    for _ in range(warmup):
+        function()
+    durations = []
+    for _ in range(repetitions):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+class Report(object):
+
+    def __init__(self, suite: str, configuration: Dict[str, Any]):
+        self.suite = suite
+        self.configuration = configuration
+        self.results: Dict[str, Dict[str, Any]] = {}
+
+    def add(self, name: str, **metrics: Any) -> None:
+        self.results[name] = metrics
+        print(f"{name}: {', '.join(f'{k}={v}' for k, v in metrics.items())}", file=sys.stderr)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "suite": self.suite,
+            "sdk_version": sdk_version(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "configuration": self.configuration,
+            "results": self.results
+        }
+
+    def write(self, output: Optional[str]) -> None:
+        serialized = json.dumps(self.to_dict(), indent=2)
+        if output:
+            with open(output, "w") as f:
+                f.write(serialized)
+        else:
+            print(serialized)
+
+
+# Metrics for which a higher value is better - for all others (durations, allocations), lower is better
+HIGHER_IS_BETTER = ("per_second", "speedup", "saved")
+# Metrics describing the workload rather than the performance
+NOT_COMPARED = ("count", "items", "requests", "best_page_size")
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """ returns a description of all numeric metrics which got worse by more than the given tolerance (relative) """
+    regressions = []
+    for name, metrics in current["results"].items():
+        previous = baseline.get("results", {}).get(name)
+        if not previous:
+            continue
+        for metric, value in metrics.items():
+            old = previous.get(metric)
+            if metric in NOT_COMPARED or not isinstance(value, (int, float)) or not isinstance(old, (int, float)) or not old:
+                continue
+            change = (value - old) / abs(old)
+            if any(h in metric for h in HIGHER_IS_BETTER):
+                change = -change
+            if change > tolerance:
+                regressions.append(f"{name}.{metric}: {old} -> {value} ({change * 100:.1f}% worse)")
+    return regressions
+
+
+def argument_parser(description: str) -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--output", help="write the JSON report to this file (default: stdout)")
+    parser.add_argument("--baseline", help="a JSON report of a previous run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="relative deterioration which is reported as regression (default: 0.1)")
+    return parser
+
+
+def finish(report: Report, arguments: argparse.Namespace) -> None:
+    """ writes the report and - if a baseline is given - exits with a non-zero code if regressions were detected """
+    baseline = None
+    if arguments.baseline:
+        with open(arguments.baseline) as f:
+            baseline = json.load(f)
+    report.write(arguments.output)
+    if baseline:
+        regressions = compare(report.to_dict(), baseline, arguments.tolerance)
+        for r in regressions:
+            print(f"REGRESSION {r}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
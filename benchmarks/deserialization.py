@@ -0,0 +1,171 @@
+#  Copyright 2022 EBRAINS AISBL
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0.
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+#  This open source software code was developed in part or in whole in the
+#  Human Brain Project, funded from the European Union's Horizon 2020
+#  Framework Programme for Research and Innovation under
+#  Specific Grant Agreements No. 720270, No. 785907, and No. 945539
+#  (Human Brain Project SGA1, SGA2 and SGA3).
+#
+
+"""
+Micro-benchmarks of the deserialization in kg_core/response.py - the CPU hot path of the client. No network involved:
+synthetic response envelopes are encoded once and then decoded (codec) and wrapped into the response classes
+(representation) repeatedly. For every construct, the time and the peak allocations (tracemalloc) are reported.
+
+Alternative codecs and representations can be compared by registering them in CODECS / REPRESENTATIONS.
+
+Usage: python -m benchmarks.deserialization [--sizes 10 100 1000 10000] [--output report.json] [--baseline previous.json]
+"""
+
+from __future__ import annotations
+
+import json
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from benchmarks.common import Report, argument_parser, finish
+from kg_core.__communication import KGConfig, KGRequestWithResponseContext
+from kg_core.oauth import SimpleToken
+from kg_core.response import Instance, JsonLdDocument, ResultPage, Result, ResultsById, TypeInformation, SpaceInformation, UserWithRoles, translate_error
+
+ID_NAMESPACE = "https://kg.ebrains.eu/api/instances/"
+VOCAB = "https://openminds.ebrains.eu/vocab/"
+META = "https://core.kg.ebrains.eu/vocab/meta/"
+
+CODECS: Dict[str, Callable[[bytes], Any]] = {"json": json.loads}
+try:
+    import orjson  # type: ignore
+    CODECS["orjson"] = orjson.loads
+except ImportError:
+    pass
+try:
+    import ujson  # type: ignore
+    CODECS["ujson"] = ujson.loads
+except ImportError:
+    pass
+
+REPRESENTATIONS: Dict[str, Callable[..., Any]] = {"Instance": Instance, "JsonLdDocument": JsonLdDocument, "dict": dict}
+
+_CONFIG = KGConfig("http://localhost/v3-beta/", SimpleToken("benchmark"), None, ID_NAMESPACE, False)
+
+
+def synthetic_instance(index: int, width: int = 10, depth: int = 0) -> Dict[str, Any]:
+    instance_id = f"00000000-0000-4000-8000-{index:012x}"
+    document: Dict[str, Any] = {
+        "@id": f"{ID_NAMESPACE}{instance_id}",
+        "@type": [f"https://openminds.ebrains.eu/core/Dataset"],
+        f"{META}space": "dataset",
+        "http://schema.org/identifier": [f"{ID_NAMESPACE}{instance_id}", f"https://doi.org/10.25493/{index}"],
+        f"{VOCAB}author": [{"@id": f"{ID_NAMESPACE}00000000-0000-4000-8000-{a:012x}"} for a in range(3)]
+    }
+    for p in range(width):
+        document[f"{VOCAB}property{p}"] = f"value {p} of instance {index}"
+    nested = document
+    for d in range(depth):
+        child = {"@type": [f"{VOCAB}Embedded{d}"], f"{VOCAB}level": d, f"{VOCAB}label": f"level {d}"}
+        nested[f"{VOCAB}embedded"] = child
+        nested = child
+    return document
+
+
+def page_envelope(items: int, width: int = 10, depth: int = 0) -> Dict[str, Any]:
+    return {"data": [synthetic_instance(i, width, depth) for i in range(items)], "from": 0, "size": items, "total": items * 10, "durationInMs": 12, "startTime": 0, "message": None}
+
+
+def by_id_envelope(keys: int, width: int = 10) -> Dict[str, Any]:
+    data: Dict[str, Any] = {}
+    for i in range(keys):
+        instance = synthetic_instance(i, width)
+        data[instance["@id"][len(ID_NAMESPACE):]] = {"data": instance} if i % 10 else {"error": {"code": 404, "message": "Not found"}}
+    return {"data": data, "durationInMs": 12}
+
+
+def type_information_envelope(items: int) -> Dict[str, Any]:
+    return {"data": [{"http://schema.org/identifier": f"https://openminds.ebrains.eu/core/Type{i}", "http://schema.org/name": f"Type{i}", "http://schema.org/description": "A type",
+                      f"{META}occurrences": i} for i in range(items)], "from": 0, "size": items, "total": items}
+
+
+def _measure(function: Callable[[], Any], repetitions: int) -> Dict[str, Any]:
+    function()
+    durations = []
+    for _ in range(repetitions):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"min_ms": round(min(durations) * 1000, 4), "mean_ms": round(sum(durations) / len(durations) * 1000, 4), "peak_allocations_kb": round(peak / 1024, 1)}
+
+
+def _context(content: Any) -> KGRequestWithResponseContext:
+    return KGRequestWithResponseContext(content, None, None, 200, _CONFIG)
+
+
+def run(sizes: List[int], repetitions: int, codecs: List[str], representations: List[str]) -> Report:
+    report = Report("deserialization", {"sizes": sizes, "repetitions": repetitions, "codecs": codecs, "representations": representations})
+
+    def repetitions_for(items: int) -> int:
+        return max(3, min(repetitions, 20000 // max(items, 1)))
+
+    scenarios: Dict[str, Any] = {}
+    for size in sizes:
+        scenarios[f"page_{size}"] = (page_envelope(size), ResultPage, size)
+        scenarios[f"results_by_id_{size}"] = (by_id_envelope(size), ResultsById, size)
+    scenarios["wide_instance_1000_properties"] = ({"data": synthetic_instance(0, width=1000)}, Result, 1)
+    scenarios["deep_instance_50_levels"] = ({"data": synthetic_instance(0, depth=50)}, Result, 1)
+    scenarios["wide_page_100x200_properties"] = (page_envelope(100, width=200), ResultPage, 100)
+    scenarios["deep_page_100x20_levels"] = (page_envelope(100, depth=20), ResultPage, 100)
+
+    for name, (envelope, wrapper, items) in scenarios.items():
+        body = json.dumps(envelope).encode("utf-8")
+        for codec_name in codecs:
+            codec = CODECS[codec_name]
+            report.add(f"{name}.decode.{codec_name}", bytes=len(body), **_measure(lambda: codec(body), repetitions_for(items)))
+            decoded = codec(body)
+            for representation_name in representations:
+                representation = REPRESENTATIONS[representation_name]
+                report.add(f"{name}.{codec_name}.{representation_name}", **_measure(lambda: wrapper(_context(codec(body)), representation), repetitions_for(items)))
+                report.add(f"{name}.wrap_only.{codec_name}.{representation_name}", **_measure(lambda: wrapper(_context(decoded), representation), repetitions_for(items)))
+
+    # pydantic models
+    for size in sizes:
+        content = type_information_envelope(size)
+        report.add(f"type_information_page_{size}", **_measure(lambda: ResultPage(_context(content), TypeInformation), repetitions_for(size)))
+    spaces = {"data": [{"http://schema.org/identifier": f"space{i}", "http://schema.org/name": f"space{i}", f"{META}permissions": ["READ", "WRITE"]} for i in range(100)], "from": 0, "size": 100}
+    report.add("space_information_page_100", **_measure(lambda: ResultPage(_context(spaces), SpaceInformation), repetitions_for(100)))
+    roles = {"data": {"user": {"http://schema.org/name": "Someone", "http://schema.org/identifier": ["a", "b"]}, "userRoles": [f"role{i}" for i in range(200)], "clientRoles": []}}
+    report.add("user_with_roles", **_measure(lambda: Result(_context(roles), UserWithRoles), repetitions))
+
+    # error translation
+    structured_error = KGRequestWithResponseContext({"error": {"code": 404, "message": "Not found", "instanceId": "00000000-0000-4000-8000-000000000000"}}, None, None, 404, _CONFIG)
+    status_error = KGRequestWithResponseContext(None, None, None, 503, _CONFIG)
+    success = KGRequestWithResponseContext({"data": None}, None, None, 200, _CONFIG)
+    report.add("translate_error.structured", **_measure(lambda: translate_error(structured_error), repetitions))
+    report.add("translate_error.status_code", **_measure(lambda: translate_error(status_error), repetitions))
+    report.add("translate_error.success", **_measure(lambda: translate_error(success), repetitions))
+    return report
+
+
+if __name__ == "__main__":
+    parser = argument_parser("Deserialization micro-benchmarks of kg_core.response")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000], help="number of items per page / keys of ResultsById")
+    parser.add_argument("--repetitions", type=int, default=200, help="maximal repetitions per construct (reduced automatically for large envelopes)")
+    parser.add_argument("--codecs", nargs="+", default=list(CODECS.keys()), choices=list(CODECS.keys()))
+    parser.add_argument("--representations", nargs="+", default=list(REPRESENTATIONS.keys()), choices=list(REPRESENTATIONS.keys()))
+    args = parser.parse_args()
+    finish(run(args.sizes, args.repetitions, args.codecs, args.representations), args)
@@ -0,0 +1,104 @@
+#  Copyright 2022 EBRAINS AISBL
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0.
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+#  This open source software code was developed in part or in whole in the
+#  Human Brain Project, funded from the European Union's Horizon 2020
+#  Framework Programme for Research and Innovation under
+#  Specific Grant Agreements No. 720270, No. 785907, and No. 945539
+#  (Human Brain Project SGA1, SGA2 and SGA3).
+#
+
+"""
+Compares the conversion of absolute instance ids to UUIDs (and back) call by call (Client.uuid_from_absolute_id) with
+the batch conversion backed by the interning table (UUIDInterner) - for a column of references (e.g. a link property
+of a large query result) in which the same targets occur many times.
+
+Besides the time per identifier, the memory allocated by the converted column is reported: the per-call conversion
+creates a new UUID object for every reference whereas the interned one shares a single object per distinct id.
+
+Usage: python -m benchmarks.identifiers [--references 1000000] [--distinct 20000] [--output report.json] [--baseline previous.json]
+"""
+
+from __future__ import annotations
+
+import random
+import tracemalloc
+import uuid
+from typing import Any, Callable, List
+
+from benchmarks.common import Report, argument_parser, finish, measure, summarize
+from benchmarks.stand_in import ID_NAMESPACE, StandInKG
+from kg_core.identifiers import UUIDInterner
+from kg_core.kg import kg
+
+
+def column(references: int, distinct: int, seed: int = 42) -> List[str]:
+    r = random.Random(seed)
+    targets = [f"{ID_NAMESPACE}{uuid.UUID(int=r.getrandbits(128))}" for _ in range(distinct)]
+    return [targets[r.randrange(distinct)] for _ in range(references)]
+
+
+def _allocated_in_mb(function: Callable[[], Any]) -> float:
+    tracemalloc.start()
+    try:
+        result = function()
+        allocated = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del result
+    return round(allocated / (1024 * 1024), 2)
+
+
+def run(arguments: Any) -> Report:
+    ids = column(arguments.references, arguments.distinct)
+    with StandInKG() as stand_in:
+        client = kg(stand_in.host).with_token("stand-in").build()
+    per_call = lambda: [client.uuid_from_absolute_id(i) for i in ids]
+    uuids = per_call()
+    interner = UUIDInterner(ID_NAMESPACE, max_size=arguments.max_size)
+    if interner.to_uuids(ids) != uuids:
+        raise AssertionError("The batch conversion differs from the per-call conversion")
+    report = Report("identifiers", {"references": len(ids), "distinct": arguments.distinct, "max_size": arguments.max_size})
+
+    def add(name: str, durations: List[float], allocated_in_mb: float) -> None:
+        statistics = summarize(durations)
+        report.add(name, per_identifier_ns=round(statistics["p50_ms"] * 1e6 / len(ids), 1),
+                   identifiers_per_second=round(len(ids) / (statistics["p50_ms"] / 1000)), allocated_mb=allocated_in_mb, **statistics)
+
+    add("to_uuid_per_call", measure(per_call, arguments.repetitions), _allocated_in_mb(per_call))
+    # A fresh table for every repetition - the conversion includes parsing every distinct id once
+    cold = lambda: UUIDInterner(ID_NAMESPACE, max_size=arguments.max_size).to_uuids(ids)
+    add("to_uuids_batch_cold", measure(cold, arguments.repetitions), _allocated_in_mb(cold))
+    warm = lambda: interner.to_uuids(ids)
+    add("to_uuids_batch_warm", measure(warm, arguments.repetitions), _allocated_in_mb(warm))
+    add("to_absolute_id_per_call", measure(lambda: [f"{ID_NAMESPACE}{u}" for u in uuids], arguments.repetitions),
+        _allocated_in_mb(lambda: [f"{ID_NAMESPACE}{u}" for u in uuids]))
+    add("to_absolute_ids_batch_warm", measure(lambda: interner.to_absolute_ids(uuids), arguments.repetitions),
+        _allocated_in_mb(lambda: interner.to_absolute_ids(uuids)))
+    per_call_in_ms = report.results["to_uuid_per_call"]["p50_ms"]
+    report.add("comparison", speedup_cold=round(per_call_in_ms / report.results["to_uuids_batch_cold"]["p50_ms"], 1),
+               speedup_warm=round(per_call_in_ms / report.results["to_uuids_batch_warm"]["p50_ms"], 1),
+               memory_saved_mb=round(report.results["to_uuid_per_call"]["allocated_mb"] - report.results["to_uuids_batch_warm"]["allocated_mb"], 2),
+               interned=len(interner))
+    return report
+
+
+if __name__ == "__main__":
+    parser = argument_parser("Compares the per-call and the batch (interned) conversion between absolute ids and UUIDs")
+    parser.add_argument("--references", type=int, default=1000000)
+    parser.add_argument("--distinct", type=int, default=20000, help="the number of distinct ids among the references")
+    parser.add_argument("--max-size", type=int, default=500000, help="the size of a generation of the interning table")
+    parser.add_argument("--repetitions", type=int, default=5)
+    args = parser.parse_args()
+    finish(run(args), args)
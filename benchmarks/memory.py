@@ -0,0 +1,122 @@
+#  Copyright 2022 EBRAINS AISBL
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0.
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+#  This open source software code was developed in part or in whole in the
+#  Human Brain Project, funded from the European Union's Horizon 2020
+#  Framework Programme for Research and Innovation under
+#  Specific Grant Agreements No. 720270, No. 785907, and No. 945539
+#  (Human Brain Project SGA1, SGA2 and SGA3).
+#
+
+"""
+Memory consumption of a full traversal of a large result (1M items by default) with the different iteration modes:
+
+ - items(): the page iterator (keeps the current page including its raw content)
+ - stream(): the streaming generator (releases the raw content and the consumed items)
+ - stream(prefetch=n): the streaming generator loading the next n pages in the background
+
+The stand-in runs in a separate process and every mode is executed in a fresh process, so the reported peak of the
+resident memory (compared to the state right before the traversal) is not influenced by the server or the other modes.
+
+Usage: python -m benchmarks.memory [--items 1000000] [--output report.json] [--baseline previous.json]
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import resource
+import socket
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+from benchmarks.common import Report, argument_parser, finish
+from benchmarks.stand_in import DEFAULT_TYPES
+
+
+def _peak_rss_in_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes everywhere else
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _traverse(host: str, mode: str, page_size: int, prefetch: int, results: Any) -> None:
+    from kg_core.kg import kg
+    from kg_core.request import Pagination
+    client = kg(host).with_token("stand-in").build()
+    first_page = client.instances.list(DEFAULT_TYPES[0], pagination=Pagination(size=page_size, return_total_results=False))
+    baseline = _peak_rss_in_mb()
+    start = time.perf_counter()
+    iterator = first_page.items() if mode == "items" else first_page.stream(prefetch=prefetch)
+    count = 0
+    for _ in iterator:
+        count += 1
+    elapsed = time.perf_counter() - start
+    results.put({"items": count, "items_per_second": round(count / elapsed, 2), "duration_ms": round(elapsed * 1000, 3),
+                 "peak_rss_increase_mb": round(_peak_rss_in_mb() - baseline, 1)})
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+
+def _wait_for(port: int, timeout_in_s: float = 30) -> None:
+    deadline = time.time() + timeout_in_s
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(("localhost", port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise TimeoutError(f"The stand-in didn't start listening on port {port}")
+
+
+def run(items: int, page_size: int, prefetch: List[int], arguments: Any) -> Report:
+    report = Report("memory", {"items": items, "page_size": page_size, "prefetch": prefetch, "value_size": arguments.value_size,
+                               "properties_per_instance": arguments.properties_per_instance, "network_latency_in_ms": arguments.network_latency_in_ms})
+    port = _free_port()
+    stand_in = subprocess.Popen([sys.executable, "-m", "benchmarks.stand_in", "--port", str(port), "--instances-per-type", str(items),
+                                 "--value-size", str(arguments.value_size), "--properties-per-instance", str(arguments.properties_per_instance),
+                                 "--network-latency-in-ms", str(arguments.network_latency_in_ms)], stdout=subprocess.DEVNULL)
+    try:
+        _wait_for(port)
+        modes: Dict[str, int] = {"items": 0, "stream": 0}
+        modes.update({f"stream_prefetch_{p}": p for p in prefetch if p > 0})
+        context = multiprocessing.get_context("spawn")
+        for name, p in modes.items():
+            results = context.Queue()
+            process = context.Process(target=_traverse, args=(f"localhost:{port}", "items" if name == "items" else "stream", page_size, p, results))
+            process.start()
+            result = results.get()
+            process.join()
+            report.add(name, **result)
+    finally:
+        stand_in.terminate()
+        stand_in.wait()
+    return report
+
+
+if __name__ == "__main__":
+    parser = argument_parser("Memory consumption of the iteration over large results")
+    parser.add_argument("--items", type=int, default=1000000, help="the number of items to traverse")
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--prefetch", type=int, nargs="*", default=[1, 2], help="the prefetch depths of the streaming mode to be measured")
+    parser.add_argument("--network-latency-in-ms", type=float, default=0, help="simulated network latency of the stand-in")
+    parser.add_argument("--value-size", type=int, default=20, help="size of the property values of the stand-in")
+    parser.add_argument("--properties-per-instance", type=int, default=10, help="number of properties per instance of the stand-in")
+    args = parser.parse_args()
+    finish(run(args.items, args.page_size, args.prefetch, args), args)
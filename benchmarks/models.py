@@ -0,0 +1,101 @@
+#  Copyright 2022 EBRAINS AISBL
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0.
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+#  This open source software code was developed in part or in whole in the
+#  Human Brain Project, funded from the European Union's Horizon 2020
+#  Framework Programme for Research and Innovation under
+#  Specific Grant Agreements No. 720270, No. 785907, and No. 945539
+#  (Human Brain Project SGA1, SGA2 and SGA3).
+#
+
+"""
+Compares the decoding of responses into the generated, slotted models of kg_core/models.py with the current response
+classes: pages of instances built as Instance (a dict subclass copying the document and parsing the UUID eagerly)
+vs. NormalizedJsonLd (a record referencing the document) and the pydantic models (TypeInformation, UserWithRoles,
+Error) vs. their generated counterparts. No network involved - the synthetic envelopes of the deserialization suite
+are decoded once and wrapped repeatedly.
+
+Besides the time, the peak allocations (tracemalloc) and - for the instances - the time to additionally access the
+UUID of every item are reported, since the generated records only parse it on access.
+
+Usage: python -m benchmarks.models [--sizes 100 1000 10000] [--output report.json] [--baseline previous.json]
+"""
+
+from __future__ import annotations
+
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from benchmarks.common import Report, argument_parser, finish, measure
+from benchmarks.deserialization import ID_NAMESPACE, by_id_envelope, page_envelope, type_information_envelope
+from kg_core import models
+from kg_core.__communication import KGConfig, KGRequestWithResponseContext
+from kg_core.oauth import SimpleToken
+from kg_core.response import Instance, Result, ResultPage, ResultsById, TypeInformation, UserWithRoles, translate_error
+
+_CONFIG = KGConfig("http://localhost/v3-beta/", SimpleToken("benchmark"), None, ID_NAMESPACE, False)
+
+
+def _context(content: Any, status_code: int = 200) -> KGRequestWithResponseContext:
+    return KGRequestWithResponseContext(content, None, None, status_code, _CONFIG)
+
+
+def _compare(report: Report, name: str, current: Callable[[], Any], generated: Callable[[], Any], repetitions: int) -> None:
+    metrics: Dict[str, Any] = {}
+    for variant, function in (("current", current), ("generated", generated)):
+        metrics[f"{variant}_ms"] = round(min(measure(function, repetitions)) * 1000, 4)
+        tracemalloc.start()
+        function()
+        metrics[f"{variant}_peak_allocations_kb"] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+        tracemalloc.stop()
+    metrics["speedup"] = round(metrics["current_ms"] / metrics["generated_ms"], 2) if metrics["generated_ms"] else None
+    report.add(name, **metrics)
+
+
+def _all_uuids(page: ResultPage) -> List[Any]:
+    return [item.uuid for item in page.data or []]
+
+
+def run(sizes: List[int], repetitions: int) -> Report:
+    report = Report("models", {"sizes": sizes, "repetitions": repetitions})
+
+    def repetitions_for(items: int) -> int:
+        return max(3, min(repetitions, 20000 // max(items, 1)))
+
+    for size in sizes:
+        page = page_envelope(size)
+        _compare(report, f"instance_page_{size}", lambda: ResultPage(_context(page), Instance),
+                 lambda: ResultPage(_context(page), models.NormalizedJsonLd), repetitions_for(size))
+        _compare(report, f"instance_page_{size}_with_uuids", lambda: _all_uuids(ResultPage(_context(page), Instance)),
+                 lambda: _all_uuids(ResultPage(_context(page), models.NormalizedJsonLd)), repetitions_for(size))
+        by_id = by_id_envelope(size)
+        _compare(report, f"results_by_id_{size}", lambda: ResultsById(_context(by_id), Instance),
+                 lambda: ResultsById(_context(by_id), models.NormalizedJsonLd), repetitions_for(size))
+        types = type_information_envelope(size)
+        _compare(report, f"type_information_page_{size}", lambda: ResultPage(_context(types), TypeInformation),
+                 lambda: ResultPage(_context(types), models.TypeInformation), repetitions_for(size))
+
+    roles = {"data": {"user": {"http://schema.org/name": "Someone", "http://schema.org/identifier": ["a", "b"]}, "userRoles": [f"role{i}" for i in range(200)], "clientRoles": []}}
+    _compare(report, "user_with_roles", lambda: Result(_context(roles), UserWithRoles), lambda: Result(_context(roles), models.UserWithRoles), repetitions)
+    error = {"error": {"code": 404, "message": "Not found", "instanceId": "00000000-0000-4000-8000-000000000000"}}
+    _compare(report, "error", lambda: translate_error(_context(error, 404)), lambda: models.Error.from_json(error["error"]), repetitions)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argument_parser("Decoding into the generated models of kg_core.models compared with the current response classes")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000], help="number of items per page / keys of ResultsById")
+    parser.add_argument("--repetitions", type=int, default=200, help="maximal repetitions per construct (reduced automatically for large envelopes)")
+    args = parser.parse_args()
+    finish(run(args.sizes, args.repetitions), args)
@@ -0,0 +1,150 @@
+#  Copyright 2022 EBRAINS AISBL
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0.
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+#  This open source software code was developed in part or in whole in the
+#  Human Brain Project, funded from the European Union's Horizon 2020
+#  Framework Programme for Research and Innovation under
+#  Specific Grant Agreements No. 720270, No. 785907, and No. 945539
+#  (Human Brain Project SGA1, SGA2 and SGA3).
+#
+
+"""
+Verifies the local JsonLdNormalizer against the normalizedPayload endpoint of the stand-in (which normalizes with the
+reference JSON-LD processor pyld) for a corpus of documents covering the supported features - and compares the time
+per document of the local normalization with the round trip of Jsonld.normalize_payload.
+
+Every mismatch is reported (and makes the suite exit with a non-zero code). Requires pyld ("pip install pyld").
+
+Usage: python -m benchmarks.normalization [--documents 2000] [--network-latency-in-ms 5] [--output report.json] [--baseline previous.json]
+"""
+
+from __future__ import annotations
+
+import json
+import random
+import sys
+import time
+import uuid
+from typing import Any, Callable, Dict, List
+
+import requests
+
+from benchmarks.common import Report, argument_parser, finish
+from benchmarks.stand_in import StandInKG, ID_NAMESPACE, VOCAB
+from kg_core.jsonld import ContextCache, JsonLdNormalizer
+from kg_core.kg import kg
+
+CORE = "https://openminds.ebrains.eu/core/"
+REMOTE_CONTEXT = "https://stand-in.local/contexts/openminds.jsonld"
+CONTEXTS = {
+    REMOTE_CONTEXT: {"@context": {"@vocab": VOCAB, "core": CORE, "schema": "http://schema.org/", "xsd": "http://www.w3.org/2001/XMLSchema#",
+                                  "id": "@id", "type": "@type", "license": {"@type": "@id"}, "releaseDate": {"@type": "xsd:date"}}}
+}
+
+
+def _vocab(r: random.Random) -> Dict[str, Any]:
+    return {"@context": {"@vocab": VOCAB}, "@id": f"{ID_NAMESPACE}{uuid.UUID(int=r.getrandbits(128))}", "@type": f"{CORE}Person",
+            "givenName": f"name{r.randint(0, 1000)}", "familyName": None, "age": r.randint(1, 99), "active": r.random() > 0.5,
+            "affiliation": [{"memberOf": {"@id": f"{ID_NAMESPACE}{uuid.UUID(int=r.getrandbits(128))}"}}, {"memberOf": {"@id": f"{ID_NAMESPACE}{uuid.UUID(int=r.getrandbits(128))}"}}]}
+
+
+def _prefixes(r: random.Random) -> Dict[str, Any]:
+    return {"@context": {"om": VOCAB, "core": CORE, "schema": "http://schema.org/"}, "@type": ["core:Dataset", "schema:Dataset"],
+            "om:fullName": f"dataset {r.random()}", "schema:description": "x" * r.randint(0, 50), "om:keyword": [f"k{i}" for i in range(r.randint(0, 3))],
+            "http://example.org/plain": 1.5}
+
+
+def _coercion(r: random.Random) -> Dict[str, Any]:
+    return {"@context": {"@vocab": VOCAB, "xsd": "http://www.w3.org/2001/XMLSchema#", "license": {"@type": "@id"}, "kind": {"@type": "@vocab"},
+                         "releaseDate": {"@type": "xsd:date"}, "keywords": {"@container": "@list"}, "label": {"@language": "en"}, "id": "@id", "type": "@type"},
+            "id": f"{ID_NAMESPACE}{uuid.UUID(int=r.getrandbits(128))}", "type": f"{CORE}DatasetVersion", "license": "https://spdx.org/licenses/CC-BY-4.0",
+            "kind": "experimental", "releaseDate": f"2022-0{r.randint(1, 9)}-1{r.randint(0, 9)}", "keywords": ["b", "a", "c"][:r.randint(1, 3)],
+            "label": "hello", "labelless": {"@value": "bonjour", "@language": "FR"}, "empty": []}
+
+
+def _remote(r: random.Random) -> Dict[str, Any]:
+    return {"@context": [REMOTE_CONTEXT, {"extra": "http://example.org/extra"}], "type": "core:Model", "license": "https://spdx.org/licenses/MIT",
+            "releaseDate": "2021-01-01", "extra": r.randint(0, 10), "schema:name": "model"}
+
+
+def _scoped(r: random.Random) -> Dict[str, Any]:
+    return {"@context": {"@vocab": VOCAB, "@language": "de", "author": {"@context": {"@vocab": "http://schema.org/"}}, "untagged": {"@language": None}},
+            "@type": f"{CORE}Publication", "title": "Titel", "untagged": "raw", "author": {"name": f"author {r.randint(0, 100)}", "@type": "Person"},
+            "pages": {"@value": str(r.randint(1, 300)), "@type": "http://www.w3.org/2001/XMLSchema#integer"}}
+
+
+def _compact_iri_term(r: random.Random) -> Dict[str, Any]:
+    return {"@context": {"om": VOCAB, "core": CORE, "om:license": {"@type": "@id"}, "om:keywords": {"@container": "@list"}}, "@type": "core:Dataset",
+            "om:license": "https://spdx.org/licenses/CC-BY-4.0", "om:keywords": [f"k{i}" for i in range(r.randint(1, 3))]}
+
+
+def _type_scoped(r: random.Random) -> Dict[str, Any]:
+    return {"@context": {"@vocab": VOCAB, "Person": {"@id": f"{CORE}Person", "@context": {"name": "http://schema.org/name", "knows": {"@type": "@id"}}}},
+            "@type": "Person", "name": f"person {r.randint(0, 100)}", "knows": f"{ID_NAMESPACE}{uuid.UUID(int=r.getrandbits(128))}",
+            # Type scoped contexts don't propagate - "name" of the nested node is mapped by @vocab again
+            "affiliation": {"name": f"organization {r.randint(0, 100)}"}}
+
+
+TEMPLATES: Dict[str, Callable[[random.Random], Dict[str, Any]]] = {"vocab": _vocab, "prefixes": _prefixes, "coercion": _coercion, "remote_context": _remote, "scoped_context": _scoped,
+                                                                   "compact_iri_term": _compact_iri_term, "type_scoped_context": _type_scoped}
+
+
+def corpus(documents: int, seed: int = 42) -> List[Dict[str, Any]]:
+    r = random.Random(seed)
+    templates = list(TEMPLATES.values())
+    return [templates[i % len(templates)](r) for i in range(documents)]
+
+
+def run(arguments: Any) -> Report:
+    documents = corpus(arguments.documents)
+    with StandInKG(contexts=CONTEXTS, network_latency_in_ms=arguments.network_latency_in_ms) as stand_in:
+        endpoint = f"http://{stand_in.host}/v3-beta/jsonld/normalizedPayload"
+        headers = {"Authorization": "Bearer stand-in"}
+        reference = [requests.post(endpoint, json=d, headers=headers).json()["data"] for d in documents]
+        cache = ContextCache(document_loader=lambda url: CONTEXTS[url])
+        normalizer = JsonLdNormalizer(cache)
+        start = time.perf_counter()
+        local = list(normalizer.normalize_batch(documents))
+        local_in_s = time.perf_counter() - start
+        mismatches = 0
+        for index, (expected, actual) in enumerate(zip(reference, local)):
+            if expected != actual:
+                mismatches += 1
+                if mismatches <= 5:
+                    print(f"MISMATCH ({list(TEMPLATES)[index % len(TEMPLATES)]}):\n  server: {json.dumps(expected, sort_keys=True)}\n  local:  {json.dumps(actual, sort_keys=True)}", file=sys.stderr)
+        client = kg(stand_in.host).with_token("stand-in").build()
+        round_trips = documents[:min(len(documents), arguments.round_trips)]
+        start = time.perf_counter()
+        for d in round_trips:
+            client.jsonld.normalize_payload(d)
+        round_trip_in_s = time.perf_counter() - start
+    report = Report("normalization", {"documents": len(documents), "templates": list(TEMPLATES), "network_latency_in_ms": arguments.network_latency_in_ms})
+    report.add("verification", items=len(documents), mismatches=mismatches)
+    report.add("local", per_document_us=round(local_in_s / len(documents) * 1e6, 2), documents_per_second=round(len(documents) / local_in_s),
+               context_cache_hits=cache.hits, context_cache_misses=cache.misses)
+    report.add("normalize_payload", per_document_us=round(round_trip_in_s / len(round_trips) * 1e6, 2), documents_per_second=round(len(round_trips) / round_trip_in_s))
+    report.add("comparison", speedup=round((round_trip_in_s / len(round_trips)) / (local_in_s / len(documents)), 1))
+    if mismatches:
+        report.write(arguments.output)
+        sys.exit(1)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argument_parser("Verifies the local JSON-LD normalization against the stand-in and compares it with the normalizedPayload round trip")
+    parser.add_argument("--documents", type=int, default=2000)
+    parser.add_argument("--round-trips", type=int, default=500, help="the number of documents normalized by the stand-in for the timing")
+    parser.add_argument("--network-latency-in-ms", type=float, default=0)
+    args = parser.parse_args()
+    finish(run(args), args)
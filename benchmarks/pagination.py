@@ -0,0 +1,102 @@
+#  Copyright 2022 EBRAINS AISBL
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0.
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+#  This open source software code was developed in part or in whole in the
+#  Human Brain Project, funded from the European Union's Horizon 2020
+#  Framework Programme for Research and Innovation under
+#  Specific Grant Agreements No. 720270, No. 785907, and No. 945539
+#  (Human Brain Project SGA1, SGA2 and SGA3).
+#
+
+"""
+Server-side cost of the total count during a full iteration. The stand-in simulates the cost of the count with
+--count-latency-in-ms, the reported server_ms is the sum of the server-side durations of all page requests:
+
+ - count_every_page: every page is requested with "returnTotalResults" (a manual loop of list() calls)
+ - count_first_page: items() with the default pagination - only the first page is counted
+ - count_free: items() with Pagination(return_total_results=False) - the end is detected by an empty page
+ - count_free_background_total: as count_free but with the total requested once in the background (e.g. for a progress bar)
+
+Usage: python -m benchmarks.pagination [--output report.json] [--baseline previous.json]
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Any, Callable, Dict, Tuple
+
+from benchmarks.common import Report, argument_parser, finish
+from benchmarks.stand_in import StandInKG, DEFAULT_TYPES
+from kg_core.kg import Client, kg
+from kg_core.request import Pagination
+
+
+def _count_every_page(client: Client, target_type: str, page_size: int) -> Tuple[int, float]:
+    count = 0
+    server_ms = 0.0
+    start = 0
+    while True:
+        page = client.instances.list(target_type, pagination=Pagination(start=start, size=page_size))
+        server_ms += page.duration_in_ms or 0
+        count += len(page.data or [])
+        if not page.has_next_page():
+            return count, server_ms
+        start += page_size
+
+
+def _iterate(client: Client, target_type: str, page_size: int, return_total_results: bool, background_total: bool = False) -> Tuple[int, float]:
+    first_page = client.instances.list(target_type, pagination=Pagination(size=page_size, return_total_results=return_total_results))
+    total = first_page.total_in_background() if background_total else None
+    count = 0
+    server_ms = 0.0
+    for page in first_page.pages():
+        server_ms += page.duration_in_ms or 0
+        count += len(page.data or [])
+    if total:
+        total.result()
+    return count, server_ms
+
+
+def run(arguments: Any) -> Report:
+    report = Report("pagination", {"instances": arguments.instances, "page_size": arguments.page_size, "count_latency_in_ms": arguments.count_latency_in_ms,
+                                   "network_latency_in_ms": arguments.network_latency_in_ms})
+    scenarios: Dict[str, Callable[[Client, str, int], Tuple[int, float]]] = {
+        "count_every_page": _count_every_page,
+        "count_first_page": lambda c, t, s: _iterate(c, t, s, True),
+        "count_free": lambda c, t, s: _iterate(c, t, s, False),
+        "count_free_background_total": lambda c, t, s: _iterate(c, t, s, False, True)
+    }
+    with StandInKG(instances_per_type=arguments.instances, count_latency_in_ms=arguments.count_latency_in_ms, network_latency_in_ms=arguments.network_latency_in_ms) as stand_in:
+        client = kg(stand_in.host).with_token("stand-in").build()
+        reference_server_ms = None
+        for name, scenario in scenarios.items():
+            requests_before = stand_in.requests
+            start = time.perf_counter()
+            count, server_ms = scenario(client, DEFAULT_TYPES[0], arguments.page_size)
+            elapsed = time.perf_counter() - start
+            if reference_server_ms is None:
+                reference_server_ms = server_ms
+            report.add(name, items=count, requests=stand_in.requests - requests_before, items_per_second=round(count / elapsed, 2), duration_ms=round(elapsed * 1000, 3),
+                       server_ms=server_ms, server_ms_saved=round(reference_server_ms - server_ms, 3))
+    return report
+
+
+if __name__ == "__main__":
+    parser = argument_parser("Server-side savings of the count-free pagination")
+    parser.add_argument("--instances", type=int, default=20000, help="instances per type of the stand-in")
+    parser.add_argument("--page-size", type=int, default=500)
+    parser.add_argument("--count-latency-in-ms", type=float, default=50, help="simulated server-side cost of the total count")
+    parser.add_argument("--network-latency-in-ms", type=float, default=0, help="simulated network latency of the stand-in")
+    args = parser.parse_args()
+    finish(run(args), args)
@@ -0,0 +1,80 @@
+#  Copyright 2022 EBRAINS AISBL
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0.
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+#  This open source software code was developed in part or in whole in the
+#  Human Brain Project, funded from the European Union's Horizon 2020
+#  Framework Programme for Research and Innovation under
+#  Specific Grant Agreements No. 720270, No. 785907, and No. 945539
+#  (Human Brain Project SGA1, SGA2 and SGA3).
+#
+
+"""
+Response size and latency of a full listing of a type with the complete documents (Instances.list) compared with the
+field projection (Projections.list) of a growing number of fields - executed with test_query and as saved query.
+
+Usage: python -m benchmarks.projection [--instances 5000] [--properties 30] [--network-latency-in-ms 2] [--output report.json] [--baseline previous.json]
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Any, Callable, Tuple
+
+from benchmarks.common import Report, argument_parser, finish
+from benchmarks.stand_in import StandInKG, DEFAULT_TYPES, VOCAB
+from kg_core.kg import kg
+from kg_core.projection import Projections
+from kg_core.request import Pagination
+from kg_core.response import ResultPage
+
+
+def _iterate(first_page: Callable[[], ResultPage]) -> Tuple[int, int, float]:
+    start = time.perf_counter()
+    count = 0
+    size_in_bytes = 0
+    for page in first_page().pages():
+        statistics = page._original_response.statistics
+        size_in_bytes += statistics.size_in_bytes if statistics else 0
+        count += len(page.data or [])
+    return count, size_in_bytes, time.perf_counter() - start
+
+
+def run(arguments: Any) -> Report:
+    target_type = DEFAULT_TYPES[0]
+    report = Report("projection", {"instances": arguments.instances, "properties": arguments.properties, "page_size": arguments.page_size,
+                                   "network_latency_in_ms": arguments.network_latency_in_ms})
+    pagination = Pagination(size=arguments.page_size, return_total_results=False)
+    with StandInKG(instances_per_type=arguments.instances, properties_per_instance=arguments.properties, network_latency_in_ms=arguments.network_latency_in_ms) as stand_in:
+        client = kg(stand_in.host).with_token("stand-in").build()
+        count, full_size, full_in_s = _iterate(lambda: client.instances.list(target_type, pagination=pagination))
+        report.add("full_documents", items=count, size_kb=round(full_size / 1024, 1), duration_ms=round(full_in_s * 1000, 1))
+        for save_queries in (False, True):
+            projections = Projections(client, save_queries=save_queries)
+            for number_of_fields in arguments.fields:
+                fields = [f"{VOCAB}name"] + [f"{VOCAB}property{i}" for i in range(number_of_fields - 1)]
+                count, size, duration_in_s = _iterate(lambda: projections.list(target_type, fields, pagination=pagination))
+                report.add(f"{'saved' if save_queries else 'test'}_query_{number_of_fields}_fields", items=count, size_kb=round(size / 1024, 1),
+                           duration_ms=round(duration_in_s * 1000, 1), size_saved=round(1 - size / full_size, 3), speedup=round(full_in_s / duration_in_s, 2))
+    return report
+
+
+if __name__ == "__main__":
+    parser = argument_parser("Compares the listing of full documents with the field projection")
+    parser.add_argument("--instances", type=int, default=5000)
+    parser.add_argument("--properties", type=int, default=30, help="the number of properties per instance")
+    parser.add_argument("--page-size", type=int, default=500)
+    parser.add_argument("--fields", type=int, nargs="+", default=[1, 2, 5, 10])
+    parser.add_argument("--network-latency-in-ms", type=float, default=2)
+    args = parser.parse_args()
+    finish(run(args), args)
@@ -0,0 +1,102 @@
+#  Copyright 2022 EBRAINS AISBL
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0.
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+#  This open source software code was developed in part or in whole in the
+#  Human Brain Project, funded from the European Union's Horizon 2020
+#  Framework Programme for Research and Innovation under
+#  Specific Grant Agreements No. 720270, No. 785907, and No. 945539
+#  (Human Brain Project SGA1, SGA2 and SGA3).
+#
+
+"""
+Client-side overhead on recorded (e.g. production-shaped) data without any network involved: a workload (listing,
+bulk get and single reads of a type) is recorded once with the RecordingTransport - against the stand-in or, with
+--host and --token, against a real KG - and then replayed repeatedly with the ReplayTransport. Since the replay serves
+the responses at full speed, the measured time is spent in the client only.
+
+An existing recording can be reused with --recording (it is only created if the file doesn't exist yet).
+
+Usage: python -m benchmarks.replay [--host ... --token ...] [--recording exchanges.jsonl] [--output report.json] [--baseline previous.json]
+"""
+
+from __future__ import annotations
+
+import os
+import tempfile
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.common import Report, argument_parser, finish, measure, summarize
+from benchmarks.stand_in import StandInKG, DEFAULT_TYPES
+from kg_core.kg import Client, kg
+from kg_core.request import Pagination
+from kg_core.transport import RecordingTransport, ReplayTransport
+
+
+def workload(client: Client, target_type: str, page_size: int, items: int) -> Dict[str, Callable[[], Any]]:
+    """ the calls to be recorded and replayed - they have to be deterministic to be served from the recording """
+    ids: List[str] = [str(i.uuid) for i in client.instances.list(target_type, pagination=Pagination(size=min(items, 100), return_total_results=False)).data or []]
+
+    def iterate() -> int:
+        count = 0
+        for _ in client.instances.list(target_type, pagination=Pagination(size=page_size, return_total_results=False)).items():
+            count += 1
+            if count >= items:
+                break
+        return count
+
+    return {
+        "list_pages": iterate,
+        "get_by_ids": lambda: client.instances.get_by_ids(ids),
+        "get_by_id": lambda: [client.instances.get_by_id(i) for i in ids[:10]]
+    }
+
+
+def record(path: str, host: Optional[str], token: str, target_type: str, arguments: Any) -> None:
+    stand_in = None
+    if not host:
+        stand_in = StandInKG(instances_per_type=arguments.items).start()
+        host = stand_in.host
+    transport = RecordingTransport(path)
+    try:
+        for call in workload(kg(host).with_token(token).with_transport(transport).build(), target_type, arguments.page_size, arguments.items).values():
+            call()
+    finally:
+        transport.close()
+        if stand_in:
+            stand_in.stop()
+
+
+def run(host: Optional[str], token: str, target_type: str, arguments: Any) -> Report:
+    recording = arguments.recording or os.path.join(tempfile.mkdtemp(), "exchanges.jsonl")
+    if not os.path.exists(recording):
+        record(recording, host, token, target_type, arguments)
+    report = Report("replay", {"host": host or "stand-in", "target_type": target_type, "page_size": arguments.page_size, "items": arguments.items,
+                               "recording_bytes": os.path.getsize(recording)})
+    client = kg(host or "localhost").with_token(token).with_transport(ReplayTransport(recording, strict=True)).build()
+    for name, call in workload(client, target_type, arguments.page_size, arguments.items).items():
+        report.add(name, **summarize(measure(call, arguments.repetitions)))
+    return report
+
+
+if __name__ == "__main__":
+    parser = argument_parser("Client-side overhead of the KG core python SDK on replayed exchanges")
+    parser.add_argument("--host", help="record against this KG host instead of the local stand-in")
+    parser.add_argument("--token", default="stand-in", help="the token to be used for the recording")
+    parser.add_argument("--type", default=DEFAULT_TYPES[0], help="the type to be used for listing and reading instances")
+    parser.add_argument("--recording", help="the file of the recorded exchanges - recorded if it doesn't exist yet")
+    parser.add_argument("--page-size", type=int, default=500)
+    parser.add_argument("--items", type=int, default=5000, help="the number of items to be listed")
+    parser.add_argument("--repetitions", type=int, default=20)
+    args = parser.parse_args()
+    finish(run(args.host, args.token, args.type, args), args)
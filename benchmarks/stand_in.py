@@ -0,0 +1,523 @@
+#  Copyright 2022 EBRAINS AISBL
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0.
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+#  This open source software code was developed in part or in whole in the
+#  Human Brain Project, funded from the European Union's Horizon 2020
+#  Framework Programme for Research and Innovation under
+#  Specific Grant Agreements No. 720270, No. 785907, and No. 945539
+#  (Human Brain Project SGA1, SGA2 and SGA3).
+#
+
+"""
+A lightweight local stand-in for the v3-beta endpoints of the EBRAINS KG core used by kg_core/kg.py.
+
+The instances are synthetic and generated on the fly (which allows to simulate millions of instances without keeping
+them in memory) - their identifiers encode the index of their type and their position in the listing. Writes are kept
+in an in-memory overlay. Latency and payload sizes are configurable.
+
+Run it standalone with "python -m benchmarks.stand_in --port 8000" and connect with kg("localhost:8000").with_token("any").
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qs, urlparse
+
+ID_NAMESPACE = "https://kg.ebrains.eu/api/instances/"
+VOCAB = "https://openminds.ebrains.eu/vocab/"
+META = "https://core.kg.ebrains.eu/vocab/meta/"
+DEFAULT_TYPES = ["https://openminds.ebrains.eu/core/Person", "https://openminds.ebrains.eu/core/Dataset", "https://openminds.ebrains.eu/core/DatasetVersion"]
+DEFAULT_SPACES = ["common", "dataset", "controlled"]
+
+_UUID = "[0-9a-fA-F-]{36}"
+# Placeholder for null values during the normalization (JSON-LD processors drop them)
+_RESET_VALUE = "https://core.kg.ebrains.eu/vocab/resetValue"
+
+
+class StandInKG(object):
+
+    def __init__(self, port: int = 0, types: Optional[List[str]] = None, spaces: Optional[List[str]] = None, instances_per_type: int = 1000,
+                 properties_per_instance: int = 10, value_size: int = 20, latency_in_ms: float = 0, count_latency_in_ms: float = 0, network_latency_in_ms: float = 0,
+                 contexts: Optional[Dict[str, Any]] = None, max_page_size: Optional[int] = None):
+        self.types = types or DEFAULT_TYPES
+        self.spaces = spaces or DEFAULT_SPACES
+        self.instances_per_type = instances_per_type
+        self.properties_per_instance = properties_per_instance
+        self.value_size = value_size
+        self.latency_in_ms = latency_in_ms
+        self.count_latency_in_ms = count_latency_in_ms
+        self.network_latency_in_ms = network_latency_in_ms
+        # The JSON-LD documents (providing a "@context") which can be referenced as remote contexts by URL
+        self.contexts = contexts or {}
+        # Caps the size of the returned pages (as a KG deployment may do) - larger requested sizes are silently reduced
+        self.max_page_size = max_page_size
+        self.requests = 0
+        self._overlay: Dict[str, Dict[str, Any]] = {}
+        self._deleted: set = set()
+        self._queries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._server = _Server(("localhost", port), _handler(self))
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    @property
+    def host(self) -> str:
+        """ the host name to be passed to kg() """
+        return f"localhost:{self.port}"
+
+    def start(self) -> StandInKG:
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> StandInKG:
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.stop()
+
+    # ------------------------------------------------------------------ synthetic data
+
+    @staticmethod
+    def instance_id(type_index: int, index: int) -> str:
+        return f"{type_index:08x}-0000-4000-8000-{index:012x}"
+
+    def _coordinates(self, instance_id: str) -> Optional[Tuple[int, int]]:
+        try:
+            type_index = int(instance_id[0:8], 16)
+            index = int(instance_id[24:36], 16)
+        except ValueError:
+            return None
+        if instance_id[8:24] != "-0000-4000-8000-" or type_index >= len(self.types) or index >= self.instances_per_type:
+            return None
+        return type_index, index
+
+    def _generate(self, type_index: int, index: int) -> Dict[str, Any]:
+        instance_id = self.instance_id(type_index, index)
+        document: Dict[str, Any] = {
+            "@id": f"{ID_NAMESPACE}{instance_id}",
+            "@type": [self.types[type_index]],
+            f"{META}space": self.spaces[index % len(self.spaces)],
+            f"{META}revision": "_rev1",
+            "http://schema.org/identifier": [f"{ID_NAMESPACE}{instance_id}"],
+            f"{VOCAB}name": f"Instance {index} of {self.types[type_index]}"
+        }
+        value = ("x" * self.value_size)
+        for p in range(self.properties_per_instance):
+            document[f"{VOCAB}property{p}"] = value
+        if index > 0:
+            # Every instance links to its predecessor of the same type and to the instance with the same index of the next type
+            document[f"{VOCAB}previous"] = {"@id": f"{ID_NAMESPACE}{self.instance_id(type_index, index - 1)}"}
+        if len(self.types) > 1:
+            document[f"{VOCAB}related"] = [{"@id": f"{ID_NAMESPACE}{self.instance_id((type_index + 1) % len(self.types), index)}"}]
+        return document
+
+    def get_instance(self, instance_id: str, with_payload: bool = True, incoming_links_page_size: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        instance_id = instance_id.lower()
+        if instance_id in self._deleted:
+            return None
+        document = self._overlay.get(instance_id)
+        if document is None:
+            coordinates = self._coordinates(instance_id)
+            if coordinates is None:
+                return None
+            document = self._generate(*coordinates)
+        if not with_payload:
+            return {k: v for k, v in document.items() if k in ("@id", f"{META}space", f"{META}revision")}
+        if incoming_links_page_size is not None:
+            document = dict(document)
+            document[f"{META}incomingLinks"] = self._embedded_incoming_links(instance_id, document, incoming_links_page_size)
+        return document
+
+    def _embedded_incoming_links(self, instance_id: str, document: Dict[str, Any], page_size: int) -> Dict[str, Any]:
+        result: Dict[str, Any] = {}
+        for target_type in document.get("@type", []):
+            if target_type not in self.types:
+                continue
+            for link in self.type_information(target_type, False, True)[f"{META}incomingLinks"]:
+                property_name = link["http://schema.org/identifier"]
+                for source in link[f"{META}sourceTypes"]:
+                    ids = self.incoming_links(instance_id, property_name, source[f"{META}type"])
+                    if ids:
+                        result.setdefault(property_name, {})[source[f"{META}type"]] = {"data": [{"@id": f"{ID_NAMESPACE}{i}"} for i in ids[:page_size]], "total": len(ids), "size": min(page_size, len(ids)), "from": 0}
+        return result
+
+    def list_instances(self, target_type: str, spaces: Optional[List[str]] = None) -> Sequence[str]:
+        """ returns the ids of all instances of the given type (and spaces) - lazily, so millions of instances can be listed page by page """
+        if spaces and len(spaces) > 1:
+            return [i for s in spaces for i in self.list_instances(target_type, [s])]
+        space = spaces[0] if spaces else None
+        if target_type in self.types and (not space or space in self.spaces):
+            indices = range(self.spaces.index(space), self.instances_per_type, len(self.spaces)) if space else range(self.instances_per_type)
+        else:
+            indices = range(0)
+        extra = [i for i, d in self._overlay.items() if target_type in d.get("@type", []) and (not space or d.get(f"{META}space") == space) and self._coordinates(i) is None]
+        return _Listing(self, self.types.index(target_type) if target_type in self.types else 0, indices, extra)
+
+    def write_instance(self, instance_id: str, payload: Dict[str, Any], space: Optional[str], partial: bool) -> Dict[str, Any]:
+        instance_id = instance_id.lower()
+        with self._lock:
+            existing = self.get_instance(instance_id)
+            document = dict(existing) if existing and partial else {}
+            document.update(payload)
+            document["@id"] = f"{ID_NAMESPACE}{instance_id}"
+            document[f"{META}space"] = space or (existing or {}).get(f"{META}space") or self.spaces[0]
+            revision = (existing or {}).get(f"{META}revision", "_rev0")
+            document[f"{META}revision"] = f"_rev{int(revision[4:]) + 1}"
+            if "@type" in document and not isinstance(document["@type"], list):
+                document["@type"] = [document["@type"]]
+            self._overlay[instance_id] = document
+            self._deleted.discard(instance_id)
+        return document
+
+    def delete_instance(self, instance_id: str) -> bool:
+        with self._lock:
+            if self.get_instance(instance_id) is None:
+                return False
+            self._deleted.add(instance_id.lower())
+            self._overlay.pop(instance_id.lower(), None)
+        return True
+
+    def type_information(self, target_type: str, with_properties: bool, with_incoming_links: bool) -> Dict[str, Any]:
+        type_index = self.types.index(target_type)
+        result: Dict[str, Any] = {
+            "http://schema.org/identifier": target_type,
+            "http://schema.org/name": target_type.split("/")[-1],
+            f"{META}occurrences": self.instances_per_type,
+            f"{META}spaces": [{f"{META}space": s, f"{META}occurrences": len(self.list_instances(target_type, [s]))} for s in self.spaces]
+        }
+        if with_properties:
+            properties = [{"http://schema.org/identifier": f"{VOCAB}property{p}", f"{META}occurrences": self.instances_per_type} for p in range(self.properties_per_instance)]
+            properties.append({"http://schema.org/identifier": f"{VOCAB}previous", f"{META}occurrences": self.instances_per_type - 1,
+                               f"{META}targetTypes": [{f"{META}type": target_type, f"{META}occurrences": self.instances_per_type - 1}]})
+            if len(self.types) > 1:
+                properties.append({"http://schema.org/identifier": f"{VOCAB}related", f"{META}occurrences": self.instances_per_type,
+                                   f"{META}targetTypes": [{f"{META}type": self.types[(type_index + 1) % len(self.types)], f"{META}occurrences": self.instances_per_type}]})
+            result[f"{META}properties"] = properties
+        if with_incoming_links:
+            incoming = [{"http://schema.org/identifier": f"{VOCAB}previous", f"{META}sourceTypes": [{f"{META}type": target_type}]}]
+            if len(self.types) > 1:
+                incoming.append({"http://schema.org/identifier": f"{VOCAB}related", f"{META}sourceTypes": [{f"{META}type": self.types[(type_index - 1) % len(self.types)]}]})
+            result[f"{META}incomingLinks"] = incoming
+        return result
+
+    def incoming_links(self, instance_id: str, property_name: str, target_type: str) -> List[str]:
+        coordinates = self._coordinates(instance_id.lower())
+        if coordinates is None or target_type not in self.types:
+            return []
+        type_index, index = coordinates
+        source_type_index = self.types.index(target_type)
+        if property_name == f"{VOCAB}previous" and source_type_index == type_index and index + 1 < self.instances_per_type:
+            return [self.instance_id(type_index, index + 1)]
+        elif property_name == f"{VOCAB}related" and (source_type_index + 1) % len(self.types) == type_index:
+            return [self.instance_id(source_type_index, index)]
+        return []
+
+    def normalize(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """ expands and compacts the payload without context - with the reference JSON-LD processor pyld (keeping null values as the KG does) """
+        try:
+            from pyld import jsonld
+        except ImportError:
+            raise ImportError("The normalization of the stand-in requires pyld - please install it with \"pip install pyld\"")
+
+        def load_document(url: str, options: Any = None) -> Dict[str, Any]:
+            if url not in self.contexts:
+                raise ValueError(f"Unknown remote context {url}")
+            return {"contextUrl": None, "documentUrl": url, "document": self.contexts[url]}
+
+        def replace_nulls(value: Any) -> Any:
+            if isinstance(value, dict):
+                return {k: _RESET_VALUE if v is None and not k.startswith("@") else replace_nulls(v) for k, v in value.items()}
+            return [replace_nulls(v) for v in value] if isinstance(value, list) else value
+
+        def restore_nulls(value: Any) -> Any:
+            if isinstance(value, dict):
+                if value.get("@value") == _RESET_VALUE or value.get("@id") == _RESET_VALUE or value.get("@list") in ([_RESET_VALUE], [{"@value": _RESET_VALUE}]):
+                    return None
+                return {k: restore_nulls(v) for k, v in value.items()}
+            if isinstance(value, list):
+                return [restore_nulls(v) for v in value]
+            return None if value == _RESET_VALUE else value
+
+        options = {"base": None, "documentLoader": load_document}
+        return restore_nulls(jsonld.compact(jsonld.expand(replace_nulls(payload), options), {}, options))
+
+    def query_instances(self, specification: Dict[str, Any], space_restriction: Optional[List[str]], instance_id: Optional[str]) -> Sequence[str]:
+        root_type = (specification.get("meta") or {}).get("type")
+        if instance_id:
+            return [instance_id] if self.get_instance(instance_id, with_payload=False) is not None else []
+        return self.list_instances(root_type, space_restriction)
+
+    def _follow(self, value: Any, path: List[str]) -> Any:
+        """ the values at the end of the path - following the references of all but the last step """
+        if isinstance(value, list):
+            values = [v for v in (self._follow(v, path) for v in value) if v is not None]
+            return [v for sub in values for v in (sub if isinstance(sub, list) else [sub])] or None
+        if not path:
+            return value
+        if isinstance(value, dict) and set(value) == {"@id"}:
+            value = self.get_instance(value["@id"][len(ID_NAMESPACE):]) if value["@id"].startswith(ID_NAMESPACE) else None
+        if not isinstance(value, dict):
+            return None
+        return self._follow(value.get(path[0]), path[1:]) if path[0] in value else None
+
+    def project(self, specification: Dict[str, Any], instance_id: str) -> Optional[Dict[str, Any]]:
+        """ a very reduced query execution: supports the root type, paths (following references) and the "propertyName" of the structure """
+        document = self.get_instance(instance_id)
+        if document is None:
+            return None
+        response_vocab = (specification.get("meta") or {}).get("responseVocab")
+        projected: Dict[str, Any] = {}
+        for field in specification.get("structure", []):
+            steps = field.get("path")
+            steps = [p.get("@id") if isinstance(p, dict) else p for p in (steps if isinstance(steps, list) else [steps])]
+            name = field.get("propertyName") or steps[-1]
+            name = name.get("@id") if isinstance(name, dict) else name
+            if response_vocab and ":" not in name:
+                name = f"{response_vocab}{name}"
+            if steps == ["@id"]:
+                projected[name] = document["@id"]
+            else:
+                value = self._follow(document, steps)
+                if value is not None:
+                    projected[name] = value
+        return projected
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 connections causes connection retries (and therefore distorted measurements) for concurrent clients
+    request_queue_size = 256
+
+
+class _Listing(Sequence):
+
+    def __init__(self, kg: StandInKG, type_index: int, indices: range, extra: List[str]):
+        self._kg = kg
+        self._type_index = type_index
+        self._indices = indices
+        self._extra = extra
+
+    def __len__(self) -> int:
+        return len(self._indices) + len(self._extra)
+
+    def __getitem__(self, item: Any) -> Any:
+        if isinstance(item, slice):
+            start, stop, _ = item.indices(len(self))
+            return [self[i] for i in range(start, stop)]
+        elif item < len(self._indices):
+            return self._kg.instance_id(self._type_index, self._indices[item])
+        return self._extra[item - len(self._indices)]
+
+
+def _handler(kg: StandInKG):
+
+    class StandInRequestHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body are written separately - without TCP_NODELAY, keep-alive clients would wait for the delayed ACK
+        disable_nagle_algorithm = True
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+        def _send(self, status: int, content: Optional[Dict[str, Any]], started: float) -> None:
+            if content is not None and "durationInMs" not in content:
+                content["durationInMs"] = int((time.perf_counter() - started) * 1000)
+            body = json.dumps(content).encode("utf-8") if content is not None else b""
+            if kg.network_latency_in_ms:
+                # Simulates the round trip - it's not part of the server-side duration
+                time.sleep(kg.network_latency_in_ms / 1000)
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _payload(self) -> Any:
+            length = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(length)) if length else None
+
+        def _handle(self, method: str) -> None:
+            started = time.perf_counter()
+            kg.requests += 1
+            url = urlparse(self.path)
+            # The client serializes booleans as "True" / "False" - the KG accepts them case-insensitively
+            query = {k: v[-1].lower() if v[-1] in ("True", "False") else v[-1] for k, v in parse_qs(url.query).items()}
+            query_lists = parse_qs(url.query)
+            payload = self._payload() if method in ("POST", "PUT", "PATCH") else None
+            if url.path == "/token":
+                self._send(200, {"access_token": "stand-in-token", "refresh_token": "stand-in-refresh", "expires_in": 300}, started)
+                return
+            if not url.path.startswith("/v3-beta/"):
+                self._send(404, {"error": "Not found", "message": "Unknown api version", "path": url.path, "status": 404}, started)
+                return
+            path = url.path[len("/v3-beta/"):]
+            if not path.startswith("users/authorization") and not (self.headers.get("Authorization") or "").startswith("Bearer "):
+                self._send(401, {"error": "Unauthorized", "message": "No token provided", "path": url.path, "status": 401}, started)
+                return
+            if kg.latency_in_ms:
+                time.sleep(kg.latency_in_ms / 1000)
+            status, content = route(method, path, query, query_lists, payload)
+            self._send(status, content, started)
+
+        def do_GET(self) -> None:
+            self._handle("GET")
+
+        def do_POST(self) -> None:
+            self._handle("POST")
+
+        def do_PUT(self) -> None:
+            self._handle("PUT")
+
+        def do_PATCH(self) -> None:
+            self._handle("PATCH")
+
+        def do_DELETE(self) -> None:
+            self._handle("DELETE")
+
+    def paginate(ids: List[Any], query: Dict[str, str], render) -> Dict[str, Any]:
+        start = int(query.get("from") or 0)
+        size = int(query.get("size") or 50)
+        if kg.max_page_size is not None:
+            size = min(size, kg.max_page_size)
+        page = [render(i) for i in ids[start:start + size]]
+        content: Dict[str, Any] = {"data": [p for p in page if p is not None], "from": start, "size": len(page)}
+        if query.get("returnTotalResults", "true").lower() == "true":
+            if kg.count_latency_in_ms:
+                time.sleep(kg.count_latency_in_ms / 1000)
+            content["total"] = len(ids)
+        return content
+
+    def not_found(instance_id: str) -> Dict[str, Any]:
+        return {"error": {"code": 404, "message": f"Instance {instance_id} not found", "instanceId": instance_id}}
+
+    def route(method: str, path: str, query: Dict[str, str], query_lists: Dict[str, List[str]], payload: Any) -> Tuple[int, Optional[Dict[str, Any]]]:
+        base = f"http://{kg.host}"
+        with_payload = query.get("returnPayload", "true") != "false"
+        incoming_links_page_size = int(query.get("incomingLinksPageSize") or 10) if query.get("returnIncomingLinks") == "true" else None
+        if path == "users/authorization/tokenEndpoint":
+            return 200, {"data": {"endpoint": f"{base}/token"}}
+        elif path == "users/authorization/config" or path == "users/authorization":
+            return 200, {"data": {"endpoint": f"{base}/.well-known/openid-configuration"}}
+        elif path == "users/me":
+            return 200, {"data": {"http://schema.org/name": "Stand-in user", "http://schema.org/alternateName": "standin"}}
+        elif path == "users/me/roles":
+            return 200, {"data": {"user": {"http://schema.org/name": "Stand-in user"}, "userRoles": [], "clientRoles": []}}
+        elif path == "instances" and method == "GET":
+            ids = kg.list_instances(query.get("type", ""), [query["space"]] if query.get("space") else None)
+            return 200, paginate(ids, query, lambda i: kg.get_instance(i, with_payload))
+        elif path == "instances" and method == "POST":
+            return 200, {"data": kg.write_instance(str(uuid.uuid4()), payload or {}, query.get("space"), partial=False)}
+        elif path == "instancesByIds" and method == "POST":
+            data = {}
+            for i in payload or []:
+                document = kg.get_instance(str(i), with_payload, incoming_links_page_size)
+                data[str(i)] = {"data": document} if document else not_found(str(i))
+            return 200, {"data": data}
+        elif path == "jsonld/normalizedPayload" and method == "POST":
+            try:
+                return 200, {"data": kg.normalize(payload or {})}
+            except Exception as e:
+                return 400, {"error": {"code": 400, "message": str(e)}}
+        elif path == "types" and method == "GET":
+            return 200, paginate(kg.types, query, lambda t: kg.type_information(t, query.get("withProperties") == "true", query.get("withIncomingLinks") == "true"))
+        elif path == "typesByName" and method == "POST":
+            return 200, {"data": {t: ({"data": kg.type_information(t, query.get("withProperties") == "true", query.get("withIncomingLinks") == "true")} if t in kg.types else
+                                      {"error": {"code": 404, "message": f"Type {t} not found"}}) for t in payload or []}}
+        elif path == "spaces" and method == "GET":
+            return 200, paginate(kg.spaces, query, lambda s: {"http://schema.org/identifier": s, "http://schema.org/name": s})
+        elif re.match(r"^spaces/[^/]+$", path) and method == "GET":
+            space = path.split("/")[1]
+            return (200, {"data": {"http://schema.org/identifier": space, "http://schema.org/name": space}}) if space in kg.spaces else (404, {"error": {"code": 404, "message": "Space not found"}})
+        elif path == "queries" and method == "POST":
+            ids = kg.query_instances(payload or {}, query_lists.get("restrictToSpaces"), query.get("instanceId"))
+            return 200, paginate(ids, query, lambda i: kg.project(payload or {}, i))
+        elif re.match(f"^queries/{_UUID}/instances$", path) and method == "GET":
+            specification = kg._queries.get(path.split("/")[1].lower())
+            if specification is None:
+                return 404, {"error": {"code": 404, "message": "Query not found"}}
+            ids = kg.query_instances(specification, query_lists.get("restrictToSpaces"), query.get("instanceId"))
+            return 200, paginate(ids, query, lambda i: kg.project(specification, i))
+        elif re.match(f"^queries/{_UUID}$", path):
+            query_id = path.split("/")[1].lower()
+            if method == "PUT":
+                kg._queries[query_id] = payload or {}
+                return 200, {"data": {"@id": f"{ID_NAMESPACE}{query_id}", **(payload or {})}}
+            elif method == "GET":
+                return (200, {"data": {"@id": f"{ID_NAMESPACE}{query_id}", **kg._queries[query_id]}}) if query_id in kg._queries else (404, not_found(query_id))
+            elif method == "DELETE":
+                return (200, {}) if kg._queries.pop(query_id, None) is not None else (404, not_found(query_id))
+        elif re.match(f"^instances/{_UUID}$", path):
+            instance_id = path.split("/")[1]
+            if method == "GET":
+                document = kg.get_instance(instance_id, with_payload, incoming_links_page_size)
+                return (200, {"data": document}) if document else (404, not_found(instance_id))
+            elif method == "POST":
+                if kg.get_instance(instance_id) is not None:
+                    return 409, {"error": {"code": 409, "message": f"Instance {instance_id} already exists", "instanceId": instance_id}}
+                return 200, {"data": kg.write_instance(instance_id, payload or {}, query.get("space"), partial=False)}
+            elif method in ("PUT", "PATCH"):
+                if kg.get_instance(instance_id) is None:
+                    return 404, not_found(instance_id)
+                return 200, {"data": kg.write_instance(instance_id, payload or {}, None, partial=method == "PATCH")}
+            elif method == "DELETE":
+                return (200, {}) if kg.delete_instance(instance_id) else (404, not_found(instance_id))
+        elif re.match(f"^instances/{_UUID}/incomingLinks$", path) and method == "GET":
+            ids = kg.incoming_links(path.split("/")[1], query.get("property", ""), query.get("type", ""))
+            return 200, paginate(ids, query, lambda i: kg.get_instance(i))
+        elif re.match(f"^instances/{_UUID}/release$", path):
+            return (200, {}) if kg.get_instance(path.split("/")[1]) is not None else (404, not_found(path.split("/")[1]))
+        elif re.match(f"^instances/{_UUID}/spaces/[^/]+$", path) and method == "PUT":
+            _, instance_id, _, space = path.split("/")
+            if kg.get_instance(instance_id) is None:
+                return 404, not_found(instance_id)
+            return 200, {"data": kg.write_instance(instance_id, {}, space, partial=True)}
+        return 404, {"error": "Not found", "message": f"The stand-in doesn't support {method} {path}", "path": path, "status": 404}
+
+    return StandInRequestHandler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Runs a local stand-in of the EBRAINS KG core API")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--instances-per-type", type=int, default=1000)
+    parser.add_argument("--properties-per-instance", type=int, default=10)
+    parser.add_argument("--value-size", type=int, default=20)
+    parser.add_argument("--latency-in-ms", type=float, default=0)
+    parser.add_argument("--count-latency-in-ms", type=float, default=0)
+    parser.add_argument("--network-latency-in-ms", type=float, default=0)
+    parser.add_argument("--max-page-size", type=int, default=None, help="caps the size of the returned pages")
+    arguments = parser.parse_args()
+    stand_in = StandInKG(port=arguments.port, instances_per_type=arguments.instances_per_type, properties_per_instance=arguments.properties_per_instance,
+                         value_size=arguments.value_size, latency_in_ms=arguments.latency_in_ms, count_latency_in_ms=arguments.count_latency_in_ms,
+                         network_latency_in_ms=arguments.network_latency_in_ms, max_page_size=arguments.max_page_size)
+    print(f"Stand-in KG listening on {stand_in.host} - connect with kg(\"{stand_in.host}\").with_token(\"any\")")
+    try:
+        stand_in._server.serve_forever()
+    except KeyboardInterrupt:
+        stand_in.stop()
@@ -0,0 +1,141 @@
+#  Copyright 2022 EBRAINS AISBL
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0.
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+#  This open source software code was developed in part or in whole in the
+#  Human Brain Project, funded from the European Union's Horizon 2020
+#  Framework Programme for Research and Innovation under
+#  Specific Grant Agreements No. 720270, No. 785907, and No. 945539
+#  (Human Brain Project SGA1, SGA2 and SGA3).
+#
+
+"""
+End-to-end throughput benchmarks of the client against the local stand-in (or - with --host and --token - against a
+real KG deployment):
+
+ - requests per second for single instance reads (sequential and concurrent)
+ - pagination throughput (items per second) for different page sizes
+ - bulk-get latency for different batch sizes
+ - client-side overhead per request (compared to a plain HTTP request of the same resource)
+
+Usage: python -m benchmarks.throughput [--output report.json] [--baseline previous.json]
+"""
+
+from __future__ import annotations
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import requests
+
+from benchmarks.common import Report, argument_parser, finish, measure, summarize
+from benchmarks.stand_in import StandInKG, DEFAULT_TYPES
+from kg_core.kg import Client, kg
+from kg_core.request import AdaptivePageSize, Pagination
+
+
+def _instance_ids(client: Client, target_type: str, count: int) -> List[str]:
+    result = client.instances.list(target_type, pagination=Pagination(size=count))
+    return [str(i.uuid) for i in result.data or []]
+
+
+def requests_per_second(report: Report, client: Client, ids: List[str], repetitions: int, concurrency: int) -> None:
+    def read(i: int) -> None:
+        client.instances.get_by_id(ids[i % len(ids)])
+
+    durations = measure(lambda: read(0), repetitions)
+    report.add("get_by_id_sequential", requests_per_second=round(repetitions / sum(durations), 2), **summarize(durations))
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        start = time.perf_counter()
+        list(executor.map(read, range(repetitions)))
+        elapsed = time.perf_counter() - start
+    report.add(f"get_by_id_concurrent_{concurrency}", requests_per_second=round(repetitions / elapsed, 2))
+
+
+def pagination_throughput(report: Report, client: Client, target_type: str, page_sizes: List[int], max_items: int) -> None:
+    for page_size in page_sizes:
+        start = time.perf_counter()
+        count = 0
+        for _ in client.instances.list(target_type, pagination=Pagination(size=page_size)).items():
+            count += 1
+            if count >= max_items:
+                break
+        elapsed = time.perf_counter() - start
+        report.add(f"pagination_size_{page_size}", items=count, items_per_second=round(count / elapsed, 2), duration_ms=round(elapsed * 1000, 3))
+    adaptive_page_size = AdaptivePageSize()
+    start = time.perf_counter()
+    count = 0
+    for _ in client.instances.list(target_type, pagination=Pagination(size=page_sizes[0])).items(adaptive_page_size):
+        count += 1
+        if count >= max_items:
+            break
+    elapsed = time.perf_counter() - start
+    report.add("pagination_adaptive", items=count, items_per_second=round(count / elapsed, 2), duration_ms=round(elapsed * 1000, 3), best_page_size=adaptive_page_size.best_size)
+
+
+def bulk_get_latency(report: Report, client: Client, ids: List[str], batch_sizes: List[int], repetitions: int) -> None:
+    for batch_size in batch_sizes:
+        batch = (ids * (batch_size // len(ids) + 1))[:batch_size]
+        durations = measure(lambda: client.instances.get_by_ids(batch), repetitions)
+        report.add(f"get_by_ids_{batch_size}", items_per_second=round(batch_size * repetitions / sum(durations), 2), **summarize(durations))
+
+
+def client_overhead(report: Report, client: Client, base_url: str, token: str, instance_id: str, repetitions: int) -> None:
+    """ compares the SDK call with a plain HTTP request of the same resource - the difference is the client-side overhead """
+    url = f"{base_url}instances/{instance_id}"
+    plain = measure(lambda: requests.get(url, params={"stage": "RELEASED"}, headers={"Authorization": f"Bearer {token}"}).json(), repetitions)
+    sdk = measure(lambda: client.instances.get_by_id(instance_id), repetitions)
+    overhead = (sum(sdk) - sum(plain)) / repetitions
+    report.add("client_overhead", plain_mean_ms=summarize(plain)["mean_ms"], sdk_mean_ms=summarize(sdk)["mean_ms"], overhead_per_request_ms=round(overhead * 1000, 3))
+
+
+def run(host: Optional[str], token: str, target_type: str, arguments: Any) -> Report:
+    configuration: Dict[str, Any] = {"host": host or "stand-in", "target_type": target_type, "repetitions": arguments.repetitions, "concurrency": arguments.concurrency,
+                                     "latency_in_ms": arguments.latency_in_ms, "network_latency_in_ms": arguments.network_latency_in_ms, "value_size": arguments.value_size, "properties_per_instance": arguments.properties_per_instance}
+    report = Report("throughput", configuration)
+    stand_in = None
+    if not host:
+        stand_in = StandInKG(instances_per_type=arguments.instances, latency_in_ms=arguments.latency_in_ms, network_latency_in_ms=arguments.network_latency_in_ms, value_size=arguments.value_size,
+                             properties_per_instance=arguments.properties_per_instance).start()
+        host = stand_in.host
+    try:
+        client = kg(host).with_token(token).build()
+        ids = _instance_ids(client, target_type, 100)
+        if not ids:
+            raise ValueError(f"No instances of type {target_type} found")
+        requests_per_second(report, client, ids, arguments.repetitions, arguments.concurrency)
+        pagination_throughput(report, client, target_type, [50, 200, 1000], arguments.max_items)
+        bulk_get_latency(report, client, ids, [10, 100, 1000], max(1, arguments.repetitions // 10))
+        client_overhead(report, client, f"http{'s' if not host.startswith('localhost') else ''}://{host}/v3-beta/", token, ids[0], arguments.repetitions)
+    finally:
+        if stand_in:
+            stand_in.stop()
+    return report
+
+
+if __name__ == "__main__":
+    parser = argument_parser("End-to-end throughput benchmarks of the KG core python SDK")
+    parser.add_argument("--host", help="benchmark against this KG host instead of the local stand-in")
+    parser.add_argument("--token", default="stand-in", help="the token to be used for the requests")
+    parser.add_argument("--type", default=DEFAULT_TYPES[0], help="the type to be used for listing and reading instances")
+    parser.add_argument("--repetitions", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--max-items", type=int, default=5000, help="the number of items to iterate for the pagination throughput")
+    parser.add_argument("--instances", type=int, default=10000, help="instances per type of the stand-in")
+    parser.add_argument("--latency-in-ms", type=float, default=0, help="simulated server-side latency of the stand-in")
+    parser.add_argument("--network-latency-in-ms", type=float, default=0, help="simulated network latency of the stand-in (not part of the server-side duration)")
+    parser.add_argument("--value-size", type=int, default=20, help="size of the property values of the stand-in")
+    parser.add_argument("--properties-per-instance", type=int, default=10, help="number of properties per instance of the stand-in")
+    args = parser.parse_args()
+    finish(run(args.host, args.token, args.type, args), args)
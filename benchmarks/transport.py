@@ -0,0 +1,94 @@
+#  Copyright 2022 EBRAINS AISBL
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0.
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+#  This open source software code was developed in part or in whole in the
+#  Human Brain Project, funded from the European Union's Horizon 2020
+#  Framework Programme for Research and Innovation under
+#  Specific Grant Agreements No. 720270, No. 785907, and No. 945539
+#  (Human Brain Project SGA1, SGA2 and SGA3).
+#
+
+"""
+Compares the default HTTP/1.1 transport (one connection per request) with the pooled HTTP/2 transport (with_http2)
+for concurrent single reads and bulk gets at different levels of concurrency.
+
+The stand-in only speaks HTTP/1.1 (without TLS there is no HTTP/2 negotiation), so against the stand-in the second
+transport measures the effect of the pooled keep-alive connections only. Run it with --host and --token against a
+real KG deployment to measure the multiplexing of HTTP/2.
+
+Usage: python -m benchmarks.transport [--host ... --token ...] [--output report.json] [--baseline previous.json]
+"""
+
+from __future__ import annotations
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.common import Report, argument_parser, finish
+from benchmarks.stand_in import StandInKG, DEFAULT_TYPES
+from kg_core.kg import Client, ClientBuilder, kg
+from kg_core.request import Pagination
+
+
+def _concurrently(function: Callable[[int], Any], requests: int, concurrency: int) -> float:
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        start = time.perf_counter()
+        list(executor.map(function, range(requests)))
+        return time.perf_counter() - start
+
+
+def run(host: Optional[str], token: str, target_type: str, arguments: Any) -> Report:
+    report = Report("transport", {"host": host or "stand-in", "target_type": target_type, "requests": arguments.requests, "concurrency": arguments.concurrency,
+                                  "batch_size": arguments.batch_size, "max_connections": arguments.max_connections, "latency_in_ms": arguments.latency_in_ms,
+                                  "network_latency_in_ms": arguments.network_latency_in_ms})
+    stand_in = None
+    if not host:
+        stand_in = StandInKG(instances_per_type=arguments.instances, latency_in_ms=arguments.latency_in_ms, network_latency_in_ms=arguments.network_latency_in_ms).start()
+        host = stand_in.host
+    try:
+        transports: Dict[str, Callable[[], ClientBuilder]] = {
+            "http1": lambda: kg(host).with_token(token),
+            "http2": lambda: kg(host).with_token(token).with_http2(max_connections=arguments.max_connections)
+        }
+        for name, builder in transports.items():
+            client: Client = builder().build()
+            ids: List[str] = [str(i.uuid) for i in client.instances.list(target_type, pagination=Pagination(size=100, return_total_results=False)).data or []]
+            for concurrency in arguments.concurrency:
+                elapsed = _concurrently(lambda i: client.instances.get_by_id(ids[i % len(ids)]), arguments.requests, concurrency)
+                report.add(f"{name}.get_by_id.concurrency_{concurrency}", requests_per_second=round(arguments.requests / elapsed, 2), duration_ms=round(elapsed * 1000, 3))
+                batch = (ids * (arguments.batch_size // len(ids) + 1))[:arguments.batch_size]
+                batches = max(1, arguments.requests // 10)
+                elapsed = _concurrently(lambda i: client.instances.get_by_ids(batch), batches, concurrency)
+                report.add(f"{name}.get_by_ids_{arguments.batch_size}.concurrency_{concurrency}", items_per_second=round(batches * arguments.batch_size / elapsed, 2), duration_ms=round(elapsed * 1000, 3))
+    finally:
+        if stand_in:
+            stand_in.stop()
+    return report
+
+
+if __name__ == "__main__":
+    parser = argument_parser("HTTP/1.1 vs. HTTP/2 transport of the KG core python SDK")
+    parser.add_argument("--host", help="benchmark against this KG host instead of the local stand-in")
+    parser.add_argument("--token", default="stand-in", help="the token to be used for the requests")
+    parser.add_argument("--type", default=DEFAULT_TYPES[0], help="the type to be used for reading instances")
+    parser.add_argument("--requests", type=int, default=500, help="the number of single reads per level of concurrency")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--batch-size", type=int, default=100, help="the number of instances per bulk get")
+    parser.add_argument("--max-connections", type=int, default=10, help="the size of the connection pool of the HTTP/2 transport")
+    parser.add_argument("--instances", type=int, default=1000, help="instances per type of the stand-in")
+    parser.add_argument("--latency-in-ms", type=float, default=0, help="simulated server-side latency of the stand-in")
+    parser.add_argument("--network-latency-in-ms", type=float, default=0, help="simulated network latency of the stand-in")
+    args = parser.parse_args()
+    finish(run(args.host, args.token, args.type, args), args)
@@ -21,14 +21,28 @@
 
 from __future__ import annotations
 
+import hashlib
+import json
 import threading
 import time
 from abc import ABC, abstractmethod
 from copy import deepcopy
-from typing import Any, Dict, Optional, Callable
+from typing import Any, Dict, Optional, Callable, TYPE_CHECKING
 
 import requests
 
+from kg_core.operations import find_operation
+from kg_core.transport import RequestsTransport, Transport
+
+if TYPE_CHECKING:
+    from kg_core.cache import InstanceCache
+
+# Idempotent operations (according to the generated operation registry) are retried after these responses of the gateway
+# and after the transient errors of the transport - with an exponential backoff
+TRANSIENT_STATUS_CODES = (502, 503, 504)
+IDEMPOTENT_RETRIES = 2
+RETRY_BACKOFF_IN_SECONDS = 0.2
+
 class TokenHandler(ABC):
 
     def __init__(self):
@@ -46,6 +60,11 @@ class TokenHandler(ABC):
     def _fetch_token(self) -> Optional[str]:
         pass
 
+    def _identity(self) -> Optional[str]:
+        """ distinguishes the tokens of this handler from others when they are shared (e.g. by a token broker) - None if
+        the handler doesn't fetch its tokens from a stable source (e.g. a token provided by the caller), so they are never shared """
+        return None
+
     def define_endpoint(self, kg_endpoint: str):
         if not self._auth_endpoint and kg_endpoint:
             auth_endpoint_response = requests.get(f"{kg_endpoint}users/authorization/tokenEndpoint")
@@ -66,36 +85,70 @@ class CallableTokenHandler(TokenHandler):
 
 class KGConfig(object):
 
-    def __init__(self, endpoint: str, token_handler: TokenHandler, client_token_handler: Optional[TokenHandler], id_namespace: str, enable_profiling: bool):
+    def __init__(self, endpoint: str, token_handler: TokenHandler, client_token_handler: Optional[TokenHandler], id_namespace: str, enable_profiling: bool, instance_cache: Optional[InstanceCache] = None, transport: Optional[Transport] = None):
         self.endpoint = endpoint
         self.token_handler = token_handler
         self.client_token_handler = client_token_handler
         self.id_namespace = id_namespace
         self.enable_profiling = enable_profiling
+        self.instance_cache = instance_cache
+        self.transport = transport or RequestsTransport()
+
+
+class ResponseStatistics(object):
+
+    def __init__(self, total_in_ms: float, until_arrival_in_ms: float, server_in_ms: Optional[float], size_in_bytes: int):
+        self.total_in_ms = total_in_ms
+        self.until_arrival_in_ms = until_arrival_in_ms
+        self.server_in_ms = server_in_ms
+        self.size_in_bytes = size_in_bytes
 
 
 class KGRequestWithResponseContext(object):
 
-    def __init__(self, content: Optional[Dict[str, Any]], request_arguments: Optional[Dict[str, Any]], request_payload: Optional[Any], status_code: Optional[int], kg_config: KGConfig):
+    def __init__(self, content: Optional[Dict[str, Any]], request_arguments: Optional[Dict[str, Any]], request_payload: Optional[Any], status_code: Optional[int], kg_config: KGConfig, statistics: Optional[ResponseStatistics] = None):
         self.content = content
         self._request_arguments: Dict[str, Any] = request_arguments or {}
         self._request_payload = request_payload
         self.status_code = status_code
         self.id_namespace = kg_config.id_namespace
         self._kg_config = kg_config
+        self.statistics = statistics
 
     def copy_context(self, content: dict):
         return KGRequestWithResponseContext(content, None, None, None, self._kg_config)
 
-    def next_page(self, original_start_from: int, original_size: int) -> KGRequestWithResponseContext:
-        return GenericRequests(self._kg_config).request(self._define_arguments_for_next_page(original_start_from+original_size, original_size), self._request_payload)
+    @property
+    def requested_size(self) -> Optional[int]:
+        """ the page size of the original request (the "size" of the response is the number of items actually returned) """
+        size = (self._request_arguments.get("params") or {}).get("size")
+        return int(size) if size is not None else None
+
+    @property
+    def url(self) -> Optional[str]:
+        return self._request_arguments.get("url")
+
+    def fingerprint(self) -> str:
+        """ identifies the original request independently of the requested page """
+        params = {k: v for k, v in (self._request_arguments.get("params") or {}).items() if k not in ("from", "size", "returnTotalResults")}
+        request = {"method": self._request_arguments.get("method"), "url": self.url, "params": params, "payload": self._request_payload}
+        return hashlib.sha256(json.dumps(request, sort_keys=True, default=str).encode("utf-8")).hexdigest()
 
-    def _define_arguments_for_next_page(self, new_start_from: int, new_size: int) -> Dict[str, Any]:
+    def next_page(self, original_start_from: int, original_size: int, new_size: Optional[int] = None, return_total_results: Optional[bool] = None) -> KGRequestWithResponseContext:
+        return self.page(original_start_from+original_size, new_size if new_size else original_size, return_total_results)
+
+    def page(self, start_from: int, size: int, return_total_results: Optional[bool] = None) -> KGRequestWithResponseContext:
+        """ executes the original request again for the given page - optionally with a different "returnTotalResults" flag """
+        return GenericRequests(self._kg_config).request(self._define_arguments_for_next_page(start_from, size, return_total_results), self._request_payload)
+
+    def _define_arguments_for_next_page(self, new_start_from: int, new_size: int, return_total_results: Optional[bool] = None) -> Dict[str, Any]:
         new_arguments = deepcopy(self._request_arguments)
         if "params" not in new_arguments:
             new_arguments["params"] = dict()
         new_arguments["params"]["from"] = new_start_from
         new_arguments["params"]["size"] = new_size
+        if return_total_results is not None:
+            new_arguments["params"]["returnTotalResults"] = return_total_results
         return new_arguments
 
 
@@ -111,9 +164,10 @@ class KGException(Exception):
 class RequestsWithTokenHandler(ABC):
     def __init__(self, kg_config: KGConfig):
         self._kg_config = kg_config
-        self._kg_config.token_handler.define_endpoint(self._kg_config.endpoint)
-        if self._kg_config.client_token_handler:
-            self._kg_config.client_token_handler.define_endpoint(self._kg_config.endpoint)
+        if not self._kg_config.transport.offline and (not self._kg_config.instance_cache or not self._kg_config.instance_cache.offline):
+            self._kg_config.token_handler.define_endpoint(self._kg_config.endpoint)
+            if self._kg_config.client_token_handler:
+                self._kg_config.client_token_handler.define_endpoint(self._kg_config.endpoint)
 
     def _set_headers(self, args: Dict[str, Any], force_token_fetch: bool):
         if self._kg_config.token_handler:
@@ -134,23 +188,42 @@ class RequestsWithTokenHandler(ABC):
             'url': absolute_path,
             'params': params
         }
-        return self._do_request(args, payload)
+        operation = find_operation(method, path)
+        do_request = self._do_request_with_retries if operation is not None and operation.idempotent else self._do_request
+        if self._kg_config.instance_cache:
+            return self._kg_config.instance_cache.request(method, path, args, payload, self._kg_config, do_request)
+        return do_request(args, payload)
+
+    def _do_request_with_retries(self, args: Dict[str, Any], payload: Optional[Any]) -> KGRequestWithResponseContext:
+        attempt = 0
+        while True:
+            try:
+                result = self._do_request(dict(args), payload)
+                if result.status_code not in TRANSIENT_STATUS_CODES or attempt >= IDEMPOTENT_RETRIES:
+                    return result
+            except self._kg_config.transport.transient_errors:
+                if attempt >= IDEMPOTENT_RETRIES:
+                    raise
+            time.sleep(RETRY_BACKOFF_IN_SECONDS * 2 ** attempt)
+            attempt += 1
 
     def _do_request(self, args: Dict[str, Any], payload: Optional[Any]) -> KGRequestWithResponseContext:
         self._set_headers(args, False)
         if payload is not None:
             args['json'] = payload
         start = time.perf_counter()
-        r = requests.request(**args, stream=True)
+        r = self._kg_config.transport.send(**args)
         end_request = time.perf_counter()
         if r.status_code == 401:
             self._set_headers(args, True)
             start = time.perf_counter()
-            r = requests.request(**args, stream=True)
+            r = self._kg_config.transport.send(**args)
             end_request = time.perf_counter()             
+        statistics = None
         try:
             response: Optional[Dict[str, Any]] = r.json()
-            end_deserialization = time.perf_counter()       
+            end_deserialization = time.perf_counter()
+            statistics = ResponseStatistics((end_deserialization-start)*1000, (end_request-start)*1000, response.get("durationInMs") if isinstance(response, dict) else None, len(r.content))
             if self._kg_config.enable_profiling:
                 total = int((end_deserialization-start)*1000)
                 if response and "durationInMs" in response and response["durationInMs"]:
@@ -165,7 +238,7 @@ class RequestsWithTokenHandler(ABC):
         except ValueError:
             response = None
         del args["headers"]
-        return KGRequestWithResponseContext(response, args, payload, r.status_code, self._kg_config)
+        return KGRequestWithResponseContext(response, args, payload, r.status_code, self._kg_config, statistics)
 
     def _get(self, path: str, params: Dict[str, Any]) -> KGRequestWithResponseContext:
         return self._request("GET", path, None, params)
@@ -188,4 +261,8 @@ class GenericRequests(RequestsWithTokenHandler):
         super(GenericRequests, self).__init__(config)
 
     def request(self, request_arguments: Dict[str, Any], request_payload: Optional[Any]):
-        return self._do_request(request_arguments, request_payload)
+        """ sends a request (e.g. the next page of a previous one) the same way as the original: through the instance cache and with the retries of its operation """
+        url: str = request_arguments["url"]
+        if not url.startswith(self._kg_config.endpoint):
+            return self._do_request(request_arguments, request_payload)
+        return self._request(request_arguments["method"], url[len(self._kg_config.endpoint):], request_payload, request_arguments.get("params") or {})
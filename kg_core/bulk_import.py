@@ -0,0 +1,201 @@
+#  Copyright 2022 EBRAINS AISBL
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0.
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+#  This open source software code was developed in part or in whole in the
+#  Human Brain Project, funded from the European Union's Horizon 2020
+#  Framework Programme for Research and Innovation under
+#  Specific Grant Agreements No. 720270, No. 785907, and No. 945539
+#  (Human Brain Project SGA1, SGA2 and SGA3).
+#
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from uuid import UUID
+
+from kg_core.kg import Client
+from kg_core.request import ExtendedResponseConfiguration
+from kg_core.response import Error
+
+# The default namespace of the deterministic ids - use your own one per source of external identifiers to avoid collisions
+IMPORT_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "https://kg.ebrains.eu/api/instances/")
+
+
+def deterministic_id(external_identifier: str, namespace: UUID = IMPORT_NAMESPACE) -> UUID:
+    """ the UUID (version 5) of an external identifier - the same identifier always results in the same instance id """
+    return uuid.uuid5(namespace, external_identifier)
+
+
+class ImportJournal(object):
+    """
+    An append-only (JSON lines) journal of the completed writes of an import. Every entry is flushed right away (and
+    with "fsync" also synced to the disk), so the journal survives a crash of the process - a partially written last
+    line (e.g. of a crash during the write) is ignored when the journal is loaded.
+    """
+
+    def __init__(self, path: str, fsync: bool = False):
+        self.path = path
+        self._fsync = fsync
+        self._lock = threading.Lock()
+        self._completed: Set[UUID] = set()
+        torn = False
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    torn = not line.endswith("\n")
+                    try:
+                        self._completed.add(UUID(json.loads(line)["id"]))
+                    except (ValueError, KeyError, TypeError):
+                        continue
+        self._file = open(path, "a")
+        if torn:
+            # Terminates the partially written line - otherwise the next entry would be appended to it
+            self._file.write("\n")
+
+    def __contains__(self, instance_id: UUID) -> bool:
+        return instance_id in self._completed
+
+    def __len__(self) -> int:
+        return len(self._completed)
+
+    def append(self, instance_id: UUID, external_identifier: str, outcome: str) -> None:
+        entry = json.dumps({"id": str(instance_id), "externalId": external_identifier, "outcome": outcome, "timestamp": time.time()})
+        with self._lock:
+            self._file.write(f"{entry}\n")
+            self._file.flush()
+            if self._fsync:
+                os.fsync(self._file.fileno())
+            self._completed.add(instance_id)
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+class ImportReport(object):
+
+    def __init__(self):
+        self.created = 0
+        self.existing = 0
+        self.skipped = 0
+        self.failed = 0
+        self.errors: Dict[str, Error] = {}
+        self.duration_in_ms = 0
+        self._started = time.time()
+        self._lock = threading.Lock()
+
+    @property
+    def written_per_second(self) -> float:
+        """ the throughput of the writes (created or already existing instances) so far """
+        elapsed = self.duration_in_ms / 1000 if self.duration_in_ms else time.time() - self._started
+        return round((self.created + self.existing) / elapsed, 1) if elapsed > 0 else 0.0
+
+    def _count(self, outcome: str, external_identifier: Optional[str] = None, error: Optional[Error] = None) -> int:
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+            if error and external_identifier is not None:
+                self.errors[external_identifier] = error
+            return self.created + self.existing + self.failed
+
+    def __str__(self):
+        return f"Import: {self.created} created, {self.existing} already existing, {self.skipped} skipped (journaled), {self.failed} failed ({self.written_per_second} writes/s, {self.duration_in_ms}ms)"
+
+
+class BulkImport(object):
+    """
+    Creates instances for records (pairs of an external identifier and a payload) idempotently and resumable: the id of
+    every instance is derived from its external identifier (deterministic_id), every completed write is recorded in a
+    journal and records which are already journaled are skipped when the import is run again (e.g. after a crash).
+
+    Instances which already exist in the KG without being journaled (the process crashed between the write and the
+    journal entry) are recognized by the conflict of the creation and journaled as "existing". Failed writes are not
+    journaled, so they are retried by the next run.
+
+    The writes are sent by "max_workers" threads - "on_progress" is called with the report every "progress_every" writes.
+    If the journal can't be written (e.g. the disk is full) or "on_progress" raises an exception, the import stops
+    submitting records and run() raises the (first) exception once the writes in flight are done.
+    """
+
+    def __init__(self, client: Client, space: str, journal_path: str, namespace: UUID = IMPORT_NAMESPACE, max_workers: int = 8, fsync: bool = False,
+                 on_progress: Optional[Callable[[ImportReport], None]] = None, progress_every: int = 1000):
+        self._client = client
+        self._space = space
+        self._journal_path = journal_path
+        self._namespace = namespace
+        self._max_workers = max_workers
+        self._fsync = fsync
+        self._on_progress = on_progress
+        self._progress_every = progress_every
+        self._write_configuration = ExtendedResponseConfiguration(return_payload=False)
+
+    def _write(self, journal: ImportJournal, report: ImportReport, instance_id: UUID, external_identifier: str, payload: Dict[str, Any]) -> None:
+        try:
+            error = self._client.instances.create_new_with_id(payload, instance_id, self._space, self._write_configuration).error
+        except Exception as e:
+            error = Error(code=0, message=str(e))
+        if error is None or error.code == 409:
+            outcome = "created" if error is None else "existing"
+            try:
+                journal.append(instance_id, external_identifier, outcome)
+            except Exception as e:
+                # The write is not recorded - so it is not completed either (the next run repeats it)
+                report._count("failed", external_identifier, Error(code=0, message=f"The write couldn't be journaled: {e}"))
+                raise
+            completed = report._count(outcome)
+        else:
+            completed = report._count("failed", external_identifier, error)
+        if self._on_progress and completed % self._progress_every == 0:
+            self._on_progress(report)
+
+    def run(self, records: Iterable[Tuple[str, Dict[str, Any]]]) -> ImportReport:
+        report = ImportReport()
+        journal = ImportJournal(self._journal_path, self._fsync)
+        # Bounds the number of queued writes - the records are consumed lazily
+        slots = threading.BoundedSemaphore(self._max_workers * 2)
+        failures: List[BaseException] = []
+
+        def write(instance_id: UUID, external_identifier: str, payload: Dict[str, Any]) -> None:
+            try:
+                self._write(journal, report, instance_id, external_identifier, payload)
+            finally:
+                slots.release()
+
+        def record_failure(future: Future) -> None:
+            exception = future.exception()
+            if exception is not None:
+                failures.append(exception)
+
+        try:
+            with ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix="kg-bulk-import") as executor:
+                for external_identifier, payload in records:
+                    if failures:
+                        break
+                    instance_id = deterministic_id(external_identifier, self._namespace)
+                    if instance_id in journal:
+                        report._count("skipped")
+                        continue
+                    slots.acquire()
+                    executor.submit(write, instance_id, external_identifier, payload).add_done_callback(record_failure)
+        finally:
+            journal.close()
+            report.duration_in_ms = int((time.time() - report._started) * 1000)
+        if failures:
+            raise failures[0]
+        return report
@@ -0,0 +1,223 @@
+#  Copyright 2022 EBRAINS AISBL
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0.
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+#  This open source software code was developed in part or in whole in the
+#  Human Brain Project, funded from the European Union's Horizon 2020
+#  Framework Programme for Research and Innovation under
+#  Specific Grant Agreements No. 720270, No. 785907, and No. 945539
+#  (Human Brain Project SGA1, SGA2 and SGA3).
+#
+
+from __future__ import annotations
+
+import json
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from kg_core.__communication import KGConfig, KGRequestWithResponseContext
+from kg_core.operations import find_operation
+from kg_core.request import Stage
+
+_SINGLE_INSTANCE = re.compile(r"^instances/([0-9a-fA-F-]{36})$")
+_INSTANCE_SUBRESOURCE = re.compile(r"^instances/([0-9a-fA-F-]{36})(/.*)?$")
+
+
+class InstanceCache(object):
+    """
+    A persistent (SQLite-backed) cache for instances which is consulted by Instances.get_by_id / Instances.get_by_ids
+    before going to the network. Entries are keyed by instance id, stage and response configuration.
+
+    By default, only RELEASED instances are cached since they rarely change. If "offline" is set, the cache is the
+    only source of data - instances not in the cache are reported as not found and every other request (e.g. of
+    another stage or endpoint) fails with 503 without contacting the KG.
+    """
+
+    def __init__(self, path: str, max_entries: Optional[int] = None, max_size_in_bytes: Optional[int] = None, compress: bool = True, offline: bool = False,
+                 stages: Iterable[str] = (Stage.RELEASED,), ttl_in_seconds: Optional[float] = None):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_size_in_bytes = max_size_in_bytes
+        self.compress = compress
+        self.offline = offline
+        self.stages = set(stages)
+        self.ttl_in_seconds = ttl_in_seconds
+        self._lock = threading.Lock()
+        self._bypass = threading.local()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("CREATE TABLE IF NOT EXISTS instances (key TEXT PRIMARY KEY, instance_id TEXT NOT NULL, document BLOB NOT NULL, compressed INTEGER NOT NULL, size INTEGER NOT NULL, created REAL NOT NULL, last_access REAL NOT NULL)")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS instances_by_id ON instances (instance_id)")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS instances_by_last_access ON instances (last_access)")
+
+    @staticmethod
+    def _key(instance_id: str, stage: str, configuration: str) -> str:
+        return f"{instance_id}|{stage}|{configuration}"
+
+    @staticmethod
+    def configuration_key(params: Dict[str, Any]) -> str:
+        """ the part of the request parameters (besides the stage) which has an influence on the returned document """
+        return json.dumps({k: v for k, v in params.items() if k != "stage" and v is not None}, sort_keys=True, default=str)
+
+    def _encode(self, document: Dict[str, Any]) -> bytes:
+        encoded = json.dumps(document, separators=(",", ":")).encode("utf-8")
+        return zlib.compress(encoded) if self.compress else encoded
+
+    @staticmethod
+    def _decode(value: bytes, compressed: int) -> Dict[str, Any]:
+        return json.loads(zlib.decompress(value) if compressed else value)
+
+    def get_many(self, instance_ids: Iterable[str], stage: str, configuration: str) -> Dict[str, Dict[str, Any]]:
+        """ returns the cached documents (by lower-cased instance id) for the given ids - ids which are not cached are not part of the result """
+        ids = list({i.lower() for i in instance_ids})
+        if not ids:
+            return {}
+        keys = [self._key(i, stage, configuration) for i in ids]
+        now = time.time()
+        result: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            for chunk_start in range(0, len(keys), 500):
+                chunk = keys[chunk_start:chunk_start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._connection.execute(f"SELECT instance_id, document, compressed, created FROM instances WHERE key IN ({placeholders})", chunk).fetchall()
+                for instance_id, document, compressed, created in rows:
+                    if self.offline or self.ttl_in_seconds is None or created + self.ttl_in_seconds > now:
+                        result[instance_id] = self._decode(document, compressed)
+                self._connection.execute(f"UPDATE instances SET last_access = ? WHERE key IN ({placeholders})", [now, *chunk])
+        return result
+
+    def get(self, instance_id: str, stage: str, configuration: str) -> Optional[Dict[str, Any]]:
+        return self.get_many([instance_id], stage, configuration).get(instance_id.lower())
+
+    def put_many(self, documents: Dict[str, Dict[str, Any]], stage: str, configuration: str) -> None:
+        now = time.time()
+        rows = []
+        for instance_id, document in documents.items():
+            encoded = self._encode(document)
+            rows.append((self._key(instance_id.lower(), stage, configuration), instance_id.lower(), encoded, 1 if self.compress else 0, len(encoded), now, now))
+        if rows:
+            with self._lock:
+                self._connection.executemany("INSERT OR REPLACE INTO instances (key, instance_id, document, compressed, size, created, last_access) VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+                self._evict()
+
+    def put(self, instance_id: str, stage: str, configuration: str, document: Dict[str, Any]) -> None:
+        self.put_many({instance_id: document}, stage, configuration)
+
+    def invalidate(self, instance_id: str) -> None:
+        """ removes all cached representations of the given instance (independent of stage and response configuration) """
+        with self._lock:
+            self._connection.execute("DELETE FROM instances WHERE instance_id = ?", (instance_id.lower(),))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._connection.execute("DELETE FROM instances")
+
+    @contextmanager
+    def bypassed(self) -> Iterator[None]:
+        """ within the block, the requests of the current thread are sent to the KG without consulting the cache (e.g. to read the current state before a write) - written instances are still invalidated """
+        previous = getattr(self._bypass, "active", False)
+        self._bypass.active = True
+        try:
+            yield
+        finally:
+            self._bypass.active = previous
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    def _evict(self) -> None:
+        # Needs to be called while holding the lock. We remove the least recently used entries until we're within our limits again.
+        while True:
+            entries, size = self._connection.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM instances").fetchone()
+            to_remove = 0
+            if self.max_entries is not None and entries > self.max_entries:
+                to_remove = entries - self.max_entries
+            elif self.max_size_in_bytes is not None and size > self.max_size_in_bytes and entries:
+                # We remove at least one entry but try to get rid of the exceeding bytes in one go based on the average size
+                to_remove = max(1, int((size - self.max_size_in_bytes) / (size / entries)))
+            if not to_remove:
+                return
+            self._connection.execute("DELETE FROM instances WHERE key IN (SELECT key FROM instances ORDER BY last_access LIMIT ?)", (to_remove,))
+
+    @staticmethod
+    def _not_in_cache(instance_id: str) -> Dict[str, Any]:
+        return {"code": 404, "message": f"Instance {instance_id} is not available in the offline cache"}
+
+    @staticmethod
+    def _not_available_offline(method: str, path: str, args: Dict[str, Any], payload: Optional[Any], kg_config: KGConfig) -> KGRequestWithResponseContext:
+        error = {"code": 503, "message": f"{method} {path} can't be answered by the offline cache"}
+        return KGRequestWithResponseContext({"error": error}, args, payload, 503, kg_config)
+
+    def request(self, method: str, path: str, args: Dict[str, Any], payload: Optional[Any], kg_config: KGConfig,
+                do_request: Callable[[Dict[str, Any], Optional[Any]], KGRequestWithResponseContext]) -> KGRequestWithResponseContext:
+        """ handles a request by the cache if possible - delegates to do_request otherwise """
+        params: Dict[str, Any] = args.get("params") or {}
+        stage = params.get("stage")
+        if getattr(self._bypass, "active", False):
+            stage = None
+        if method == "GET" and stage in self.stages:
+            single = _SINGLE_INSTANCE.match(path)
+            if single:
+                return self._get_single(single.group(1), stage, args, payload, kg_config, do_request)
+        elif method == "POST" and path == "instancesByIds" and stage in self.stages and isinstance(payload, list):
+            return self._get_many(payload, stage, args, kg_config, do_request)
+        if self.offline:
+            return self._not_available_offline(method, path, args, payload, kg_config)
+        result = do_request(args, payload)
+        operation = find_operation(method, path)
+        if operation is None or not operation.safe:
+            modified = _INSTANCE_SUBRESOURCE.match(path)
+            if modified:
+                self.invalidate(modified.group(1))
+        return result
+
+    def _get_single(self, instance_id: str, stage: str, args: Dict[str, Any], payload: Optional[Any], kg_config: KGConfig,
+                    do_request: Callable[[Dict[str, Any], Optional[Any]], KGRequestWithResponseContext]) -> KGRequestWithResponseContext:
+        configuration = self.configuration_key(args["params"])
+        cached = self.get(instance_id, stage, configuration)
+        if cached is not None:
+            return KGRequestWithResponseContext({"data": cached}, args, payload, 200, kg_config)
+        elif self.offline:
+            return KGRequestWithResponseContext({"error": self._not_in_cache(instance_id)}, args, payload, 404, kg_config)
+        result = do_request(args, payload)
+        if result.status_code == 200 and result.content and result.content.get("data"):
+            self.put(instance_id, stage, configuration, result.content["data"])
+        return result
+
+    def _get_many(self, instance_ids: List[Any], stage: str, args: Dict[str, Any], kg_config: KGConfig,
+                  do_request: Callable[[Dict[str, Any], Optional[Any]], KGRequestWithResponseContext]) -> KGRequestWithResponseContext:
+        configuration = self.configuration_key(args["params"])
+        requested = [str(i) for i in instance_ids]
+        cached = self.get_many(requested, stage, configuration)
+        missing = [i for i in requested if i.lower() not in cached]
+        data: Dict[str, Any] = {i: {"data": cached[i.lower()]} for i in requested if i.lower() in cached}
+        if missing:
+            if self.offline:
+                for i in missing:
+                    data[i] = {"error": self._not_in_cache(i)}
+            else:
+                result = do_request(args, missing)
+                if result.status_code != 200 or not result.content:
+                    return result
+                fetched = result.content.get("data") or {}
+                self.put_many({k: v["data"] for k, v in fetched.items() if v and v.get("data")}, stage, configuration)
+                content = dict(result.content)
+                content["data"] = {**data, **fetched}
+                return KGRequestWithResponseContext(content, args, instance_ids, result.status_code, kg_config)
+        return KGRequestWithResponseContext({"data": data}, args, instance_ids, 200, kg_config)
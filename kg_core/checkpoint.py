@@ -0,0 +1,122 @@
+#  Copyright 2022 EBRAINS AISBL
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0.
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+#  This open source software code was developed in part or in whole in the
+#  Human Brain Project, funded from the European Union's Horizon 2020
+#  Framework Programme for Research and Innovation under
+#  Specific Grant Agreements No. 720270, No. 785907, and No. 945539
+#  (Human Brain Project SGA1, SGA2 and SGA3).
+#
+
+from __future__ import annotations
+
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Optional
+
+
+class Checkpoint(object):
+    """ The position of an iteration: the next page to be loaded ("start_from" / "size") of the request identified by the fingerprint """
+
+    def __init__(self, fingerprint: str, start_from: int, size: int, items: int, url: Optional[str] = None, timestamp: Optional[float] = None):
+        self.fingerprint = fingerprint
+        self.start_from = start_from
+        self.size = size
+        self.items = items
+        self.url = url
+        self.timestamp = timestamp if timestamp is not None else time.time()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"fingerprint": self.fingerprint, "from": self.start_from, "size": self.size, "items": self.items, "url": self.url, "timestamp": self.timestamp}
+
+    @staticmethod
+    def from_dict(value: Dict[str, Any]) -> Checkpoint:
+        return Checkpoint(value["fingerprint"], value["from"], value["size"], value.get("items", 0), value.get("url"), value.get("timestamp"))
+
+    def __str__(self):
+        return f"Checkpoint of {self.url or self.fingerprint} at {self.start_from} ({self.items} items processed)"
+
+
+class CheckpointStore(ABC):
+    """
+    Persists the position of an iteration with ResultPage.items(checkpoint=...). A checkpoint is saved after every
+    "every_pages" completed pages (a page is completed once the iteration asks for the item following its last one)
+    and removed once the iteration has reached the end.
+    """
+
+    def __init__(self, every_pages: int = 1):
+        if every_pages < 1:
+            raise ValueError("A checkpoint needs to be saved at least every page")
+        self.every_pages = every_pages
+
+    @abstractmethod
+    def load(self) -> Optional[Checkpoint]:
+        pass
+
+    @abstractmethod
+    def save(self, checkpoint: Checkpoint) -> None:
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        pass
+
+
+class FileCheckpointStore(CheckpointStore):
+    """ Keeps the checkpoint as JSON file - written atomically so a crash while saving doesn't lose the previous checkpoint """
+
+    def __init__(self, path: str, every_pages: int = 1):
+        super(FileCheckpointStore, self).__init__(every_pages)
+        self.path = path
+
+    def load(self) -> Optional[Checkpoint]:
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path) as f:
+            return Checkpoint.from_dict(json.load(f))
+
+    def save(self, checkpoint: Checkpoint) -> None:
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w") as f:
+            json.dump(checkpoint.to_dict(), f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.path)
+
+    def clear(self) -> None:
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class CallbackCheckpointStore(CheckpointStore):
+    """ Hands the checkpoints to the given callbacks - e.g. to persist them together with the results in the same transaction """
+
+    def __init__(self, on_save: Callable[[Checkpoint], None], on_load: Optional[Callable[[], Optional[Checkpoint]]] = None,
+                 on_clear: Optional[Callable[[], None]] = None, every_pages: int = 1):
+        super(CallbackCheckpointStore, self).__init__(every_pages)
+        self._on_save = on_save
+        self._on_load = on_load
+        self._on_clear = on_clear
+
+    def load(self) -> Optional[Checkpoint]:
+        return self._on_load() if self._on_load else None
+
+    def save(self, checkpoint: Checkpoint) -> None:
+        self._on_save(checkpoint)
+
+    def clear(self) -> None:
+        if self._on_clear:
+            self._on_clear()
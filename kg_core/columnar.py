@@ -0,0 +1,133 @@
+#  Copyright 2022 EBRAINS AISBL
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0.
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+#  This open source software code was developed in part or in whole in the
+#  Human Brain Project, funded from the European Union's Horizon 2020
+#  Framework Programme for Research and Innovation under
+#  Specific Grant Agreements No. 720270, No. 785907, and No. 945539
+#  (Human Brain Project SGA1, SGA2 and SGA3).
+#
+
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+
+class ColumnBuilder(object):
+    """
+    Collects JSON-LD documents into columns (one list per column) instead of one dict per row.
+
+    Flattening rules:
+     - JSON-LD keywords lose their "@" ("@id" -> "id", "@type" -> "type")
+     - vocabulary IRIs are shortened to their local name ("https://openminds.ebrains.eu/vocab/fullName" -> "fullName").
+       If two different IRIs share the same local name, the one seen later keeps its full IRI.
+     - references ({"@id": ...}) are reduced to their identifier, value objects ({"@value": ...}) to their value
+     - nested objects are flattened into "parent.child" columns
+     - lists stay lists (of identifiers, values or - for nested objects - dicts with shortened keys)
+     - rows without a value for a column are filled with None
+    """
+
+    def __init__(self, shorten_keys: bool = True, separator: str = "."):
+        self._shorten_keys = shorten_keys
+        self._separator = separator
+        self._columns: Dict[str, List[Any]] = {}
+        self._key_names: Dict[str, str] = {}
+        self._taken_names: Dict[str, str] = {}
+        self.rows = 0
+
+    def _name(self, key: str) -> str:
+        name = self._key_names.get(key)
+        if name is None:
+            name = key
+            if self._shorten_keys:
+                if key.startswith("@"):
+                    name = key[1:]
+                else:
+                    name = key[max(key.rfind("/"), key.rfind("#")) + 1:] or key
+                if self._taken_names.setdefault(name, key) != key:
+                    name = key
+            self._key_names[key] = name
+        return name
+
+    def _value(self, value: Any) -> Any:
+        if isinstance(value, Mapping):
+            if "@id" in value:
+                return value["@id"]
+            elif "@value" in value:
+                return value["@value"]
+            return {self._name(k): self._value(v) for k, v in value.items()}
+        elif isinstance(value, list):
+            return [self._value(v) for v in value]
+        return value
+
+    def _set(self, column: str, value: Any) -> None:
+        values = self._columns.get(column)
+        if values is None:
+            values = [None] * self.rows
+            self._columns[column] = values
+        elif len(values) > self.rows:
+            # The column has already been written for this row (e.g. because of a name collision) - last one wins
+            values[-1] = value
+            return
+        elif len(values) < self.rows:
+            values.extend([None] * (self.rows - len(values)))
+        values.append(value)
+
+    def _flatten(self, document: Mapping[str, Any], prefix: Optional[str]) -> None:
+        for key, value in document.items():
+            column = self._name(key) if prefix is None else f"{prefix}{self._separator}{self._name(key)}"
+            if isinstance(value, Mapping) and "@id" not in value and "@value" not in value:
+                self._flatten(value, column)
+            else:
+                self._set(column, self._value(value))
+
+    def append(self, document: Any) -> None:
+        if not isinstance(document, Mapping):
+            # pydantic models iterate as (field name, value) pairs
+            document = dict(document)
+        self._flatten(document, None)
+        self.rows += 1
+
+    def extend(self, documents: Iterable[Any]) -> None:
+        for d in documents:
+            self.append(d)
+
+    def columns(self) -> Dict[str, List[Any]]:
+        """ returns the collected columns - all of them padded to the number of appended rows """
+        for values in self._columns.values():
+            if len(values) < self.rows:
+                values.extend([None] * (self.rows - len(values)))
+        return self._columns
+
+    def to_arrow(self) -> Any:
+        try:
+            import pyarrow  # type: ignore
+        except ImportError as e:
+            raise ImportError("The conversion to an arrow table requires pyarrow - please install it (e.g. with \"pip install pyarrow\")") from e
+        arrays = {}
+        for name, values in self.columns().items():
+            try:
+                arrays[name] = pyarrow.array(values)
+            except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError, TypeError):
+                # Heterogeneous columns (e.g. a single value in some rows, a list in others) can't be typed by arrow - we therefore keep them as JSON strings
+                arrays[name] = pyarrow.array([None if v is None else json.dumps(v) for v in values], type=pyarrow.string())
+        return pyarrow.table(arrays)
+
+    def to_pandas(self) -> Any:
+        try:
+            import pandas  # type: ignore
+        except ImportError as e:
+            raise ImportError("The conversion to a data frame requires pandas - please install it (e.g. with \"pip install pandas\")") from e
+        return pandas.DataFrame(self.columns())
@@ -0,0 +1,163 @@
+#  Copyright 2022 EBRAINS AISBL
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0.
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+#  This open source software code was developed in part or in whole in the
+#  Human Brain Project, funded from the European Union's Horizon 2020
+#  Framework Programme for Research and Innovation under
+#  Specific Grant Agreements No. 720270, No. 785907, and No. 945539
+#  (Human Brain Project SGA1, SGA2 and SGA3).
+#
+
+from __future__ import annotations
+
+import uuid
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Union
+from uuid import UUID
+
+
+class UUIDInterner(object):
+    """
+    Converts between absolute instance ids (e.g. "https://kg.ebrains.eu/api/instances/<uuid>") and UUIDs - in batches
+    (lists, nested lists, pandas series or arrow arrays) and backed by an interning table: every identifier is parsed
+    only once and all its occurrences share the same UUID (and absolute id string) object.
+
+    The table is bounded: it keeps two generations of up to "max_size" identifiers each. When the young generation is
+    full, it becomes the old one (and the previous old one is dropped) - identifiers found in the old generation are
+    promoted back to the young one. So recently used identifiers stay interned without any bookkeeping per lookup.
+
+    Bare UUID strings are accepted as well - anything else (e.g. ids of another namespace) is converted to None.
+    """
+
+    def __init__(self, id_namespace: str, max_size: int = 500000):
+        self.id_namespace = id_namespace
+        self.max_size = max_size
+        self._uuids: Dict[Any, Optional[UUID]] = {}
+        self._old_uuids: Dict[Any, Optional[UUID]] = {}
+        self._ids: Dict[UUID, str] = {}
+        self._old_ids: Dict[UUID, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._uuids) + len(self._old_uuids)
+
+    def clear(self) -> None:
+        self._uuids, self._old_uuids, self._ids, self._old_ids = {}, {}, {}, {}
+
+    def _parse(self, value: str) -> Optional[UUID]:
+        try:
+            if value.startswith(self.id_namespace):
+                return uuid.UUID(value[len(self.id_namespace):])
+            return uuid.UUID(value)
+        except ValueError:
+            return None
+
+    def _intern_uuid(self, key: Any, value: Optional[UUID]) -> Optional[UUID]:
+        if len(self._uuids) >= self.max_size:
+            self._old_uuids, self._uuids = self._uuids, {}
+        self._uuids[key] = value
+        return value
+
+    def _uuid_miss(self, value: Any) -> Any:
+        if value is None:
+            return None
+        if isinstance(value, list):
+            return self.to_uuids(value)
+        if isinstance(value, Mapping):
+            return self.to_uuid(value.get("@id"))
+        if isinstance(value, UUID):
+            return self.to_uuid(str(value))
+        if not isinstance(value, str):
+            return None
+        parsed = self._old_uuids.get(value)
+        if parsed is None:
+            parsed = self._parse(value)
+            if parsed is not None:
+                # The same UUID could already be interned by its other representation (absolute id vs. bare UUID)
+                canonical = f"{self.id_namespace}{parsed}"
+                parsed = self._uuids.get(canonical) or self._old_uuids.get(canonical) or parsed
+                if canonical != value:
+                    self._intern_uuid(canonical, parsed)
+        return self._intern_uuid(value, parsed)
+
+    def to_uuid(self, value: Union[str, UUID, None]) -> Optional[UUID]:
+        result = self._uuids.get(value) if value.__class__ is str else None
+        return result if result is not None else self._uuid_miss(value)
+
+    def to_uuids(self, values: Any) -> Any:
+        """ converts the absolute ids (or references {"@id": ...}) of a list, pandas series or arrow array - nested lists are converted element-wise """
+        if hasattr(values, "to_pylist"):
+            values = values.to_pylist()
+        elif hasattr(values, "index") and hasattr(values, "tolist"):
+            import pandas  # type: ignore
+            return pandas.Series(self.to_uuids(values.tolist()), index=values.index, name=values.name, dtype=object)
+        result = []
+        append = result.append
+        uuids = self._uuids
+        miss = self._uuid_miss
+        for v in values:
+            u = uuids.get(v) if v.__class__ is str else None
+            if u is None:
+                u = miss(v)
+                # The generations could have been rotated by the miss
+                uuids = self._uuids
+            append(u)
+        return result
+
+    def _id_miss(self, value: Any) -> Any:
+        if value is None:
+            return None
+        if isinstance(value, list):
+            return self.to_absolute_ids(value)
+        if isinstance(value, str):
+            value = self.to_uuid(value)
+            if value is None:
+                return None
+        absolute_id = self._old_ids.get(value) or f"{self.id_namespace}{value}"
+        if len(self._ids) >= self.max_size:
+            self._old_ids, self._ids = self._ids, {}
+        self._ids[value] = absolute_id
+        return absolute_id
+
+    def to_absolute_id(self, value: Union[UUID, str, None]) -> Optional[str]:
+        result = self._ids.get(value) if value.__class__ is UUID else None
+        return result if result is not None else self._id_miss(value)
+
+    def to_absolute_ids(self, values: Any) -> Any:
+        """ converts the UUIDs of a list, pandas series or arrow array to absolute ids - nested lists are converted element-wise """
+        if hasattr(values, "to_pylist"):
+            values = values.to_pylist()
+        elif hasattr(values, "index") and hasattr(values, "tolist"):
+            import pandas  # type: ignore
+            return pandas.Series(self.to_absolute_ids(values.tolist()), index=values.index, name=values.name, dtype=object)
+        result = []
+        append = result.append
+        ids = self._ids
+        miss = self._id_miss
+        for v in values:
+            i = ids.get(v) if v.__class__ is UUID else None
+            if i is None:
+                i = miss(v)
+                ids = self._ids
+            append(i)
+        return result
+
+    def link_targets(self, documents: Iterable[Mapping[str, Any]], property_name: str) -> List[List[UUID]]:
+        """ the UUIDs of the instances referenced by the given property - one list per document """
+        result = []
+        for document in documents:
+            value = document.get(property_name)
+            if value is None:
+                result.append([])
+            else:
+                result.append([u for u in self.to_uuids(value if isinstance(value, list) else [value]) if u is not None])
+        return result
@@ -0,0 +1,481 @@
+#  Copyright 2022 EBRAINS AISBL
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0.
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+#  This open source software code was developed in part or in whole in the
+#  Human Brain Project, funded from the European Union's Horizon 2020
+#  Framework Programme for Research and Innovation under
+#  Specific Grant Agreements No. 720270, No. 785907, and No. 945539
+#  (Human Brain Project SGA1, SGA2 and SGA3).
+#
+
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urljoin
+
+import requests
+
+_UNSUPPORTED_KEYWORDS = ("@reverse", "@graph", "@nest", "@included", "@index", "@json", "@propagate", "@protected", "@import", "@direction", "@prefix")
+_SUPPORTED_CONTAINERS = ("@list", "@set")
+_MAX_REMOTE_CONTEXTS = 32
+
+
+class UnsupportedJsonLd(ValueError):
+    """ The document uses a JSON-LD feature which is not supported by the local normalizer - use Jsonld.normalize_payload of the KG instead """
+    pass
+
+
+def _context_key(parent_key: str, context: Any) -> str:
+    return hashlib.sha256(f"{parent_key}|{json.dumps(context, sort_keys=True)}".encode("utf-8")).hexdigest()
+
+
+def _is_keyword(value: Any) -> bool:
+    return isinstance(value, str) and value.startswith("@") and value[1:].isalpha()
+
+
+def _is_absolute(iri: str) -> bool:
+    return ":" in iri
+
+
+class _TermDefinition(object):
+
+    def __init__(self, iri: Optional[str], type_mapping: Optional[str] = None, container: Optional[str] = None, language: Any = False, context: Any = None, prefix: bool = True):
+        self.iri = iri
+        self.type_mapping = type_mapping
+        self.container = container
+        # False means "not defined" (the default language of the context applies) - None explicitly removes the language
+        self.language = language
+        self.context = context
+        self.prefix = prefix
+
+
+class _ActiveContext(object):
+
+    def __init__(self, key: str = "", terms: Optional[Dict[str, Optional[_TermDefinition]]] = None, vocab: Optional[str] = None, base: Optional[str] = None,
+                 language: Optional[str] = None, previous: Optional[_ActiveContext] = None):
+        self.key = key
+        self.terms: Dict[str, Optional[_TermDefinition]] = terms or {}
+        self.vocab = vocab
+        self.base = base
+        self.language = language
+        # The context before a type scoped one - nested nodes revert to it since type scoped contexts don't propagate
+        self.previous = previous
+
+    def copy(self, key: str) -> _ActiveContext:
+        return _ActiveContext(key, dict(self.terms), self.vocab, self.base, self.language, self.previous)
+
+
+class ContextCache(object):
+    """
+    Caches both the remote contexts (by their URL - for "ttl_in_seconds" if defined) and the processed contexts, so a
+    context shared by many documents is only fetched and processed once. The number of processed contexts is bounded by
+    "max_size" (least recently used ones are evicted) - processed contexts which include a remote one expire with it. Remote contexts are fetched with requests unless a
+    "document_loader" (returning the JSON document of a URL) is given. The cache can be shared by several threads.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl_in_seconds: Optional[float] = None, document_loader: Optional[Callable[[str], Any]] = None):
+        self.max_size = max_size
+        self.ttl_in_seconds = ttl_in_seconds
+        self._document_loader = document_loader or self._load_document
+        self._remote: Dict[str, Tuple[float, Any]] = {}
+        self._processed: OrderedDict[Tuple[str, str, bool], Tuple[_ActiveContext, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        # The expiry of the context which is currently processed (per thread) - lowered by the remote contexts it includes
+        self._expiries = threading.local()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _load_document(url: str) -> Any:
+        response = requests.get(url, headers={"Accept": "application/ld+json, application/json"})
+        response.raise_for_status()
+        return response.json()
+
+    def _depends_on(self, expires_at: float) -> None:
+        stack: Optional[List[float]] = getattr(self._expiries, "stack", None)
+        if stack:
+            stack[-1] = min(stack[-1], expires_at)
+
+    def remote_context(self, url: str) -> Any:
+        """ the "@context" of the JSON-LD document at the given URL """
+        with self._lock:
+            cached = self._remote.get(url)
+        if cached is None or (self.ttl_in_seconds is not None and cached[0] + self.ttl_in_seconds <= time.time()):
+            document = self._document_loader(url)
+            if not isinstance(document, dict) or "@context" not in document:
+                raise ValueError(f"The document at {url} doesn't provide a JSON-LD context")
+            cached = (time.time(), document["@context"])
+            with self._lock:
+                self._remote[url] = cached
+        if self.ttl_in_seconds is not None:
+            self._depends_on(cached[0] + self.ttl_in_seconds)
+        return cached[1]
+
+    def get(self, active_context: _ActiveContext, local_context: Any, process: Callable[[], _ActiveContext], propagate: bool = True) -> _ActiveContext:
+        key = (active_context.key, json.dumps(local_context, sort_keys=True), propagate)
+        with self._lock:
+            cached = self._processed.get(key)
+            if cached is not None and cached[1] > time.time():
+                self._processed.move_to_end(key)
+                self.hits += 1
+            else:
+                cached = None
+                self.misses += 1
+        if cached is not None:
+            self._depends_on(cached[1])
+            return cached[0]
+        stack: Optional[List[float]] = getattr(self._expiries, "stack", None)
+        if stack is None:
+            stack = self._expiries.stack = []
+        stack.append(float("inf"))
+        try:
+            processed = process()
+        finally:
+            expires_at = stack.pop()
+        self._depends_on(expires_at)
+        with self._lock:
+            self._processed[key] = (processed, expires_at)
+            if len(self._processed) > self.max_size:
+                self._processed.popitem(last=False)
+        return processed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._remote.clear()
+            self._processed.clear()
+
+
+class JsonLdNormalizer(object):
+    """
+    Normalizes JSON-LD documents locally the same way as Jsonld.normalize_payload does on the KG: the document is
+    expanded (the contexts are applied to keys, types, identifiers and values) and compacted without any context again -
+    so all keys are fully qualified IRIs, single values are not wrapped in arrays and plain literals are not wrapped in
+    value objects. As the KG does, properties with null values are kept (they reset properties on partial updates)
+    unless "keep_null_values" is disabled.
+
+    Supported are the features commonly used for KG payloads: inline and remote contexts (also as lists), @vocab, @base,
+    prefixes/compact IRIs, keyword aliases, type coercion (@id, @vocab and datatypes), default and term languages,
+    @list and @set containers as well as property and type scoped contexts. Documents using other features (e.g. @reverse,
+    @graph, @nest or other containers) raise an UnsupportedJsonLd error.
+    """
+
+    def __init__(self, context_cache: Optional[ContextCache] = None, keep_null_values: bool = True):
+        self.context_cache = context_cache or ContextCache()
+        self.keep_null_values = keep_null_values
+
+    def normalize(self, document: Dict[str, Any]) -> Dict[str, Any]:
+        if not isinstance(document, dict):
+            raise ValueError("Only single JSON-LD documents (JSON objects) can be normalized")
+        expanded = self._expand(_ActiveContext(), document, None)
+        if expanded is None:
+            return {}
+        if isinstance(expanded, list):
+            if len(expanded) != 1:
+                raise UnsupportedJsonLd("The document expands to several nodes")
+            expanded = expanded[0]
+        return self._compact(expanded)
+
+    def normalize_batch(self, documents: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """ lazily normalizes the given documents - all of them share the context cache, so their contexts are fetched and processed only once """
+        for document in documents:
+            yield self.normalize(document)
+
+    # ------------------------------------------------------------------ context processing
+
+    def _process_context(self, active_context: _ActiveContext, local_context: Any, remote_contexts: Tuple[str, ...] = (), propagate: bool = True) -> _ActiveContext:
+        return self.context_cache.get(active_context, local_context, lambda: self._process_context_uncached(active_context, local_context, remote_contexts, propagate), propagate)
+
+    def _process_context_uncached(self, active_context: _ActiveContext, local_context: Any, remote_contexts: Tuple[str, ...], propagate: bool = True) -> _ActiveContext:
+        result = active_context
+        for context in local_context if isinstance(local_context, list) else [local_context]:
+            if context is None:
+                result = _ActiveContext(_context_key(result.key, None), base=result.base)
+            elif isinstance(context, str):
+                url = urljoin(result.base, context) if result.base else context
+                if url in remote_contexts or len(remote_contexts) >= _MAX_REMOTE_CONTEXTS:
+                    raise ValueError(f"Recursive inclusion of the remote context {url}")
+                result = self._process_context(result, self.context_cache.remote_context(url), remote_contexts + (url,))
+            elif isinstance(context, dict):
+                result = self._process_local_context(result, context)
+            else:
+                raise ValueError(f"Invalid JSON-LD context: {context}")
+        if not propagate and result.previous is None:
+            result = result.copy(_context_key(result.key, "@propagate: false"))
+            result.previous = active_context
+        return result
+
+    def _process_local_context(self, active_context: _ActiveContext, context: Dict[str, Any]) -> _ActiveContext:
+        result = active_context.copy(_context_key(active_context.key, context))
+        for keyword in _UNSUPPORTED_KEYWORDS:
+            if keyword in context:
+                raise UnsupportedJsonLd(f"{keyword} in contexts is not supported")
+        if "@base" in context:
+            base = context["@base"]
+            result.base = urljoin(result.base, base) if base is not None and result.base else base
+        if "@vocab" in context:
+            vocab = context["@vocab"]
+            result.vocab = self._expand_iri(result, vocab, vocab=True, document_relative=True) if vocab is not None else None
+        if "@language" in context:
+            result.language = context["@language"].lower() if context["@language"] is not None else None
+        defined: Dict[str, bool] = {}
+        for term in context:
+            if term not in ("@base", "@vocab", "@language", "@version"):
+                self._create_term(result, context, term, defined)
+        return result
+
+    def _create_term(self, active_context: _ActiveContext, local_context: Dict[str, Any], term: str, defined: Dict[str, bool]) -> None:
+        if term in defined:
+            if not defined[term]:
+                raise ValueError(f"Cyclic IRI mapping of the term {term}")
+            return
+        defined[term] = False
+        if _is_keyword(term):
+            raise ValueError(f"Keywords can't be redefined: {term}")
+        value = local_context[term]
+        if value is None or (isinstance(value, dict) and "@id" in value and value["@id"] is None):
+            active_context.terms[term] = None
+            defined[term] = True
+            return
+        simple_term = isinstance(value, str)
+        if simple_term:
+            value = {"@id": value}
+        elif not isinstance(value, dict):
+            raise ValueError(f"Invalid definition of the term {term}")
+        for keyword in _UNSUPPORTED_KEYWORDS:
+            if keyword in value:
+                raise UnsupportedJsonLd(f"{keyword} in the definition of the term {term} is not supported")
+        if "@id" in value and value["@id"] != term:
+            iri = self._expand_iri(active_context, value["@id"], vocab=True, local_context=local_context, defined=defined)
+            if not _is_keyword(iri) and not _is_absolute(iri):
+                raise ValueError(f"Invalid IRI mapping of the term {term}")
+        elif ":" in term:
+            # Only the prefix is resolved - expanding the whole term would define the term itself again
+            iri = self._expand_compact_iri(active_context, term, local_context, defined)
+        elif active_context.vocab is not None:
+            iri = f"{active_context.vocab}{term}"
+        else:
+            raise ValueError(f"The term {term} can't be mapped to an IRI (there is no @vocab)")
+        type_mapping = None
+        if "@type" in value:
+            type_mapping = value["@type"]
+            if type_mapping not in ("@id", "@vocab", "@none"):
+                type_mapping = self._expand_iri(active_context, type_mapping, vocab=True, local_context=local_context, defined=defined)
+        container = value.get("@container")
+        if isinstance(container, list):
+            container = container[0] if len(container) == 1 else container
+        if container is not None and container not in _SUPPORTED_CONTAINERS:
+            raise UnsupportedJsonLd(f"The container {container} of the term {term} is not supported")
+        language = value["@language"].lower() if isinstance(value.get("@language"), str) else value.get("@language", False)
+        # Only simple terms mapped to an IRI ending with a gen-delim character can be used as prefixes (as of JSON-LD 1.1)
+        prefix = simple_term and ":" not in term and "/" not in term and not _is_keyword(iri) and iri[-1:] in ":/?#[]@"
+        active_context.terms[term] = _TermDefinition(iri, type_mapping, container, language, value.get("@context"), prefix)
+        defined[term] = True
+
+    def _expand_iri(self, active_context: _ActiveContext, value: Any, vocab: bool = False, document_relative: bool = False, local_context: Optional[Dict[str, Any]] = None,
+                    defined: Optional[Dict[str, bool]] = None) -> Any:
+        if value is None or _is_keyword(value):
+            return value
+        if not isinstance(value, str):
+            raise ValueError(f"Invalid IRI: {value}")
+        if value.startswith("@"):
+            # Looks like a keyword - ignored as JSON-LD processors do
+            return None
+        if local_context is not None and value in local_context and defined is not None and not defined.get(value):
+            self._create_term(active_context, local_context, value, defined)
+        if vocab and value in active_context.terms:
+            definition = active_context.terms[value]
+            return definition.iri if definition else None
+        if ":" in value:
+            return self._expand_compact_iri(active_context, value, local_context, defined)
+        if vocab and active_context.vocab is not None:
+            return f"{active_context.vocab}{value}"
+        if document_relative and active_context.base:
+            return urljoin(active_context.base, value)
+        return value
+
+    def _expand_compact_iri(self, active_context: _ActiveContext, value: str, local_context: Optional[Dict[str, Any]], defined: Optional[Dict[str, bool]]) -> str:
+        prefix, suffix = value.split(":", 1)
+        if prefix == "_" or suffix.startswith("//"):
+            return value
+        if local_context is not None and prefix in local_context and defined is not None and not defined.get(prefix):
+            self._create_term(active_context, local_context, prefix, defined)
+        definition = active_context.terms.get(prefix)
+        if definition and definition.iri and definition.prefix:
+            return f"{definition.iri}{suffix}"
+        return value
+
+    # ------------------------------------------------------------------ expansion
+
+    def _expand(self, active_context: _ActiveContext, element: Any, active_property: Optional[str]) -> Any:
+        if element is None:
+            return None
+        if isinstance(element, list):
+            result = []
+            definition = active_context.terms.get(active_property) if active_property else None
+            for item in element:
+                expanded = self._expand(active_context, item, active_property)
+                if isinstance(expanded, list):
+                    if definition and definition.container == "@list":
+                        raise UnsupportedJsonLd("Lists of lists are not supported")
+                    result.extend(expanded)
+                elif expanded is not None:
+                    result.append(expanded)
+            return result
+        property_definition = active_context.terms.get(active_property) if active_property else None
+        if not isinstance(element, dict):
+            if active_property is None:
+                # Free floating scalars are dropped
+                return None
+            if property_definition and property_definition.context is not None:
+                active_context = self._process_context(active_context, property_definition.context)
+            return self._expand_value(active_context, active_property, element)
+        if active_context.previous is not None and not self._is_value_or_reference(active_context, element):
+            active_context = active_context.previous
+        if property_definition and property_definition.context is not None:
+            active_context = self._process_context(active_context, property_definition.context)
+        if "@context" in element:
+            active_context = self._process_context(active_context, element["@context"])
+        # The types are expanded with the context before their scoped contexts are applied (in lexicographical order)
+        type_scoped_context = active_context
+        for key in sorted(element):
+            if self._expand_iri(type_scoped_context, key, vocab=True) == "@type":
+                types = element[key] if isinstance(element[key], list) else [element[key]]
+                for term in sorted(t for t in types if isinstance(t, str)):
+                    type_definition = type_scoped_context.terms.get(term)
+                    if type_definition and type_definition.context is not None:
+                        active_context = self._process_context(active_context, type_definition.context, propagate=False)
+        result: Dict[str, Any] = {}
+        for key, value in element.items():
+            if key == "@context":
+                continue
+            expanded_property = self._expand_iri(active_context, key, vocab=True)
+            if expanded_property is None or (not _is_keyword(expanded_property) and not _is_absolute(expanded_property)):
+                continue
+            if _is_keyword(expanded_property):
+                self._expand_keyword(type_scoped_context if expanded_property == "@type" else active_context, result, expanded_property, value, active_property)
+                continue
+            if value is None:
+                if self.keep_null_values:
+                    result[expanded_property] = None
+                continue
+            definition = active_context.terms.get(key)
+            expanded_value = self._expand(active_context, value, key)
+            if expanded_value is None:
+                continue
+            if definition and definition.container == "@list" and not (isinstance(expanded_value, dict) and "@list" in expanded_value):
+                expanded_value = {"@list": expanded_value if isinstance(expanded_value, list) else [expanded_value]}
+            existing = result.get(expanded_property)
+            if not isinstance(existing, list):
+                existing = result[expanded_property] = []
+            existing.extend(expanded_value if isinstance(expanded_value, list) else [expanded_value])
+        return self._post_process(result, active_property)
+
+    def _is_value_or_reference(self, active_context: _ActiveContext, element: Dict[str, Any]) -> bool:
+        keywords = [self._expand_iri(active_context, key, vocab=True) for key in element]
+        return "@value" in keywords or keywords == ["@id"]
+
+    def _expand_keyword(self, active_context: _ActiveContext, result: Dict[str, Any], keyword: str, value: Any, active_property: Optional[str]) -> None:
+        if keyword in _UNSUPPORTED_KEYWORDS:
+            raise UnsupportedJsonLd(f"{keyword} is not supported")
+        if keyword in result:
+            raise ValueError(f"Colliding keywords: {keyword}")
+        if keyword == "@id":
+            if not isinstance(value, str):
+                raise ValueError(f"Invalid @id: {value}")
+            result[keyword] = self._expand_iri(active_context, value, document_relative=True)
+        elif keyword == "@type":
+            values = value if isinstance(value, list) else [value]
+            if not all(isinstance(v, str) for v in values):
+                raise ValueError(f"Invalid @type: {value}")
+            result[keyword] = [self._expand_iri(active_context, v, vocab=True, document_relative=True) for v in values]
+        elif keyword == "@value":
+            if isinstance(value, (dict, list)):
+                raise ValueError(f"Invalid @value: {value}")
+            result[keyword] = value
+        elif keyword == "@language":
+            if not isinstance(value, str):
+                raise ValueError(f"Invalid @language: {value}")
+            result[keyword] = value.lower()
+        elif keyword == "@list":
+            expanded = self._expand(active_context, value, active_property)
+            result[keyword] = expanded if isinstance(expanded, list) else ([expanded] if expanded is not None else [])
+        elif keyword == "@set":
+            result[keyword] = self._expand(active_context, value, active_property)
+
+    @staticmethod
+    def _post_process(result: Dict[str, Any], active_property: Optional[str]) -> Any:
+        if "@value" in result:
+            if not set(result).issubset({"@value", "@type", "@language"}) or ("@type" in result and "@language" in result):
+                raise ValueError(f"Invalid value object: {result}")
+            if result["@value"] is None:
+                return None
+            if "@type" in result:
+                if len(result["@type"]) != 1:
+                    raise ValueError(f"Invalid value object: {result}")
+                result["@type"] = result["@type"][0]
+            return result
+        if "@set" in result or "@list" in result:
+            if len(result) > 1:
+                raise ValueError(f"Invalid set or list object: {result}")
+            if "@set" in result:
+                return result["@set"]
+        elif set(result) == {"@language"}:
+            return None
+        if active_property is None and (not result or "@list" in result or set(result) == {"@id"}):
+            # Free floating values and nodes without any information are dropped at the top level
+            return None
+        return result
+
+    def _expand_value(self, active_context: _ActiveContext, active_property: str, value: Any) -> Dict[str, Any]:
+        definition = active_context.terms.get(active_property)
+        type_mapping = definition.type_mapping if definition else None
+        if isinstance(value, str) and type_mapping == "@id":
+            return {"@id": self._expand_iri(active_context, value, document_relative=True)}
+        if isinstance(value, str) and type_mapping == "@vocab":
+            return {"@id": self._expand_iri(active_context, value, vocab=True, document_relative=True)}
+        result: Dict[str, Any] = {"@value": value}
+        if type_mapping and type_mapping not in ("@id", "@vocab", "@none"):
+            result["@type"] = type_mapping
+        elif isinstance(value, str):
+            language = definition.language if definition and definition.language is not False else active_context.language
+            if language:
+                result["@language"] = language
+        return result
+
+    # ------------------------------------------------------------------ compaction (without a context)
+
+    def _compact(self, element: Any, in_list: bool = False) -> Any:
+        if isinstance(element, list):
+            compacted = [self._compact(i) for i in element]
+            return compacted[0] if len(compacted) == 1 and not in_list else compacted
+        if not isinstance(element, dict):
+            return element
+        if "@value" in element:
+            return element["@value"] if len(element) == 1 else dict(element)
+        result: Dict[str, Any] = {}
+        for key, value in element.items():
+            if key == "@id":
+                result[key] = value
+            elif key == "@type":
+                result[key] = value[0] if len(value) == 1 else list(value)
+            elif key == "@list":
+                result[key] = self._compact(value, in_list=True)
+            else:
+                result[key] = self._compact(value) if value is not None else None
+        return result
@@ -27,8 +27,13 @@ from typing import List, Optional, Dict, Any, Callable, Union, cast
 from uuid import UUID
 
 from kg_core.__communication import TokenHandler, RequestsWithTokenHandler, KGConfig, CallableTokenHandler
+from kg_core.cache import InstanceCache
+from kg_core.identifiers import UUIDInterner
+from kg_core.transport import Http2Transport, Transport
 from kg_core.request import ResponseConfiguration, ExtendedResponseConfiguration, Pagination, Stage, ReleaseTreeScope
-from kg_core.oauth import SimpleToken, ClientCredentials, DeviceAuthenticationFlow
+from kg_core.oauth import SimpleToken, ClientCredentials, DeviceAuthenticationFlow, OPENID_CONFIGURATION_TTL_IN_SECONDS
+from kg_core.token_broker import BrokeredTokenHandler
+from kg_core.token_store import FileTokenStore
 from kg_core.response import Result, Instance, JsonLdDocument, ResultsById, ResultPage, ReleaseStatus, Error, translate_error, User, Scope, SpaceInformation, TypeInformation, TermsOfUse, ListOfUUID, ListOfReducedUserInformation
 
 
@@ -36,18 +41,18 @@ def _calculate_base_url(host: str):
     return f"http{'s' if not host.startswith('localhost') else ''}://{host}/v3-beta/"
 
 
-def _create_kg_config(host: str, enable_profiling: bool, token_handler: TokenHandler, client_token_handler: Optional[TokenHandler] = None) -> KGConfig:
-    return KGConfig(_calculate_base_url(host), token_handler, client_token_handler, "https://kg.ebrains.eu/api/instances/", enable_profiling)
+def _create_kg_config(host: str, enable_profiling: bool, token_handler: TokenHandler, client_token_handler: Optional[TokenHandler] = None, instance_cache: Optional[InstanceCache] = None, transport: Optional[Transport] = None) -> KGConfig:
+    return KGConfig(_calculate_base_url(host), token_handler, client_token_handler, "https://kg.ebrains.eu/api/instances/", enable_profiling, instance_cache, transport)
 
 
 class Client(object):
 
-    def __init__(self, host: str, enable_profiling: bool, token_handler: TokenHandler, client_token_handler: Optional[TokenHandler] = None):
+    def __init__(self, host: str, enable_profiling: bool, token_handler: TokenHandler, client_token_handler: Optional[TokenHandler] = None, instance_cache: Optional[InstanceCache] = None, transport: Optional[Transport] = None):
         if not host:
             raise ValueError("No hostname specified")
         elif not token_handler:
             raise ValueError("No token provided")
-        kg_config = _create_kg_config(host, enable_profiling, token_handler, client_token_handler)
+        kg_config = _create_kg_config(host, enable_profiling, token_handler, client_token_handler, instance_cache, transport)
         self.instances = Instances(kg_config)
         self.jsonld = Jsonld(kg_config)
         self.queries = Queries(kg_config)
@@ -55,6 +60,9 @@ class Client(object):
         self.types = Types(kg_config)
         self.users = Users(kg_config)
         
+        # Shared by the batch conversions, the traversal and the upsert - every identifier is parsed only once
+        self.identifiers = UUIDInterner(kg_config.id_namespace)
+
     def uuid_from_absolute_id(self, identifier: Optional[Union[str, UUID]]) -> Optional[UUID]:
         if identifier:
             if type(identifier) == UUID:
@@ -68,6 +76,13 @@ class Client(object):
                 return None
         return None
 
+    def uuids_from_absolute_ids(self, identifiers: Any) -> Any:
+        """ the batch version of uuid_from_absolute_id for lists (nested lists are converted element-wise), pandas series and arrow arrays """
+        return self.identifiers.to_uuids(identifiers)
+
+    def absolute_ids_from_uuids(self, identifiers: Any) -> Any:
+        return self.identifiers.to_absolute_ids(identifiers)
+
 class Admin(RequestsWithTokenHandler):
     def __init__(self, config: KGConfig):
         super(Admin, self).__init__(config)
@@ -695,35 +710,55 @@ class ClientBuilder(object):
         self._token_handler: Optional[TokenHandler] = None
         self._client_token_handler: Optional[TokenHandler] = None
         self._enable_profiling = enable_profiling
+        self._instance_cache: Optional[InstanceCache] = None
+        self._transport: Optional[Transport] = None
+        self._token_broker_store: Optional[FileTokenStore] = None
+        self._token_broker_refresh_margin_in_seconds = 60.0
+
+    def _broker(self, token_handler: TokenHandler, role: str) -> TokenHandler:
+        identity = token_handler._identity()
+        # Tokens provided by the caller (e.g. SimpleToken) have no identity - they are neither shared nor written to the store
+        if self._token_broker_store and identity is not None and not isinstance(token_handler, BrokeredTokenHandler):
+            key = f"token_broker|{_calculate_base_url(self._host_name)}|{role}|{identity}"
+            return BrokeredTokenHandler(token_handler, key, self._token_broker_store, self._token_broker_refresh_margin_in_seconds)
+        return token_handler
 
     def _resolve_token_handler(self) -> TokenHandler:
         if not self._token_handler:
             self.with_device_flow()  # We fall back to device flow if there is no explicitly stated token handler and no environment variables are specified
-            return self._token_handler
+            return self._broker(self._token_handler, "user")
         else:
-            return self._token_handler
+            return self._broker(self._token_handler, "user")
 
     def _resolve_client_token_handler(self) -> Optional[TokenHandler]:
         if not self._client_token_handler:
             if "KG_CLIENT_ID" in os.environ and "KG_CLIENT_SECRET" in os.environ:
-                return ClientCredentials(os.environ["KG_CLIENT_ID"], os.environ["KG_CLIENT_SECRET"])
+                return self._broker(ClientCredentials(os.environ["KG_CLIENT_ID"], os.environ["KG_CLIENT_SECRET"]), "client")
             elif "KG_CLIENT_TOKEN" in os.environ:
                 return SimpleToken(os.environ["KG_CLIENT_TOKEN"])
             else:
                 return None
         else:
-            return self._client_token_handler
+            return self._broker(self._client_token_handler, "client")
 
-    def with_device_flow(self, client_id: str = "kg-core-python", open_id_configuration_url: Optional[str] = None) -> ClientBuilder:
+    def with_device_flow(self, client_id: str = "kg-core-python", open_id_configuration_url: Optional[str] = None, token_store: Optional[FileTokenStore] = None) -> ClientBuilder:
+        """If a token store is passed, the tokens (and the OpenID configuration) are shared with all other processes using the same store - a new process only needs to go through the device flow if there is no valid refresh token available anymore."""
         if not open_id_configuration_url:
-            auth_endpoint = requests.get(f"{_calculate_base_url(self._host_name)}users/authorization/config").json()
+            auth_config_url = f"{_calculate_base_url(self._host_name)}users/authorization/config"
+            auth_config_key = f"authorization_config|{auth_config_url}"
+            if token_store:
+                auth_endpoint = token_store.cached(auth_config_key, lambda: requests.get(auth_config_url).json(), OPENID_CONFIGURATION_TTL_IN_SECONDS)
+            else:
+                auth_endpoint = requests.get(auth_config_url).json()
             if auth_endpoint and "data" in auth_endpoint and auth_endpoint["data"] and "endpoint" in auth_endpoint["data"]:
                 config = auth_endpoint["data"]["endpoint"]
             else:
+                if token_store:
+                    token_store.delete(auth_config_key)
                 raise ValueError("Was not able to determine the authentication endpoint. This could be caused by a temporary downtime or a misconfiguration of the host name")
         else:
             config = open_id_configuration_url
-        self._token_handler = DeviceAuthenticationFlow(config, client_id)
+        self._token_handler = DeviceAuthenticationFlow(config, client_id, token_store)
         return self
 
     def with_token(self, token: Optional[str] = None) -> ClientBuilder:
@@ -742,11 +777,32 @@ class ClientBuilder(object):
         self._client_token_handler = ClientCredentials(client_id if client_id else os.environ["KG_CLIENT_ID"], client_secret if client_secret else os.environ["KG_CLIENT_SECRET"])
         return self
 
+    def with_token_broker(self, token_store: Optional[FileTokenStore] = None, refresh_margin_in_seconds: float = 60) -> ClientBuilder:
+        """Share the tokens with all processes using the same token store (by default the one in the user's cache directory) instead of fetching them in every process - e.g. for the workers of a multiprocessing pool. Only token handlers fetching their tokens (client credentials, device flow) are brokered - tokens provided by the caller are used as they are. The building process refreshes the tokens ahead of their expiration, the others read them from the store."""
+        self._token_broker_store = token_store or FileTokenStore()
+        self._token_broker_refresh_margin_in_seconds = refresh_margin_in_seconds
+        return self
+
+    def with_instance_cache(self, instance_cache: InstanceCache) -> ClientBuilder:
+        """Serve Instances.get_by_id / Instances.get_by_ids from the given persistent cache whenever possible. In offline mode, combine it with "with_token" since no authentication is required."""
+        self._instance_cache = instance_cache
+        return self
+
+    def with_http2(self, max_connections: int = 10, timeout_in_seconds: Optional[float] = None) -> ClientBuilder:
+        """Send the requests through a shared HTTP/2 connection pool which multiplexes concurrent requests over a few connections. Requires "pip install ebrains_kg_core[http2]"."""
+        self._transport = Http2Transport(max_connections, timeout_in_seconds)
+        return self
+
+    def with_transport(self, transport: Transport) -> ClientBuilder:
+        """Send the requests through the given transport - e.g. a RecordingTransport to capture the exchanges with the KG or a ReplayTransport to serve them offline."""
+        self._transport = transport
+        return self
+
     def build(self) -> Client:
-        return Client(self._host_name, self._enable_profiling, self._resolve_token_handler(), self._resolve_client_token_handler())
+        return Client(self._host_name, self._enable_profiling, self._resolve_token_handler(), self._resolve_client_token_handler(), self._instance_cache, self._transport)
 
     def build_admin(self) -> Admin:
-        return Admin(_create_kg_config(self._host_name, self._enable_profiling, self._resolve_token_handler(), self._resolve_client_token_handler()))
+        return Admin(_create_kg_config(self._host_name, self._enable_profiling, self._resolve_token_handler(), self._resolve_client_token_handler(), self._instance_cache, self._transport))
 
 
 def kg(host: str = "core.kg.ebrains.eu", enable_profiling: bool = False) -> ClientBuilder:
@@ -0,0 +1,236 @@
+#  Copyright 2022 EBRAINS AISBL
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0.
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+#  This open source software code was developed in part or in whole in the
+#  Human Brain Project, funded from the European Union's Horizon 2020
+#  Framework Programme for Research and Innovation under
+#  Specific Grant Agreements No. 720270, No. 785907, and No. 945539
+#  (Human Brain Project SGA1, SGA2 and SGA3).
+#
+
+from __future__ import annotations
+
+import copy
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple, TypeVar, Union
+from uuid import UUID
+
+from kg_core.kg import Client
+from kg_core.request import Stage
+from kg_core.response import Error, Instance, ResultPage
+
+INCOMING_LINKS = "https://core.kg.ebrains.eu/vocab/meta/incomingLinks"
+
+DocumentType = TypeVar("DocumentType", bound=Dict[str, Any])
+
+
+class LinkCache(object):
+    """
+    An in-memory cache of the instances resolved by LinkResolvers - share it between the resolvers of a session so the
+    same instances are not fetched again. Instances which don't exist (or are not accessible) are remembered as well.
+    If "max_entries" is set, the least recently used entries are evicted.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Tuple[UUID, str], Optional[Instance]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_many(self, instance_ids: Iterable[UUID], stage: str) -> Tuple[Dict[UUID, Instance], List[UUID]]:
+        """ returns the cached instances and the ids which are not in the cache - known missing instances are in neither """
+        found: Dict[UUID, Instance] = {}
+        missing: List[UUID] = []
+        with self._lock:
+            for instance_id in instance_ids:
+                key = (instance_id, stage)
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    instance = self._entries[key]
+                    if instance is not None:
+                        found[instance_id] = instance
+                    self.hits += 1
+                else:
+                    missing.append(instance_id)
+                    self.misses += 1
+        return found, missing
+
+    def put_many(self, instances: Dict[UUID, Optional[Instance]], stage: str) -> None:
+        with self._lock:
+            for instance_id, instance in instances.items():
+                self._entries[(instance_id, stage)] = instance
+                self._entries.move_to_end((instance_id, stage))
+            if self.max_entries is not None:
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+    def invalidate(self, instance_id: UUID) -> None:
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == instance_id]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+def _is_reference(value: Any) -> bool:
+    return isinstance(value, dict) and "@id" in value and all(k in ("@id", "@type") for k in value)
+
+
+def _copy(value: Any) -> Any:
+    """ a copy of the containers (dicts - keeping their type, e.g. Instance - and lists) of a JSON-LD value """
+    if isinstance(value, list):
+        return [_copy(v) for v in value]
+    if isinstance(value, dict):
+        result = copy.copy(value)
+        for k, v in result.items():
+            if isinstance(v, (dict, list)):
+                result[k] = _copy(v)
+        return result
+    return value
+
+
+class LinkResolver(object):
+    """
+    Resolves the embedded references ({"@id": ...}) of documents (e.g. the items of a ResultPage) and links the
+    referenced instances in place - instead of one get_by_id per reference.
+
+    The references of all documents are collected and deduplicated first, the instances which are not in the cache are
+    fetched with chunked bulk requests (get_by_ids) which are executed concurrently. With "max_depth" > 1, the references
+    of the linked instances are resolved as well (level by level) - every linked instance is then a copy, so the same
+    instance can be linked at several places (and in cycles) without creating cyclic structures. The instances linked at
+    the last level are shared with the cache - treat them as read-only.
+
+    "properties" restricts the resolution to the given properties. References which can't be resolved (e.g. instances
+    which don't exist or are not accessible) are kept as they are - errors other than "not found" are reported in
+    "errors" and retried by the next resolution.
+    """
+
+    def __init__(self, client: Client, stage: Stage = Stage.RELEASED, max_depth: int = 1, properties: Optional[Iterable[str]] = None,
+                 cache: Optional[LinkCache] = None, chunk_size: int = 100, max_workers: int = 8):
+        self._client = client
+        self._stage = stage
+        self._max_depth = max_depth
+        self._properties = set(properties) if properties is not None else None
+        self.cache = cache if cache is not None else LinkCache()
+        self._chunk_size = chunk_size
+        self._max_workers = max_workers
+        self.errors: Dict[UUID, Error] = {}
+        self.requests = 0
+        self.links = 0
+
+    def _follow(self, property_name: str) -> bool:
+        return not property_name.startswith("@") and property_name != INCOMING_LINKS and (self._properties is None or property_name in self._properties)
+
+    def _collect(self, document: Dict[str, Any], slots: List[Tuple[Any, Union[str, int], UUID]]) -> None:
+        """ collects the places (container and key) of the references in the document """
+        for property_name, value in document.items():
+            if self._follow(property_name):
+                self._collect_value(document, property_name, value, slots)
+
+    def _collect_value(self, container: Any, key: Union[str, int], value: Any, slots: List[Tuple[Any, Union[str, int], UUID]]) -> None:
+        if _is_reference(value):
+            reference = self._client.identifiers.to_uuid(value["@id"])
+            if reference is not None:
+                slots.append((container, key, reference))
+        elif isinstance(value, dict):
+            # embedded documents
+            self._collect(value, slots)
+        elif isinstance(value, list):
+            for index, item in enumerate(value):
+                self._collect_value(value, index, item, slots)
+
+    def _fetch(self, ids: List[UUID]) -> Dict[UUID, Optional[Instance]]:
+        result = self._client.instances.get_by_ids([str(i) for i in ids], stage=self._stage)
+        if result.error:
+            self.errors.update({i: result.error for i in ids})
+            return {}
+        instances: Dict[UUID, Optional[Instance]] = {}
+        for key, r in (result.data or {}).items():
+            instance_id = self._client.identifiers.to_uuid(key)
+            if instance_id is None:
+                continue
+            if r.data is not None:
+                instances[instance_id] = r.data
+            elif r.error and r.error.code not in (403, 404):
+                self.errors[instance_id] = r.error
+            else:
+                # not found (or not accessible) - remembered, so it is not requested again
+                instances[instance_id] = None
+        return instances
+
+    def _lookup(self, ids: List[UUID], executor: ThreadPoolExecutor) -> Dict[UUID, Instance]:
+        found, missing = self.cache.get_many(ids, self._stage)
+        chunks = [missing[c:c + self._chunk_size] for c in range(0, len(missing), self._chunk_size)]
+        self.requests += len(chunks)
+        for instances in executor.map(self._fetch, chunks):
+            self.cache.put_many(instances, self._stage)
+            found.update({i: instance for i, instance in instances.items() if instance is not None})
+        return found
+
+    def resolve(self, documents: Iterable[DocumentType]) -> List[DocumentType]:
+        """ resolves the references of the documents in place - returns the documents """
+        documents = list(documents)
+        level: List[Dict[str, Any]] = list(documents)
+        with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+            for depth in range(1, self._max_depth + 1):
+                slots: List[Tuple[Any, Union[str, int], UUID]] = []
+                for document in level:
+                    self._collect(document, slots)
+                if not slots:
+                    break
+                resolved = self._lookup(list(dict.fromkeys(reference for _, _, reference in slots)), executor)
+                level = []
+                for container, key, reference in slots:
+                    instance = resolved.get(reference)
+                    if instance is None:
+                        continue
+                    if depth < self._max_depth:
+                        instance = _copy(instance)
+                        level.append(instance)
+                    container[key] = instance
+                    self.links += 1
+        return documents
+
+    def resolve_page(self, page: ResultPage) -> ResultPage:
+        """ resolves the references of the items of the given page (only this page) in place """
+        if page.data:
+            self.resolve(page.data)
+        return page
+
+    def resolve_pages(self, pages: Iterable[ResultPage]) -> Iterator[ResultPage]:
+        """ resolves the references page by page - e.g. for result.pages() """
+        for page in pages:
+            yield self.resolve_page(page)
+
+    def stream(self, documents: Iterable[DocumentType], batch_size: int = 1000) -> Iterator[DocumentType]:
+        """ resolves the references of a stream of documents (e.g. result.stream()) in batches of "batch_size" documents """
+        batch: List[DocumentType] = []
+        for document in documents:
+            batch.append(document)
+            if len(batch) >= batch_size:
+                yield from self.resolve(batch)
+                batch = []
+        if batch:
+            yield from self.resolve(batch)
+
+    def __str__(self):
+        return f"LinkResolver: {self.links} links resolved ({self.requests} requests, {self.cache.hits} cache hits, {len(self.errors)} errors)"
@@ -0,0 +1,418 @@
+#  Copyright 2022 EBRAINS AISBL
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0.
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+#  This open source software code was developed in part or in whole in the
+#  Human Brain Project, funded from the European Union's Horizon 2020
+#  Framework Programme for Research and Innovation under
+#  Specific Grant Agreements No. 720270, No. 785907, and No. 945539
+#  (Human Brain Project SGA1, SGA2 and SGA3).
+#
+
+from __future__ import annotations
+
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Type, TypeVar
+from uuid import UUID
+
+ModelType = TypeVar("ModelType", bound="Model")
+RecordType = TypeVar("RecordType", bound="JsonLdRecord")
+
+# Marks a UUID which has not been parsed yet
+_NOT_PARSED: Any = object()
+
+
+def _uuid(value: Any) -> Optional[UUID]:
+    try:
+        return UUID(value) if value.__class__ is str else None
+    except ValueError:
+        return None
+
+
+class Model(object):
+    """
+    A compact, typed representation of a component schema of the KG API: the attributes are slots (no per-object
+    dict) and from_json() assigns them straight from the decoded JSON without any validation - so decoding a model
+    costs about as much as reading its keys. Pass a model as type to ResultPage.as_type() / Result.as_type().
+    """
+    __slots__ = ()
+    # The JSON key of every attribute
+    _keys: Dict[str, str] = {}
+
+    def __init__(self, **kwargs: Any):
+        for attribute in self._keys:
+            setattr(self, attribute, kwargs.pop(attribute, None))
+        if kwargs:
+            raise TypeError(f"{self.__class__.__name__} has no attributes {', '.join(kwargs)}")
+
+    @classmethod
+    def from_json(cls: Type[ModelType], data: Dict[str, Any], id_namespace: Optional[str] = None) -> ModelType:
+        """ assigns the (undecoded) value of every key - the generated models override it to decode nested models too """
+        self = cls.__new__(cls)
+        for attribute, key in cls._keys.items():
+            setattr(self, attribute, data.get(key))
+        return self
+
+    @classmethod
+    def from_json_list(cls: Type[ModelType], values: Optional[List[Dict[str, Any]]], id_namespace: Optional[str] = None) -> Optional[List[ModelType]]:
+        if values is None:
+            return None
+        from_json = cls.from_json
+        return [from_json(v, id_namespace) for v in values]
+
+    def to_json(self) -> Dict[str, Any]:
+        """ the JSON representation (with the keys of the KG API) - attributes without value are omitted """
+        result: Dict[str, Any] = {}
+        for attribute, key in self._keys.items():
+            value = getattr(self, attribute)
+            if value is not None:
+                result[key] = _to_json(value)
+        return result
+
+    def __iter__(self) -> Iterator[Tuple[str, Any]]:
+        for attribute in self._keys:
+            yield attribute, getattr(self, attribute)
+
+    def __eq__(self, other: Any) -> bool:
+        return other.__class__ is self.__class__ and all(getattr(self, a) == getattr(other, a) for a in self._keys)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({', '.join(f'{a}={v!r}' for a, v in self if v is not None)})"
+
+
+def _to_json(value: Any) -> Any:
+    if isinstance(value, (Model, JsonLdRecord)):
+        return value.to_json()
+    if isinstance(value, list):
+        return [_to_json(v) for v in value]
+    if isinstance(value, UUID):
+        return str(value)
+    return value
+
+
+class JsonLdRecord(object):
+    """
+    A free-form JSON-LD document (e.g. an instance) - other than Instance, the decoded document is referenced instead
+    of copied into a dict subclass and the UUID is only parsed when it is accessed.
+    """
+    __slots__ = ("document", "_id_namespace", "_uuid")
+
+    def __init__(self, document: Dict[str, Any], id_namespace: Optional[str] = None):
+        self.document = document
+        self._id_namespace = id_namespace
+        self._uuid: Optional[UUID] = _NOT_PARSED
+
+    @classmethod
+    def from_json(cls: Type[RecordType], data: Dict[str, Any], id_namespace: Optional[str] = None) -> RecordType:
+        self = cls.__new__(cls)
+        self.document = data
+        self._id_namespace = id_namespace
+        self._uuid = _NOT_PARSED
+        return self
+
+    @classmethod
+    def from_json_list(cls: Type[RecordType], values: Optional[List[Dict[str, Any]]], id_namespace: Optional[str] = None) -> Optional[List[RecordType]]:
+        if values is None:
+            return None
+        from_json = cls.from_json
+        return [from_json(v, id_namespace) for v in values]
+
+    @property
+    def instance_id(self) -> Optional[str]:
+        return self.document.get("@id")
+
+    @property
+    def uuid(self) -> Optional[UUID]:
+        if self._uuid is _NOT_PARSED:
+            instance_id = self.document.get("@id")
+            namespace = self._id_namespace
+            self._uuid = _uuid(instance_id[len(namespace):]) if namespace and instance_id and instance_id.startswith(namespace) else None
+        return self._uuid
+
+    @property
+    def types(self) -> List[str]:
+        types = self.document.get("@type")
+        return types if isinstance(types, list) else [types] if types else []
+
+    def __getitem__(self, key: str) -> Any:
+        return self.document[key]
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.document
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.document.get(key, default)
+
+    def to_json(self) -> Dict[str, Any]:
+        return self.document
+
+    def __eq__(self, other: Any) -> bool:
+        return other.__class__ is self.__class__ and self.document == other.document
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.instance_id})"
+
+
+class Error(Model):
+    """ The schema "Error" of the KG API """
+    __slots__ = ("code", "message", "instance_id")
+    _keys = {"code": "code", "message": "message", "instance_id": "instanceId"}
+    code: Optional[int]
+    message: Optional[str]
+    instance_id: Optional[UUID]
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any], id_namespace: Optional[str] = None) -> Error:
+        self = cls.__new__(cls)
+        get = data.get
+        self.code = get("code")
+        self.message = get("message")
+        self.instance_id = _uuid(get("instanceId"))
+        return self
+
+
+class IncomingLinkInformation(Model):
+    """ The schema "IncomingLinkInformation" of the KG API """
+    __slots__ = ("identifier", "name_for_reverse_link", "source_types")
+    _keys = {"identifier": "http://schema.org/identifier", "name_for_reverse_link": "https://core.kg.ebrains.eu/vocab/meta/nameForReverseLink", "source_types": "https://core.kg.ebrains.eu/vocab/meta/sourceTypes"}
+    identifier: Optional[str]
+    name_for_reverse_link: Optional[str]
+    source_types: Optional[List[TargetTypeInformation]]
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any], id_namespace: Optional[str] = None) -> IncomingLinkInformation:
+        self = cls.__new__(cls)
+        get = data.get
+        self.identifier = get("http://schema.org/identifier")
+        self.name_for_reverse_link = get("https://core.kg.ebrains.eu/vocab/meta/nameForReverseLink")
+        self.source_types = TargetTypeInformation.from_json_list(get("https://core.kg.ebrains.eu/vocab/meta/sourceTypes"), id_namespace)
+        return self
+
+
+class JsonLdDoc(JsonLdRecord):
+    """ The schema "JsonLdDoc" of the KG API """
+    __slots__ = ()
+
+
+class NormalizedJsonLd(JsonLdRecord):
+    """ The schema "NormalizedJsonLd" of the KG API """
+    __slots__ = ()
+
+
+class PropertyInformation(Model):
+    """ The schema "PropertyInformation" of the KG API """
+    __slots__ = ("identifier", "occurrences", "name_for_reverse_link", "target_types")
+    _keys = {"identifier": "http://schema.org/identifier", "occurrences": "https://core.kg.ebrains.eu/vocab/meta/occurrences", "name_for_reverse_link": "https://core.kg.ebrains.eu/vocab/meta/nameForReverseLink", "target_types": "https://core.kg.ebrains.eu/vocab/meta/targetTypes"}
+    identifier: Optional[str]
+    occurrences: Optional[int]
+    name_for_reverse_link: Optional[str]
+    target_types: Optional[List[TargetTypeInformation]]
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any], id_namespace: Optional[str] = None) -> PropertyInformation:
+        self = cls.__new__(cls)
+        get = data.get
+        self.identifier = get("http://schema.org/identifier")
+        self.occurrences = get("https://core.kg.ebrains.eu/vocab/meta/occurrences")
+        self.name_for_reverse_link = get("https://core.kg.ebrains.eu/vocab/meta/nameForReverseLink")
+        self.target_types = TargetTypeInformation.from_json_list(get("https://core.kg.ebrains.eu/vocab/meta/targetTypes"), id_namespace)
+        return self
+
+
+class ReducedUserInformation(Model):
+    """ The schema "ReducedUserInformation" of the KG API """
+    __slots__ = ("alternate_name", "name", "instance_id")
+    _keys = {"alternate_name": "http://schema.org/alternateName", "name": "http://schema.org/name", "instance_id": "@id"}
+    alternate_name: Optional[str]
+    name: Optional[str]
+    instance_id: Optional[str]
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any], id_namespace: Optional[str] = None) -> ReducedUserInformation:
+        self = cls.__new__(cls)
+        get = data.get
+        self.alternate_name = get("http://schema.org/alternateName")
+        self.name = get("http://schema.org/name")
+        self.instance_id = get("@id")
+        return self
+
+
+class ScopeElement(Model):
+    """ The schema "ScopeElement" of the KG API """
+    __slots__ = ("instance_id", "label", "space", "types", "children", "permissions")
+    _keys = {"instance_id": "id", "label": "label", "space": "space", "types": "types", "children": "children", "permissions": "permissions"}
+    instance_id: Optional[UUID]
+    label: Optional[str]
+    space: Optional[str]
+    types: Optional[List[str]]
+    children: Optional[List[ScopeElement]]
+    permissions: Optional[List[str]]
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any], id_namespace: Optional[str] = None) -> ScopeElement:
+        self = cls.__new__(cls)
+        get = data.get
+        self.instance_id = _uuid(get("id"))
+        self.label = get("label")
+        self.space = get("space")
+        self.types = get("types")
+        self.children = ScopeElement.from_json_list(get("children"), id_namespace)
+        self.permissions = get("permissions")
+        return self
+
+
+class SpaceInformation(Model):
+    """ The schema "SpaceInformation" of the KG API """
+    __slots__ = ("identifier", "name", "permissions")
+    _keys = {"identifier": "http://schema.org/identifier", "name": "http://schema.org/name", "permissions": "https://core.kg.ebrains.eu/vocab/meta/permissions"}
+    identifier: Optional[str]
+    name: Optional[str]
+    permissions: Optional[List[str]]
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any], id_namespace: Optional[str] = None) -> SpaceInformation:
+        self = cls.__new__(cls)
+        get = data.get
+        self.identifier = get("http://schema.org/identifier")
+        self.name = get("http://schema.org/name")
+        self.permissions = get("https://core.kg.ebrains.eu/vocab/meta/permissions")
+        return self
+
+
+class TargetTypeInformation(Model):
+    """ The schema "TargetTypeInformation" of the KG API """
+    __slots__ = ("target_type", "occurrences")
+    _keys = {"target_type": "https://core.kg.ebrains.eu/vocab/meta/type", "occurrences": "https://core.kg.ebrains.eu/vocab/meta/occurrences"}
+    target_type: Optional[str]
+    occurrences: Optional[int]
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any], id_namespace: Optional[str] = None) -> TargetTypeInformation:
+        self = cls.__new__(cls)
+        get = data.get
+        self.target_type = get("https://core.kg.ebrains.eu/vocab/meta/type")
+        self.occurrences = get("https://core.kg.ebrains.eu/vocab/meta/occurrences")
+        return self
+
+
+class TermsOfUse(Model):
+    """ The schema "TermsOfUse" of the KG API """
+    __slots__ = ("accepted", "version", "data")
+    _keys = {"accepted": "accepted", "version": "version", "data": "data"}
+    accepted: Optional[bool]
+    version: Optional[str]
+    data: Optional[str]
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any], id_namespace: Optional[str] = None) -> TermsOfUse:
+        self = cls.__new__(cls)
+        get = data.get
+        self.accepted = get("accepted")
+        self.version = get("version")
+        self.data = get("data")
+        return self
+
+
+class TypeInSpaceInformation(Model):
+    """ The schema "TypeInSpaceInformation" of the KG API """
+    __slots__ = ("space", "occurrences", "properties")
+    _keys = {"space": "https://core.kg.ebrains.eu/vocab/meta/space", "occurrences": "https://core.kg.ebrains.eu/vocab/meta/occurrences", "properties": "https://core.kg.ebrains.eu/vocab/meta/properties"}
+    space: Optional[str]
+    occurrences: Optional[int]
+    properties: Optional[List[PropertyInformation]]
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any], id_namespace: Optional[str] = None) -> TypeInSpaceInformation:
+        self = cls.__new__(cls)
+        get = data.get
+        self.space = get("https://core.kg.ebrains.eu/vocab/meta/space")
+        self.occurrences = get("https://core.kg.ebrains.eu/vocab/meta/occurrences")
+        self.properties = PropertyInformation.from_json_list(get("https://core.kg.ebrains.eu/vocab/meta/properties"), id_namespace)
+        return self
+
+
+class TypeInformation(Model):
+    """ The schema "TypeInformation" of the KG API """
+    __slots__ = ("identifier", "description", "name", "color", "incoming_links", "occurrences", "properties", "spaces")
+    _keys = {"identifier": "http://schema.org/identifier", "description": "http://schema.org/description", "name": "http://schema.org/name", "color": "https://core.kg.ebrains.eu/vocab/meta/color", "incoming_links": "https://core.kg.ebrains.eu/vocab/meta/incomingLinks", "occurrences": "https://core.kg.ebrains.eu/vocab/meta/occurrences", "properties": "https://core.kg.ebrains.eu/vocab/meta/properties", "spaces": "https://core.kg.ebrains.eu/vocab/meta/spaces"}
+    identifier: Optional[str]
+    description: Optional[str]
+    name: Optional[str]
+    color: Optional[str]
+    incoming_links: Optional[List[IncomingLinkInformation]]
+    occurrences: Optional[int]
+    properties: Optional[List[PropertyInformation]]
+    spaces: Optional[List[TypeInSpaceInformation]]
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any], id_namespace: Optional[str] = None) -> TypeInformation:
+        self = cls.__new__(cls)
+        get = data.get
+        self.identifier = get("http://schema.org/identifier")
+        self.description = get("http://schema.org/description")
+        self.name = get("http://schema.org/name")
+        self.color = get("https://core.kg.ebrains.eu/vocab/meta/color")
+        self.incoming_links = IncomingLinkInformation.from_json_list(get("https://core.kg.ebrains.eu/vocab/meta/incomingLinks"), id_namespace)
+        self.occurrences = get("https://core.kg.ebrains.eu/vocab/meta/occurrences")
+        self.properties = PropertyInformation.from_json_list(get("https://core.kg.ebrains.eu/vocab/meta/properties"), id_namespace)
+        self.spaces = TypeInSpaceInformation.from_json_list(get("https://core.kg.ebrains.eu/vocab/meta/spaces"), id_namespace)
+        return self
+
+
+class User(Model):
+    """ The schema "User" of the KG API """
+    __slots__ = ("alternate_name", "name", "email", "given_name", "family_name", "identifier")
+    _keys = {"alternate_name": "http://schema.org/alternateName", "name": "http://schema.org/name", "email": "http://schema.org/email", "given_name": "http://schema.org/givenName", "family_name": "http://schema.org/familyName", "identifier": "http://schema.org/identifier"}
+    alternate_name: Optional[str]
+    name: Optional[str]
+    email: Optional[str]
+    given_name: Optional[str]
+    family_name: Optional[str]
+    identifier: Optional[List[str]]
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any], id_namespace: Optional[str] = None) -> User:
+        self = cls.__new__(cls)
+        get = data.get
+        self.alternate_name = get("http://schema.org/alternateName")
+        self.name = get("http://schema.org/name")
+        self.email = get("http://schema.org/email")
+        self.given_name = get("http://schema.org/givenName")
+        self.family_name = get("http://schema.org/familyName")
+        self.identifier = get("http://schema.org/identifier")
+        return self
+
+
+class UserWithRoles(Model):
+    """ The schema "UserWithRoles" of the KG API """
+    __slots__ = ("user", "client_roles", "user_roles", "invitations", "client_id")
+    _keys = {"user": "user", "client_roles": "clientRoles", "user_roles": "userRoles", "invitations": "invitations", "client_id": "clientId"}
+    user: Optional[User]
+    client_roles: Optional[List[str]]
+    user_roles: Optional[List[str]]
+    invitations: Optional[List[str]]
+    client_id: Optional[str]
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any], id_namespace: Optional[str] = None) -> UserWithRoles:
+        self = cls.__new__(cls)
+        get = data.get
+        value = get("user")
+        self.user = User.from_json(value, id_namespace) if value is not None else None
+        self.client_roles = get("clientRoles")
+        self.user_roles = get("userRoles")
+        self.invitations = get("invitations")
+        self.client_id = get("clientId")
+        return self
+
+
+MODELS: Dict[str, Any] = {"Error": Error, "IncomingLinkInformation": IncomingLinkInformation, "JsonLdDoc": JsonLdDoc, "NormalizedJsonLd": NormalizedJsonLd, "PropertyInformation": PropertyInformation, "ReducedUserInformation": ReducedUserInformation, "ScopeElement": ScopeElement, "SpaceInformation": SpaceInformation, "TargetTypeInformation": TargetTypeInformation, "TermsOfUse": TermsOfUse, "TypeInSpaceInformation": TypeInSpaceInformation, "TypeInformation": TypeInformation, "User": User, "UserWithRoles": UserWithRoles}
@@ -24,6 +24,10 @@ from typing import Any, Dict, Optional
 
 import requests
 from kg_core.__communication import TokenHandler
+from kg_core.token_store import FileTokenStore
+
+# How long the OpenID configuration is reused from a token store
+OPENID_CONFIGURATION_TTL_IN_SECONDS = 24 * 60 * 60
 
 
 class SimpleToken(TokenHandler):
@@ -43,6 +47,9 @@ class ClientCredentials(TokenHandler):
         self.__client_id = client_id
         self.__client_secret = client_secret
 
+    def _identity(self) -> str:
+        return f"{self.__class__.__name__}|{self.__client_id}"
+
     def _fetch_token(self) -> Optional[str]:
         if self._auth_endpoint and self.__client_id and self.__client_secret:
             token_response = requests.post(self._auth_endpoint, data={
@@ -60,14 +67,22 @@ class ClientCredentials(TokenHandler):
 class DeviceAuthenticationFlow(TokenHandler):
     __poll_interval_in_secs = 1
 
-    def __init__(self, openid_configuration: str, client_id: str):
+    def __init__(self, openid_configuration: str, client_id: str, token_store: Optional[FileTokenStore] = None):
         super(DeviceAuthenticationFlow, self).__init__()
         self.__client_id = client_id
-        well_known_config = requests.get(openid_configuration).json()
+        self.__openid_configuration = openid_configuration
+        self.__token_store = token_store
+        if token_store:
+            well_known_config = token_store.cached(f"openid_configuration|{openid_configuration}", lambda: requests.get(openid_configuration).json(), OPENID_CONFIGURATION_TTL_IN_SECONDS)
+        else:
+            well_known_config = requests.get(openid_configuration).json()
         self.__device_auth_endpoint = well_known_config["device_authorization_endpoint"]
         self.__token_endpoint = well_known_config["token_endpoint"]
         self.__refresh_token = None
 
+    def _identity(self) -> str:
+        return f"{self.__class__.__name__}|{self.__openid_configuration}|{self.__client_id}"
+
     def _poll_for_token(self, device_code: str) -> Optional[Dict[str, Any]]:
         response = requests.post(data={"grant_type": "urn:ietf:params:oauth:grant-type:device_code", "client_id": self.__client_id, "device_code": device_code},
                                  url=self.__token_endpoint)
@@ -123,7 +138,27 @@ class DeviceAuthenticationFlow(TokenHandler):
             result = self._find_tokens()
         return result
 
+    def _fetch_token_from_store(self, token_store: FileTokenStore) -> Optional[str]:
+        key = f"device_flow|{self.__token_endpoint}|{self.__client_id}"
+        # We keep the lock during the whole flow - other processes wait for the outcome instead of starting their own device flow
+        with token_store.locked():
+            entry = token_store.read(key)
+            if FileTokenStore.is_valid(entry, "access_token") and entry["access_token"] != self._token:
+                # Either we don't have a token yet or another process has already replaced the one which has been rejected
+                self.__refresh_token = entry.get("refresh_token")
+                return entry["access_token"]
+            if FileTokenStore.is_valid(entry, "refresh_token"):
+                self.__refresh_token = entry["refresh_token"]
+            result = self._find_tokens()
+            if result:
+                token_store.write(key, FileTokenStore.token_entry(result))
+                self.__refresh_token = result["refresh_token"]
+                return result["access_token"]
+            return None
+
     def _fetch_token(self) -> Optional[str]:
+        if self.__token_store:
+            return self._fetch_token_from_store(self.__token_store)
         result = self._find_tokens()
         if result:
             self.__refresh_token = result["refresh_token"]
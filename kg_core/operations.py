@@ -0,0 +1,149 @@
+#  Copyright 2022 EBRAINS AISBL
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0.
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+#  This open source software code was developed in part or in whole in the
+#  Human Brain Project, funded from the European Union's Horizon 2020
+#  Framework Programme for Research and Innovation under
+#  Specific Grant Agreements No. 720270, No. 785907, and No. 945539
+#  (Human Brain Project SGA1, SGA2 and SGA3).
+#
+
+from __future__ import annotations
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+
+class Operation(object):
+    """
+    What the generator knows about an operation of the KG API - the runtime layers (e.g. retries and the instance
+    cache) decide by it per endpoint instead of guessing from the HTTP method:
+
+    - safe: the operation doesn't modify anything (all GETs and the POSTs which only carry a bulk read or a query)
+    - idempotent: executing the operation several times has the same effect as executing it once - it can be retried
+      (PUTs and DELETEs except for the administrative ones and those triggering processing, e.g. of the event history)
+    - cacheable: the operation is safe and its response doesn't depend on the calling user (beyond their permissions)
+    - paginated: the operation accepts a Pagination
+    - bulk: the payload is a list (e.g. of instance ids) which can be split into chunks
+    """
+    __slots__ = ("category", "name", "method", "path", "response_type", "safe", "idempotent", "cacheable", "paginated", "bulk", "_pattern")
+
+    def __init__(self, category: str, name: str, method: str, path: str, response_type: Optional[str], safe: bool, idempotent: bool, cacheable: bool, paginated: bool, bulk: bool):
+        self.category = category
+        self.name = name
+        self.method = method
+        self.path = path
+        self.response_type = response_type
+        self.safe = safe
+        self.idempotent = idempotent
+        self.cacheable = cacheable
+        self.paginated = paginated
+        self.bulk = bulk
+        self._pattern = re.compile("^" + re.sub(r"\\\{[^}]*\\\}", "[^/]+", re.escape(path)) + "$")
+
+    def matches(self, path: str) -> bool:
+        return self._pattern.match(path) is not None
+
+    def __repr__(self) -> str:
+        return f"Operation({self.method} {self.path} - {self.category}.{self.name})"
+
+
+OPERATIONS: Tuple[Operation, ...] = (
+    Operation("admin", "assign_type_to_space", "PUT", "spaces/{space}/types", None, False, False, False, False, False),
+    Operation("admin", "calculate_instance_invitation_scope", "PUT", "instances/{instance_id}/invitationScope", None, False, False, False, False, False),
+    Operation("admin", "create_space_definition", "PUT", "spaces/{space}/specification", None, False, False, False, False, False),
+    Operation("admin", "create_type_definition", "PUT", "types/specification", None, False, False, False, False, False),
+    Operation("admin", "define_property", "PUT", "properties", None, False, False, False, False, False),
+    Operation("admin", "define_property_for_type", "PUT", "propertiesForType", None, False, False, False, False, False),
+    Operation("admin", "deprecate_property", "DELETE", "properties", None, False, False, False, False, False),
+    Operation("admin", "deprecate_property_for_type", "DELETE", "propertiesForType", None, False, False, False, False, False),
+    Operation("admin", "get_all_role_definitions", "GET", "setup/permissions", None, True, True, False, False, False),
+    Operation("admin", "get_claim_for_role", "GET", "setup/permissions/{role}", None, True, True, False, False, False),
+    Operation("admin", "list_instances_with_invitations", "GET", "instancesWithInvitations", "Result[ListOfUUID]", True, True, False, False, False),
+    Operation("admin", "register_terms_of_use", "PUT", "setup/termsOfUse", None, False, False, False, False, False),
+    Operation("admin", "remove_space_definition", "DELETE", "spaces/{space}/specification", None, False, False, False, False, False),
+    Operation("admin", "remove_type_definition", "DELETE", "types/specification", None, False, False, False, False, False),
+    Operation("admin", "remove_type_from_space", "DELETE", "spaces/{space}/types", None, False, False, False, False, False),
+    Operation("admin", "rerun_events", "PUT", "spaces/{space}/eventHistory", None, False, False, False, False, False),
+    Operation("admin", "trigger_inference", "POST", "spaces/{space}/inference", None, False, False, False, False, False),
+    Operation("admin", "update_claim_for_role", "PATCH", "setup/permissions/{role}", None, False, False, False, False, False),
+    Operation("instances", "contribute_to_full_replacement", "PUT", "instances/{instance_id}", "Result[Instance]", False, True, False, False, False),
+    Operation("instances", "contribute_to_partial_replacement", "PATCH", "instances/{instance_id}", "Result[Instance]", False, False, False, False, False),
+    Operation("instances", "create_new", "POST", "instances", "Result[Instance]", False, False, False, False, False),
+    Operation("instances", "create_new_with_id", "POST", "instances/{instance_id}", "Result[Instance]", False, False, False, False, False),
+    Operation("instances", "delete", "DELETE", "instances/{instance_id}", None, False, True, False, False, False),
+    Operation("instances", "get_by_id", "GET", "instances/{instance_id}", "Result[Instance]", True, True, True, False, False),
+    Operation("instances", "get_by_identifiers", "POST", "instancesByIdentifiers", "ResultsById[Instance]", True, True, True, False, True),
+    Operation("instances", "get_by_ids", "POST", "instancesByIds", "ResultsById[Instance]", True, True, True, False, True),
+    Operation("instances", "get_incoming_links", "GET", "instances/{instance_id}/incomingLinks", "ResultPage[Instance]", True, True, True, True, False),
+    Operation("instances", "get_neighbors", "GET", "instances/{instance_id}/neighbors", None, True, True, True, False, False),
+    Operation("instances", "get_release_status", "GET", "instances/{instance_id}/release/status", "Result[ReleaseStatus]", True, True, True, False, False),
+    Operation("instances", "get_release_status_by_ids", "POST", "instancesByIds/release/status", "ResultsById[ReleaseStatus]", True, True, True, False, True),
+    Operation("instances", "get_scope", "GET", "instances/{instance_id}/scope", "Result[Scope]", True, True, True, False, False),
+    Operation("instances", "get_suggested_links_for_property", "POST", "instances/{instance_id}/suggestedLinksForProperty", None, True, True, True, True, False),
+    Operation("instances", "get_suggested_links_for_property_1", "GET", "instances/{instance_id}/suggestedLinksForProperty", None, True, True, True, True, False),
+    Operation("instances", "invite_user_for", "PUT", "instances/{instance_id}/invitedUsers/{user_id}", None, False, True, False, False, False),
+    Operation("instances", "list", "GET", "instances", "ResultPage[Instance]", True, True, True, True, False),
+    Operation("instances", "list_invitations", "GET", "instances/{instance_id}/invitedUsers", "Result[ListOfUUID]", True, True, True, False, False),
+    Operation("instances", "move", "PUT", "instances/{instance_id}/spaces/{space}", "Result[Instance]", False, True, False, False, False),
+    Operation("instances", "release", "PUT", "instances/{instance_id}/release", None, False, True, False, False, False),
+    Operation("instances", "revoke_user_invitation", "DELETE", "instances/{instance_id}/invitedUsers/{user_id}", None, False, True, False, False, False),
+    Operation("instances", "unrelease", "DELETE", "instances/{instance_id}/release", None, False, True, False, False, False),
+    Operation("jsonld", "normalize_payload", "POST", "jsonld/normalizedPayload", None, True, True, True, False, False),
+    Operation("queries", "execute_query_by_id", "GET", "queries/{query_id}/instances", "ResultPage[JsonLdDocument]", True, True, True, True, False),
+    Operation("queries", "get_query_specification", "GET", "queries/{query_id}", "Result[Instance]", True, True, True, False, False),
+    Operation("queries", "list_per_root_type", "GET", "queries", "ResultPage[Instance]", True, True, True, True, False),
+    Operation("queries", "remove_query", "DELETE", "queries/{query_id}", None, False, True, False, False, False),
+    Operation("queries", "save_query", "PUT", "queries/{query_id}", "Result[Instance]", False, True, False, False, False),
+    Operation("queries", "test_query", "POST", "queries", "ResultPage[JsonLdDocument]", True, True, True, True, False),
+    Operation("spaces", "get", "GET", "spaces/{space}", "Result[SpaceInformation]", True, True, True, False, False),
+    Operation("spaces", "list", "GET", "spaces", "ResultPage[SpaceInformation]", True, True, True, True, False),
+    Operation("types", "get_by_name", "POST", "typesByName", "ResultsById[TypeInformation]", True, True, True, False, True),
+    Operation("types", "list", "GET", "types", "ResultPage[TypeInformation]", True, True, True, True, False),
+    Operation("users", "accept_terms_of_use", "POST", "users/termsOfUse/{version}/accept", None, False, False, False, False, False),
+    Operation("users", "define_picture", "PUT", "users/{instance_id}/picture", None, False, True, False, False, False),
+    Operation("users", "find", "GET", "users/fromIAM", "Result[ListOfReducedUserInformation]", True, True, False, False, False),
+    Operation("users", "get_auth_endpoint", "GET", "users/authorization", "Result[JsonLdDocument]", True, True, False, False, False),
+    Operation("users", "get_list", "GET", "users", "ResultPage[Instance]", True, True, False, True, False),
+    Operation("users", "get_list_limited", "GET", "users/limited", "ResultPage[Instance]", True, True, False, True, False),
+    Operation("users", "get_open_id_config_url", "GET", "users/authorization/config", "Result[JsonLdDocument]", True, True, False, False, False),
+    Operation("users", "get_picture", "GET", "users/{instance_id}/picture", None, True, True, False, False, False),
+    Operation("users", "get_pictures", "POST", "users/pictures", None, True, True, False, False, True),
+    Operation("users", "get_terms_of_use", "GET", "users/termsOfUse", "Optional[TermsOfUse]", True, True, False, False, False),
+    Operation("users", "get_token_endpoint", "GET", "users/authorization/tokenEndpoint", "Result[JsonLdDocument]", True, True, False, False, False),
+    Operation("users", "my_info", "GET", "users/me", "Result[User]", True, True, False, False, False),
+    Operation("users", "my_roles", "GET", "users/me/roles", "Result[UserWithRoles]", True, True, False, False, False),
+)
+
+_BY_NAME: Dict[Tuple[str, str], Operation] = {(o.category, o.name): o for o in OPERATIONS}
+_BY_METHOD_AND_SEGMENT: Dict[Tuple[str, str], List[Operation]] = {}
+for _operation in OPERATIONS:
+    _BY_METHOD_AND_SEGMENT.setdefault((_operation.method, _operation.path.split("/", 1)[0]), []).append(_operation)
+for _operations in _BY_METHOD_AND_SEGMENT.values():
+    # Literal paths win over parameterized ones
+    _operations.sort(key=lambda o: o.path.count("{"))
+
+
+def find_operation(method: str, path: str) -> Optional[Operation]:
+    """ the operation of a request - the path is relative to the API version (e.g. "instances/<uuid>/release") """
+    path = path.split("?", 1)[0].strip("/")
+    for o in _BY_METHOD_AND_SEGMENT.get((method.upper(), path.split("/", 1)[0]), ()):
+        if o.matches(path):
+            return o
+    return None
+
+
+def operation(category: str, name: str) -> Optional[Operation]:
+    """ the operation of a client method - e.g. operation("instances", "get_by_ids") """
+    return _BY_NAME.get((category, name))
@@ -0,0 +1,161 @@
+#  Copyright 2022 EBRAINS AISBL
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0.
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+#  This open source software code was developed in part or in whole in the
+#  Human Brain Project, funded from the European Union's Horizon 2020
+#  Framework Programme for Research and Innovation under
+#  Specific Grant Agreements No. 720270, No. 785907, and No. 945539
+#  (Human Brain Project SGA1, SGA2 and SGA3).
+#
+
+from __future__ import annotations
+
+import json
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+from uuid import UUID
+
+from kg_core.kg import Client
+from kg_core.request import Pagination, Stage
+from kg_core.response import Error, Instance, JsonLdDocument, Result, ResultPage
+
+QUERY_VOCAB = "https://core.kg.ebrains.eu/vocab/query/"
+# The (response) property the projection queries return the instance id with - it is mapped back to "@id"
+PROJECTED_ID = f"{QUERY_VOCAB}projectedId"
+# The namespace of the ids of the saved projection queries - the same projection always results in the same query id
+PROJECTION_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, f"{QUERY_VOCAB}projection")
+
+Field = Union[str, Sequence[str]]
+Fields = Union[Sequence[Field], Dict[str, Field]]
+
+
+class ProjectedInstance(Instance):
+    """ An instance containing the projected properties only """
+
+    def __init__(self, seq: Iterable[List[str]] = (), id_namespace: Optional[str] = None, **kwargs: Any):
+        super(ProjectedInstance, self).__init__(seq, id_namespace, **kwargs)
+        if PROJECTED_ID in self:
+            self["@id"] = self.pop(PROJECTED_ID)
+            self.instance_id = self["@id"]
+            self.uuid = self.to_uuid(self.instance_id)
+
+
+class Projection(object):
+    """
+    The query specification of a projection: the instances of the target type with the given fields only. A field is
+    either a property (absolute IRI) or a path of properties (following links) - the values are returned with the
+    (last) property as key. Pass a dictionary to choose the keys (absolute IRIs) yourself.
+    """
+
+    def __init__(self, target_type: str, fields: Fields):
+        self.target_type = target_type
+        self.fields = Projection.normalize(fields)
+        names = [name for name, _ in self.fields]
+        if not all(path for _, path in self.fields) or len(set(names)) != len(names):
+            raise ValueError(f"The fields of a projection need to be non-empty and have distinct names: {names}")
+        structure: List[Dict[str, Any]] = [{"propertyName": {"@id": PROJECTED_ID}, "path": "@id"}]
+        for name, path in self.fields:
+            structure.append({"propertyName": {"@id": name}, "path": {"@id": path[0]} if len(path) == 1 else [{"@id": p} for p in path]})
+        self.specification: Dict[str, Any] = {
+            "@context": {"@vocab": QUERY_VOCAB, "propertyName": {"@id": "propertyName", "@type": "@id"}, "path": {"@id": "path", "@type": "@id"}},
+            "meta": {"type": target_type, "name": f"projection of {target_type}", "description": "Generated by the field projection of the kg_core SDK"},
+            "structure": structure
+        }
+        self.query_id = uuid.uuid5(PROJECTION_NAMESPACE, json.dumps(self.specification, sort_keys=True))
+
+    @staticmethod
+    def normalize(fields: Fields) -> Tuple[Tuple[str, Tuple[str, ...]], ...]:
+        """ the pairs of response property and path of the given fields """
+        if isinstance(fields, dict):
+            pairs = fields.items()
+        else:
+            pairs = ((f, f) if isinstance(f, str) else (f[-1] if f else "", f) for f in fields)
+        return tuple((name, (path,) if isinstance(path, str) else tuple(path)) for name, path in pairs)
+
+
+class Projections(object):
+    """
+    Reads instances with selected fields only - instead of the full documents - so the responses shrink (and decode
+    faster) with the number of requested fields. Every combination of target type and fields is compiled into a query
+    specification once and kept in a bounded cache.
+
+    By default, the specifications are executed with test_query. With "save_queries", every specification is saved
+    (once - with an id derived from the specification, so all processes share the same query) to "query_space" and
+    executed by its id afterwards, which keeps the specification out of the requests.
+    """
+
+    def __init__(self, client: Client, save_queries: bool = False, query_space: str = "myqueries", max_entries: int = 256):
+        self._client = client
+        self._save_queries = save_queries
+        self._query_space = query_space
+        self._max_entries = max_entries
+        self._compiled: OrderedDict[Tuple[str, Tuple[Tuple[str, Tuple[str, ...]], ...]], Projection] = OrderedDict()
+        self._saved: set = set()
+        self._lock = threading.Lock()
+
+    def compile(self, target_type: str, fields: Fields) -> Projection:
+        key = (target_type, Projection.normalize(fields))
+        with self._lock:
+            projection = self._compiled.get(key)
+            if projection is not None:
+                self._compiled.move_to_end(key)
+                return projection
+        projection = Projection(target_type, fields)
+        with self._lock:
+            self._compiled[key] = projection
+            while len(self._compiled) > self._max_entries:
+                self._compiled.popitem(last=False)
+        return projection
+
+    def _save(self, projection: Projection) -> Optional[Error]:
+        error = self._client.queries.save_query(projection.specification, projection.query_id, self._query_space).error
+        if error is None:
+            with self._lock:
+                self._saved.add(projection.query_id)
+        return error
+
+    def _execute(self, projection: Projection, instance_id: Optional[UUID], restrict_to_spaces: Optional[List[str]], stage: Stage, pagination: Pagination) -> ResultPage[ProjectedInstance]:
+        queries = self._client.queries
+        if not self._save_queries:
+            page = queries.test_query(projection.specification, instance_id=instance_id, restrict_to_spaces=restrict_to_spaces, stage=stage, pagination=pagination)
+        else:
+            if projection.query_id not in self._saved:
+                error = self._save(projection)
+                if error is not None:
+                    raise ValueError(f"Was not able to save the projection query {projection.query_id}: {error.message}")
+            page = queries.execute_query_by_id(projection.query_id, instance_id=instance_id, restrict_to_spaces=restrict_to_spaces, stage=stage, pagination=pagination)
+            if page.error and page.error.code == 404:
+                # The query has been removed in the meantime
+                self._save(projection)
+                page = queries.execute_query_by_id(projection.query_id, instance_id=instance_id, restrict_to_spaces=restrict_to_spaces, stage=stage, pagination=pagination)
+        return ResultPage[ProjectedInstance](response=page._original_response, constructor=ProjectedInstance)
+
+    def list(self, target_type: str, fields: Fields, space: Optional[str] = None, stage: Stage = Stage.RELEASED, pagination: Pagination = Pagination()) -> ResultPage[ProjectedInstance]:
+        """ the projected instances of the given type - the equivalent of Instances.list """
+        return self._execute(self.compile(target_type, fields), None, [space] if space else None, stage, pagination)
+
+    def get_by_id(self, instance_id: UUID, target_type: str, fields: Fields, stage: Stage = Stage.RELEASED) -> Result[ProjectedInstance]:
+        """ the projected instance - the equivalent of Instances.get_by_id (the type is required to compile the query) """
+        page = self._execute(self.compile(target_type, fields), instance_id, None, stage, Pagination(start=0, size=1, return_total_results=False))
+        response = page._original_response
+        data = [d for d in (response.content or {}).get("data") or [] if d]
+        if page.error:
+            content: Dict[str, Any] = {"error": {"code": page.error.code, "message": page.error.message}}
+        elif not data:
+            content = {"error": {"code": 404, "message": f"Instance {instance_id} of type {target_type} not found"}}
+        else:
+            content = {"data": data[0]}
+        return Result[ProjectedInstance](response=response.copy_context(content), constructor=ProjectedInstance)
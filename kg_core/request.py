@@ -39,6 +39,47 @@ class Pagination(object):
         self.return_total_results = return_total_results
 
 
+class AdaptivePageSize(object):
+    """
+    Adjusts the page size between the pages of an iteration based on the measured performance of the previous pages.
+
+    As long as the throughput (items per second) improves, the page size is increased - by the growth factor if the
+    request spent more time on the network and client than on the server and by a smaller step otherwise. Once the
+    throughput doesn't improve anymore, the page size settles at the best one measured. The page size never exceeds
+    max_size nor the number of items which fit into max_bytes_per_page (based on the average size of the received items).
+    """
+
+    def __init__(self, min_size: int = 10, max_size: int = 10000, max_bytes_per_page: int = 50 * 1024 * 1024, growth_factor: float = 2.0, tolerance: float = 0.05):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_bytes_per_page = max_bytes_per_page
+        self.growth_factor = growth_factor
+        self.tolerance = tolerance
+        self.best_size: Optional[int] = None
+        self._best_throughput = 0.0
+        self._settled = False
+
+    def next_size(self, size: int, items: int, total_in_ms: float, server_in_ms: Optional[float], size_in_bytes: int) -> int:
+        """ returns the page size to be used for the next page given the measurements of the page just loaded """
+        if not items or total_in_ms <= 0:
+            return size
+        memory_limit = max(self.min_size, int(self.max_bytes_per_page / (size_in_bytes / items))) if size_in_bytes else self.max_size
+        throughput = items / total_in_ms
+        improved = throughput > self._best_throughput * (1 + self.tolerance)
+        if improved:
+            self.best_size = size
+            self._best_throughput = throughput
+        if self._settled or not improved:
+            self._settled = True
+            next_size = self.best_size or size
+        elif server_in_ms is not None and total_in_ms - server_in_ms <= server_in_ms:
+            # The server dominates - we're carefully trying if larger pages still amortize the fixed costs per request
+            next_size = int(size * self.growth_factor ** 0.5)
+        else:
+            next_size = int(size * self.growth_factor)
+        return max(self.min_size, min(next_size, self.max_size, memory_limit))
+
+
 class ResponseConfiguration(object):
 
     def __init__(self, return_alternatives: Optional[bool] = None, return_embedded: Optional[bool] = None, return_payload: Optional[bool] = None, return_permissions: Optional[bool] = None):
@@ -23,13 +23,20 @@ from __future__ import annotations
 import http.client
 import uuid
 from abc import ABC
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from enum import Enum, EnumMeta
-from typing import Any, Callable, Iterable, Optional, Dict, TypeVar, Generic, List
+from typing import Any, Callable, Deque, Iterable, Iterator, Optional, Dict, Tuple, TypeVar, Generic, List
 from uuid import UUID
 
 from pydantic import BaseModel, Field
 
 from kg_core.__communication import KGRequestWithResponseContext
+from kg_core.checkpoint import Checkpoint, CheckpointStore
+from kg_core.columnar import ColumnBuilder
+from kg_core.identifiers import UUIDInterner
+from kg_core.models import JsonLdRecord, Model
+from kg_core.request import AdaptivePageSize
 
 
 class ReleaseStatus(str, Enum):
@@ -89,15 +96,39 @@ class SpaceInformation(BaseModel):
     permissions: Optional[List[str]] = Field(None, alias="https://core.kg.ebrains.eu/vocab/meta/permissions")
 
 
+class TargetTypeInformation(BaseModel):
+    type: Optional[str] = Field(None, alias="https://core.kg.ebrains.eu/vocab/meta/type")
+    occurrences: Optional[int] = Field(None, alias="https://core.kg.ebrains.eu/vocab/meta/occurrences")
+
+
+class PropertyInformation(BaseModel):
+    identifier: Optional[str] = Field(None, alias="http://schema.org/identifier")
+    occurrences: Optional[int] = Field(None, alias="https://core.kg.ebrains.eu/vocab/meta/occurrences")
+    name_for_reverse_link: Optional[str] = Field(None, alias="https://core.kg.ebrains.eu/vocab/meta/nameForReverseLink")
+    target_types: Optional[List[TargetTypeInformation]] = Field(None, alias="https://core.kg.ebrains.eu/vocab/meta/targetTypes")
+
+
+class IncomingLinkInformation(BaseModel):
+    identifier: Optional[str] = Field(None, alias="http://schema.org/identifier")
+    name_for_reverse_link: Optional[str] = Field(None, alias="https://core.kg.ebrains.eu/vocab/meta/nameForReverseLink")
+    source_types: Optional[List[TargetTypeInformation]] = Field(None, alias="https://core.kg.ebrains.eu/vocab/meta/sourceTypes")
+
+
+class TypeInSpaceInformation(BaseModel):
+    space: Optional[str] = Field(None, alias="https://core.kg.ebrains.eu/vocab/meta/space")
+    occurrences: Optional[int] = Field(None, alias="https://core.kg.ebrains.eu/vocab/meta/occurrences")
+    properties: Optional[List[PropertyInformation]] = Field(None, alias="https://core.kg.ebrains.eu/vocab/meta/properties")
+
+
 class TypeInformation(BaseModel):
     identifier: Optional[str] = Field(None, alias="http://schema.org/identifier")
     description: Optional[str] = Field(None, alias="http://schema.org/description")
     name: Optional[str] = Field(None, alias="http://schema.org/name")
-    # TODO incoming_links
+    color: Optional[str] = Field(None, alias="https://core.kg.ebrains.eu/vocab/meta/color")
+    incoming_links: Optional[List[IncomingLinkInformation]] = Field(None, alias="https://core.kg.ebrains.eu/vocab/meta/incomingLinks")
     occurrences: Optional[int] = Field(None, alias="https://core.kg.ebrains.eu/vocab/meta/occurrences")
-
-    # TODO properties
-    # TODO spaces
+    properties: Optional[List[PropertyInformation]] = Field(None, alias="https://core.kg.ebrains.eu/vocab/meta/properties")
+    spaces: Optional[List[TypeInSpaceInformation]] = Field(None, alias="https://core.kg.ebrains.eu/vocab/meta/spaces")
 
 
 class ReducedUserInformation(BaseModel):
@@ -172,12 +203,15 @@ class _AbstractResultPage(_AbstractResult):
 class ResponseObjectConstructor(Generic[ResponseType]):
     @staticmethod
     def init_response_object(constructor: Callable[..., ResponseType], data: Any, id_namespace: Any) -> ResponseType:
-        if issubclass(constructor, BaseModel):
+        if issubclass(constructor, (Model, JsonLdRecord)):
+            # Generated models are decoded straight from the JSON
+            return constructor.from_json(data, id_namespace)  # type: ignore
+        elif issubclass(constructor, BaseModel):
             return constructor(**data)
         elif issubclass(constructor, Enum):
             # Not pretty but works for now
             return constructor[data]  # type: ignore
-        elif constructor == JsonLdDocument or constructor == Instance:
+        elif issubclass(constructor, JsonLdDocument):
             return constructor(data, id_namespace)
         else:
             return constructor(data)
@@ -185,26 +219,54 @@ class ResponseObjectConstructor(Generic[ResponseType]):
 
 class ResultPageIterator(Generic[ResponseType]):
 
-    def __init__(self, result_page: ResultPage[ResponseType]):
+    def __init__(self, result_page: ResultPage[ResponseType], adaptive_page_size: Optional[AdaptivePageSize] = None, checkpoint: Optional[CheckpointStore] = None):
         self._result_page: ResultPage[ResponseType] = result_page
+        self._adaptive_page_size = adaptive_page_size
+        self._checkpoint = checkpoint
+        self._completed_pages = 0
+        self._items = 0
 
     def __iter__(self):
-        self.n = 0
+        self.n = self._result_page.start_from or 0
+        if self._checkpoint:
+            self._resume(self._checkpoint.load())
         return self
 
+    def _resume(self, checkpoint: Optional[Checkpoint]) -> None:
+        context = self._result_page._original_response
+        if checkpoint and checkpoint.fingerprint == context.fingerprint() and checkpoint.start_from > self.n:
+            self._result_page = self._result_page._following_page(context.page(checkpoint.start_from, checkpoint.size, return_total_results=False))
+            self.n = checkpoint.start_from
+            self._items = checkpoint.items
+
+    def _next_page(self) -> Optional[ResultPage[ResponseType]]:
+        size = self._result_page._next_page_size(self._adaptive_page_size)
+        if self._checkpoint:
+            # The current page is completed - so the next page is where we need to resume
+            self._completed_pages += 1
+            if self._completed_pages % self._checkpoint.every_pages == 0:
+                context = self._result_page._original_response
+                self._checkpoint.save(Checkpoint(context.fingerprint(), self.n, size or self._result_page._requested_size or self._result_page.size, self._items, context.url))
+        return self._result_page.next_page(size)
+
     def __next__(self) -> Optional[ResultPage[ResponseType]]:
         if self._result_page:
             if self._result_page.error:
                 raise ValueError(self._result_page.error.message)
             elif self._result_page.data:
                 if self._result_page.total is None or (self._result_page.total and self.n < self._result_page.total):
-                    if self.n >= self._result_page.start_from + self._result_page.size and (
-                            self._result_page.has_next_page() is None or self._result_page.has_next_page()):
-                        self._result_page = self._result_page.next_page()
+                    if self.n >= self._result_page.start_from + self._result_page.size:
+                        # next_page() returns None if there is no next page - without a total, this is detected by a short or an empty page
+                        self._result_page = self._next_page()
                     if self._result_page:
                         result = self._result_page.data[self.n - self._result_page.start_from]
                         self.n += 1
+                        self._items += 1
                         return result
+        if self._checkpoint:
+            # We've reached the end - there is nothing to resume anymore
+            self._checkpoint.clear()
+            self._checkpoint = None
         raise StopIteration
 
 
@@ -217,17 +279,28 @@ class ResultPage(_AbstractResultPage, Generic[ResponseType]):
             response.content["data"]] if response.content and "data" in response.content else None
         self._original_response = response
         self._original_constructor = constructor
+        self._requested_size = response.requested_size
 
     def __str__(self):
         return f"{super.__str__(self)} - status: {self.error.code if self.error else 'success'}"
 
-    def next_page(self) -> Optional[ResultPage[ResponseType]]:
-        """ returns the next page of this result if there is one - otherwise returns None """
+    def as_type(self, constructor: Callable[..., Any]) -> ResultPage[Any]:
+        """ this page with its items built by another type (e.g. a generated model of kg_core.models) - the following pages are built by it as well """
+        return ResultPage[Any](response=self._original_response, constructor=constructor)
+
+    def _following_page(self, response: KGRequestWithResponseContext) -> ResultPage[ResponseType]:
+        result_page = ResultPage[ResponseType](response=response, constructor=self._original_constructor)
+        if result_page.total is None:
+            result_page.total = self.total
+        return result_page
+
+    def next_page(self, size: Optional[int] = None) -> Optional[ResultPage[ResponseType]]:
+        """ returns the next page of this result if there is one - otherwise returns None. By default, the next page has the same size as this one.
+        The following pages are requested without a total count - it is either known from this page already or not of interest. """
         next_page = self.has_next_page()
         if next_page is None or next_page:  # next page can be
-            result = self._original_response.next_page(self.start_from, self.size)
-            result_page = ResultPage[ResponseType](response=result,
-                                                   constructor=self._original_constructor) if result else None
+            result = self._original_response.next_page(self.start_from, self.size, size, return_total_results=False)
+            result_page = self._following_page(result) if result else None
             if result_page and result_page.data:
                 return result_page
             else:
@@ -235,16 +308,161 @@ class ResultPage(_AbstractResultPage, Generic[ResponseType]):
         return None
 
     def has_next_page(self) -> Optional[bool]:
-        """ returns True if a next page exists. Returns None if the original request has been executed without "full count" (by setting the "returnTotalResults" to false). """
+        """ returns True if a next page exists. If the original request has been executed without "full count" (by setting the "returnTotalResults" to false), only an empty page is known
+        to be the last one (the server can return less items than requested, e.g. if it caps the page size) - otherwise, None is returned. """
         if self.total:
             if self.total is not None and self.start_from is not None and self.size is not None:
                 return self.start_from + self.size < self.total
             return False
+        if self.data is not None and len(self.data) == 0:
+            return False
         return None
 
-    def items(self) -> ResultPageIterator[ResponseType]:
-        """ returns an iterator to be used e.g. within a for loop. Attention: Do not manipulate the underlying data structure within the loop! The resolution of pages is lazy and manipulations while iterating can lead to unexpected results."""
-        return ResultPageIterator(self)
+    def _count(self) -> Optional[int]:
+        result = _AbstractResultPage(self._original_response.page(0, 1, return_total_results=True))
+        if result.error:
+            raise ValueError(result.error.message)
+        return result.total
+
+    def total_in_background(self) -> Future:
+        """ requests the total number of results with a single, separate request executed in the background - e.g. to show the progress of an iteration
+        which has been started without "full count". Returns a future of the total (which is resolved immediately if the total is known already). """
+        if self.total is not None:
+            future: Future = Future()
+            future.set_result(self.total)
+            return future
+        executor = ThreadPoolExecutor(max_workers=1)
+        future = executor.submit(self._count)
+        executor.shutdown(wait=False)
+        return future
+
+    def _next_page_size(self, adaptive_page_size: Optional[AdaptivePageSize], items: Optional[int] = None) -> Optional[int]:
+        statistics = self._original_response.statistics
+        if adaptive_page_size and statistics and self.size:
+            if items is None:
+                items = len(self.data) if self.data else 0
+            return adaptive_page_size.next_size(self.size, items, statistics.total_in_ms, statistics.server_in_ms, statistics.size_in_bytes)
+        return None
+
+    def items(self, adaptive_page_size: Optional[AdaptivePageSize] = None, checkpoint: Optional[CheckpointStore] = None) -> ResultPageIterator[ResponseType]:
+        """ returns an iterator to be used e.g. within a for loop. Attention: Do not manipulate the underlying data structure within the loop! The resolution of pages is lazy and manipulations while iterating can lead to unexpected results.
+        If an AdaptivePageSize is passed, the size of the following pages is tuned according to the measured performance of the previous ones.
+        If a CheckpointStore is passed, the position of the iteration is saved after the completed pages. If the store contains the checkpoint of
+        an interrupted iteration of the same request, the iteration resumes from there (instead of this page). """
+        return ResultPageIterator(self, adaptive_page_size, checkpoint)
+
+    def pages(self, adaptive_page_size: Optional[AdaptivePageSize] = None) -> Iterator[ResultPage[ResponseType]]:
+        """ returns a generator of this page and all the following ones - loaded lazily one after the other """
+        page: Optional[ResultPage[ResponseType]] = self
+        while page:
+            if page.error:
+                raise ValueError(page.error.message)
+            yield page
+            page = page.next_page(page._next_page_size(adaptive_page_size)) if page.has_next_page() is not False else None
+
+    def _page_at(self, start_from: int, size: int) -> ResultPage[ResponseType]:
+        result_page = self._following_page(self._original_response.page(start_from, size, return_total_results=False))
+        # The items are built - we don't need to keep the raw content any longer
+        result_page._original_response.content = None
+        return result_page
+
+    def stream(self, prefetch: int = 0, adaptive_page_size: Optional[AdaptivePageSize] = None) -> Iterator[ResponseType]:
+        """ returns a generator of the items of this and all following pages which - other than items() - keeps only the
+        current page (and up to "prefetch" pages loaded in the background) in memory: the raw content of the loaded pages
+        is released as soon as the items are built and the following pages forget the items once they have been consumed.
+        The end of the result is detected by an empty page (or the total if it is known), so no total count is required. """
+        if self.error:
+            raise ValueError(self.error.message)
+        if not self.data:
+            return
+        yield from self.data
+        size = self._requested_size or self.size
+        if size is None or self.start_from is None or self.has_next_page() is False:
+            return
+        # A short page is either the last one or capped by the server - in both cases, its size is the one to continue with
+        size = min(size, len(self.data))
+        start_from = self.start_from + len(self.data)
+        if adaptive_page_size:
+            size = self._next_page_size(adaptive_page_size) or size
+        executor = ThreadPoolExecutor(max_workers=prefetch) if prefetch > 0 else None
+        pending: Deque[Tuple[int, int, Future]] = deque()
+        try:
+            while True:
+                if executor:
+                    while len(pending) <= prefetch:
+                        pending.append((start_from, size, executor.submit(self._page_at, start_from, size)))
+                        start_from += size
+                    offset, requested_size, future = pending.popleft()
+                    page = future.result()
+                else:
+                    offset, requested_size = start_from, size
+                    page = self._page_at(start_from, size)
+                    start_from += size
+                if page.error:
+                    raise ValueError(page.error.message)
+                data = page.data or []
+                page.data = None
+                if not data:
+                    return
+                last = page.total is not None and page.has_next_page() is False
+                if len(data) < requested_size:
+                    # The server returned less items than requested: continue right after them with the received size - the
+                    # pages prefetched at the following offsets don't fit anymore
+                    for _, _, f in pending:
+                        f.cancel()
+                    pending.clear()
+                    start_from = offset + len(data)
+                    size = len(data)
+                if adaptive_page_size:
+                    size = page._next_page_size(adaptive_page_size, len(data)) or size
+                for index in range(len(data)):
+                    item = data[index]
+                    data[index] = None
+                    yield item
+                if last:
+                    return
+        finally:
+            if executor:
+                for _, _, future in pending:
+                    future.cancel()
+                executor.shutdown(wait=False)
+
+    def _to_columns(self, max_items: Optional[int], shorten_keys: bool) -> ColumnBuilder:
+        builder = ColumnBuilder(shorten_keys=shorten_keys)
+        for page in self.pages():
+            if page.data:
+                if max_items is not None and builder.rows + len(page.data) >= max_items:
+                    builder.extend(page.data[:max_items - builder.rows])
+                    break
+                builder.extend(page.data)
+        return builder
+
+    def to_arrow(self, max_items: Optional[int] = None, shorten_keys: bool = True) -> Any:
+        """ loads this and all following pages (or up to max_items) into a pyarrow.Table. Nested JSON-LD is flattened as described in ColumnBuilder. Requires pyarrow to be installed. """
+        return self._to_columns(max_items, shorten_keys).to_arrow()
+
+    def to_pandas(self, max_items: Optional[int] = None, shorten_keys: bool = True) -> Any:
+        """ loads this and all following pages (or up to max_items) into a pandas.DataFrame. Nested JSON-LD is flattened as described in ColumnBuilder. Requires pandas to be installed. """
+        return self._to_columns(max_items, shorten_keys).to_pandas()
+
+    def _loaded_items(self, max_items: Optional[int]) -> Iterator[ResponseType]:
+        count = 0
+        for page in self.pages():
+            for item in page.data or []:
+                if max_items is not None and count >= max_items:
+                    return
+                count += 1
+                yield item
+
+    def instance_ids(self, max_items: Optional[int] = None, interner: Optional[UUIDInterner] = None) -> List[Optional[UUID]]:
+        """ loads this and all following pages (or up to max_items) and returns the UUIDs of the items. Pass the interner of the client (Client.identifiers) to share the parsed UUIDs across calls. """
+        interner = interner if interner is not None else UUIDInterner(self._original_response.id_namespace)
+        return interner.to_uuids([item.get("@id") if isinstance(item, dict) else None for item in self._loaded_items(max_items)])
+
+    def link_targets(self, property_name: str, max_items: Optional[int] = None, interner: Optional[UUIDInterner] = None) -> List[List[UUID]]:
+        """ loads this and all following pages (or up to max_items) and returns the UUIDs of the instances the items reference by the given property - one list per item """
+        interner = interner if interner is not None else UUIDInterner(self._original_response.id_namespace)
+        return interner.link_targets((item if isinstance(item, dict) else {} for item in self._loaded_items(max_items)), property_name)
 
 
 class Result(_AbstractResult, Generic[ResponseType]):
@@ -256,6 +474,11 @@ class Result(_AbstractResult, Generic[ResponseType]):
                                                                                            response.id_namespace) if response.content and "data" in response.content and \
                                                                                                                      response.content[
                                                                                                                          "data"] is not None else None
+        self._original_response = response
+
+    def as_type(self, constructor: Callable[..., Any]) -> Result[Any]:
+        """ this result with its data built by another type (e.g. a generated model of kg_core.models) """
+        return Result[Any](response=self._original_response, constructor=constructor)
 
     def __str__(self):
         return f"{super.__str__(self)} - status: {str(self.error.code) + ' (' + self.error.message + ')' if self.error is not None else 'success'}"
@@ -269,6 +492,11 @@ class ResultsById(_AbstractResult, Generic[ResponseType]):
             k: Result[ResponseType](response.copy_context(r), constructor) for k, r in
             response.content["data"].items()} if response.content and "data" in response.content and response.content[
             "data"] else None
+        self._original_response = response
+
+    def as_type(self, constructor: Callable[..., Any]) -> ResultsById[Any]:
+        """ these results with their data built by another type (e.g. a generated model of kg_core.models) """
+        return ResultsById[Any](response=self._original_response, constructor=constructor)
 
     def __str__(self):
         return f"{super.__str__(self)} - status: {self.error.code if self.error else 'success'}"
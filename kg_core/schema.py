@@ -0,0 +1,224 @@
+#  Copyright 2022 EBRAINS AISBL
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0.
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+#  This open source software code was developed in part or in whole in the
+#  Human Brain Project, funded from the European Union's Horizon 2020
+#  Framework Programme for Research and Innovation under
+#  Specific Grant Agreements No. 720270, No. 785907, and No. 945539
+#  (Human Brain Project SGA1, SGA2 and SGA3).
+#
+
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from kg_core.kg import Client
+from kg_core.request import Pagination, Stage
+from kg_core.response import IncomingLinkInformation, PropertyInformation, TypeInformation
+
+# Increased whenever the structure of the persisted catalog changes - files of other versions are ignored
+SCHEMA_FORMAT_VERSION = 1
+
+
+class _SchemaIndex(object):
+    """ The (immutable) indexes of a loaded catalog - replaced as a whole on refresh """
+
+    def __init__(self, documents: List[Dict[str, Any]], loaded_at: float):
+        self.documents = documents
+        self.loaded_at = loaded_at
+        self.types: Dict[str, TypeInformation] = {}
+        self.properties: Dict[str, Dict[str, PropertyInformation]] = {}
+        self.incoming_links: Dict[str, Dict[str, IncomingLinkInformation]] = {}
+        self.target_types: Dict[str, Dict[str, int]] = {}
+        self.types_by_property: Dict[str, List[str]] = {}
+        self.types_by_space: Dict[str, List[str]] = {}
+        for document in documents:
+            type_information = TypeInformation(**document)
+            identifier = type_information.identifier
+            if not identifier:
+                continue
+            self.types[identifier] = type_information
+            properties = self.properties[identifier] = {}
+            for p in type_information.properties or []:
+                if not p.identifier:
+                    continue
+                properties[p.identifier] = p
+                self.types_by_property.setdefault(p.identifier, []).append(identifier)
+                targets = self.target_types.setdefault(p.identifier, {})
+                for t in p.target_types or []:
+                    if t.type:
+                        targets[t.type] = targets.get(t.type, 0) + (t.occurrences or 0)
+            self.incoming_links[identifier] = {l.identifier: l for l in type_information.incoming_links or [] if l.identifier}
+            for s in type_information.spaces or []:
+                if s.space:
+                    self.types_by_space.setdefault(s.space, []).append(identifier)
+
+
+class SchemaCatalog(object):
+    """
+    All types (of a space or all accessible spaces, in the given stage) including their properties and incoming links,
+    loaded once with a few paginated requests and indexed in memory - so schema-driven code doesn't need to ask the KG
+    (and walk the raw type documents) again and again.
+
+    The catalog is loaded on the first access and refreshed when it is older than "ttl_in_seconds" (if a refresh
+    fails, the outdated catalog is kept, the error is available as "last_error" and the refresh is only retried after
+    "retry_in_seconds" - at most "ttl_in_seconds"). With a "path", the loaded catalog
+    is written to this file and - as long as it is not outdated - read from there by the next process (warm start).
+    """
+
+    def __init__(self, client: Client, space: Optional[str] = None, stage: Stage = Stage.RELEASED, ttl_in_seconds: Optional[float] = 3600,
+                 path: Optional[str] = None, page_size: int = 100, retry_in_seconds: float = 60):
+        self._client = client
+        self.space = space
+        self.stage = stage
+        self.ttl_in_seconds = ttl_in_seconds
+        self.path = path
+        self._page_size = page_size
+        self.retry_in_seconds = retry_in_seconds
+        self._index: Optional[_SchemaIndex] = None
+        self._lock = threading.Lock()
+        self.last_error: Optional[str] = None
+        self._failed_at: Optional[float] = None
+
+    def _expired(self, loaded_at: float) -> bool:
+        return self.ttl_in_seconds is not None and time.time() - loaded_at >= self.ttl_in_seconds
+
+    def _read(self) -> Optional[_SchemaIndex]:
+        if not self.path or not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path) as f:
+                content = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if content.get("version") != SCHEMA_FORMAT_VERSION or content.get("space") != self.space or content.get("stage") != str(self.stage) or self._expired(content.get("loadedAt", 0)):
+            return None
+        return _SchemaIndex(content.get("types") or [], content["loadedAt"])
+
+    def _write(self, index: _SchemaIndex) -> None:
+        if not self.path:
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        content = {"version": SCHEMA_FORMAT_VERSION, "space": self.space, "stage": str(self.stage), "loadedAt": index.loaded_at, "types": index.documents}
+        fd, temporary = tempfile.mkstemp(dir=directory, prefix=".schema-")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(content, f)
+            os.replace(temporary, self.path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+    def _fetch(self) -> _SchemaIndex:
+        loaded_at = time.time()
+        documents: List[Dict[str, Any]] = []
+        first_page = self._client.types.list(space=self.space, stage=self.stage, with_incoming_links=True, with_properties=True,
+                                             pagination=Pagination(size=self._page_size, return_total_results=False))
+        for page in first_page.pages():
+            if page.error:
+                raise ValueError(f"Was not able to load the types: {page.error.message}")
+            documents.extend((page._original_response.content or {}).get("data") or [])
+        return _SchemaIndex(documents, loaded_at)
+
+    def _load(self) -> None:
+        index = self._read()
+        if index is None:
+            index = self._fetch()
+            self._write(index)
+        self._index = index
+
+    def _refresh(self) -> None:
+        index = self._fetch()
+        self._write(index)
+        self._index = index
+        self.last_error = None
+        self._failed_at = None
+
+    def load(self) -> SchemaCatalog:
+        """ loads the catalog from the file (if it is not outdated) or from the KG """
+        with self._lock:
+            self._load()
+        return self
+
+    def refresh(self) -> SchemaCatalog:
+        """ loads the catalog from the KG (and writes it to the file) """
+        with self._lock:
+            self._refresh()
+        return self
+
+    def _outdated(self, index: _SchemaIndex) -> bool:
+        if not self._expired(index.loaded_at):
+            return False
+        retry_in_seconds = min(self.retry_in_seconds, self.ttl_in_seconds or self.retry_in_seconds)
+        return self._failed_at is None or time.time() - self._failed_at >= retry_in_seconds
+
+    def _current(self) -> _SchemaIndex:
+        index = self._index
+        if index is not None and not self._outdated(index):
+            return index
+        with self._lock:
+            # checked again - another thread might have loaded the catalog (or failed to do so) in the meantime
+            index = self._index
+            if index is None:
+                self._load()
+            elif self._outdated(index):
+                try:
+                    self._refresh()
+                except (ValueError, OSError) as e:
+                    self.last_error = str(e)
+                    self._failed_at = time.time()
+            return self._index  # type: ignore
+
+    @property
+    def loaded_at(self) -> Optional[float]:
+        return self._index.loaded_at if self._index else None
+
+    def types(self) -> List[TypeInformation]:
+        return list(self._current().types.values())
+
+    def type(self, identifier: str) -> Optional[TypeInformation]:
+        return self._current().types.get(identifier)
+
+    def types_in_space(self, space: str) -> List[str]:
+        return list(self._current().types_by_space.get(space, []))
+
+    def properties(self, target_type: str) -> List[PropertyInformation]:
+        return list(self._current().properties.get(target_type, {}).values())
+
+    def property(self, target_type: str, property_name: str) -> Optional[PropertyInformation]:
+        return self._current().properties.get(target_type, {}).get(property_name)
+
+    def types_with_property(self, property_name: str) -> List[str]:
+        return list(self._current().types_by_property.get(property_name, []))
+
+    def target_types(self, property_name: str, source_type: Optional[str] = None) -> List[str]:
+        """ the types the property links to - of the given source type only or of all types having the property """
+        if source_type is None:
+            return list(self._current().target_types.get(property_name, {}))
+        p = self.property(source_type, property_name)
+        return [t.type for t in (p.target_types or []) if t.type] if p else []
+
+    def incoming_links(self, target_type: str) -> List[IncomingLinkInformation]:
+        return list(self._current().incoming_links.get(target_type, {}).values())
+
+    def source_types(self, target_type: str, property_name: str) -> List[str]:
+        """ the types linking to the given type by the property """
+        link = self._current().incoming_links.get(target_type, {}).get(property_name)
+        return [t.type for t in (link.source_types or []) if t.type] if link else []
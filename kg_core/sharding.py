@@ -0,0 +1,220 @@
+#  Copyright 2022 EBRAINS AISBL
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0.
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+#  This open source software code was developed in part or in whole in the
+#  Human Brain Project, funded from the European Union's Horizon 2020
+#  Framework Programme for Research and Innovation under
+#  Specific Grant Agreements No. 720270, No. 785907, and No. 945539
+#  (Human Brain Project SGA1, SGA2 and SGA3).
+#
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+import queue
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from uuid import UUID
+
+from kg_core.kg import Client
+from kg_core.request import Pagination, Stage
+from kg_core.response import JsonLdDocument, ResultPage
+
+# The client of the worker process - created once per process by the client factory
+_worker_client: Optional[Client] = None
+# The queue the results are sent through (in chunks) and the event telling the workers to stop - if they are merged into an iterator
+_worker_results: Any = None
+_worker_stop: Any = None
+
+
+def _initialize_worker(client_factory: Callable[[], Client], results: Any = None, stop: Any = None) -> None:
+    global _worker_client, _worker_results, _worker_stop
+    _worker_client = client_factory()
+    _worker_results = results
+    _worker_stop = stop
+    if results is not None:
+        # Chunks discarded by a stopped iteration must not keep the worker from exiting - the others are consumed before the pool shuts down
+        results.cancel_join_thread()
+
+
+class Shard(object):
+    """ A part of a query execution: the results of one space (or all of them if space is None) from "start_from" - up to "limit" items if defined """
+
+    def __init__(self, space: Optional[str], start_from: int = 0, limit: Optional[int] = None):
+        self.space = space
+        self.start_from = start_from
+        self.limit = limit
+
+    def __str__(self):
+        return f"Shard {self.space or 'all spaces'} [{self.start_from}:{self.start_from + self.limit if self.limit is not None else ''}]"
+
+
+class _QueryExecution(object):
+
+    def __init__(self, query_id: Optional[UUID], payload: Optional[dict], additional_request_params: Dict[str, Any], instance_id: Optional[UUID], stage: Stage, page_size: int):
+        self.query_id = query_id
+        self.payload = payload
+        self.additional_request_params = additional_request_params
+        self.instance_id = instance_id
+        self.stage = stage
+        self.page_size = page_size
+        self.shards: List[Shard] = []
+
+    def first_page(self, client: Client, shard: Shard, pagination: Pagination) -> ResultPage[JsonLdDocument]:
+        restrict_to_spaces = [shard.space] if shard.space else None
+        if self.query_id:
+            return client.queries.execute_query_by_id(self.query_id, self.additional_request_params, self.instance_id, restrict_to_spaces, self.stage, pagination)
+        return client.queries.test_query(self.payload, self.additional_request_params, self.instance_id, restrict_to_spaces, self.stage, pagination)
+
+    def total(self, client: Client, shard: Shard) -> int:
+        result = self.first_page(client, shard, Pagination(size=1, return_total_results=True))
+        if result.error:
+            raise ValueError(result.error.message)
+        return result.total or 0
+
+    def items(self, client: Client, shard: Shard) -> Iterator[JsonLdDocument]:
+        size = min(self.page_size, shard.limit) if shard.limit is not None else self.page_size
+        first_page = self.first_page(client, shard, Pagination(start=shard.start_from, size=size, return_total_results=False))
+        for count, item in enumerate(first_page.stream()):
+            if shard.limit is not None and count >= shard.limit:
+                break
+            yield item
+
+
+def _execute_shard(execution: _QueryExecution, shard: Shard, sink: Optional[Callable[[Shard, Iterator[JsonLdDocument]], Any]]) -> Any:
+    items = execution.items(_worker_client, shard)
+    return sink(shard, items)
+
+
+def _stream_shard(execution: _QueryExecution, index: int) -> None:
+    """ sends the results of the shard in chunks of up to a page to the main process - followed by an end marker (also if the execution fails) """
+    try:
+        chunk: List[JsonLdDocument] = []
+        for item in execution.items(_worker_client, execution.shards[index]):
+            chunk.append(item)
+            if len(chunk) >= execution.page_size:
+                if _worker_stop.is_set():
+                    return
+                _worker_results.put((index, chunk))
+                chunk = []
+        if chunk and not _worker_stop.is_set():
+            _worker_results.put((index, chunk))
+    finally:
+        _worker_results.put((index, None))
+
+
+class ShardedQueryExecution(object):
+    """
+    Executes a query split into shards - one per space and optionally further split into ranges of "items_per_shard"
+    results - in a pool of processes. This scales not only the waiting for the KG but also the (GIL-bound) decoding
+    of the responses across the available cores.
+
+    Every worker process creates its own client (and therefore its own session and token) with the given client
+    factory. Since it is passed to the worker processes, it has to be picklable - e.g. a function defined at module
+    level or a functools.partial of it.
+
+    The results are either merged into a single iterator or handed to a sink which is called within the worker with the
+    shard and an iterator of its results. The sink (again a picklable callable) can e.g. write the results to a file per
+    shard - its return value is reported per shard. The merged iterator receives the results of all shards interleaved
+    in chunks of up to "page_size" items as soon as they are loaded - only a few chunks per process are buffered, so
+    the workers wait if the consumer is slower than them.
+    """
+
+    def __init__(self, client_factory: Callable[[], Client], processes: Optional[int] = None, page_size: int = 1000, items_per_shard: Optional[int] = None):
+        self._client_factory = client_factory
+        self._processes = processes
+        self._page_size = page_size
+        self._items_per_shard = items_per_shard
+
+    def _spaces(self, client: Client) -> List[str]:
+        spaces: List[str] = []
+        for space in client.spaces.list(pagination=Pagination(size=1000, return_total_results=False)).items():
+            if space.identifier:
+                spaces.append(space.identifier)
+        return spaces
+
+    def _shards(self, execution: _QueryExecution, spaces: Optional[List[str]]) -> List[Shard]:
+        client = self._client_factory()
+        shards: List[Shard] = []
+        for space in spaces if spaces is not None else self._spaces(client):
+            if self._items_per_shard:
+                total = execution.total(client, Shard(space))
+                shards.extend(Shard(space, start, self._items_per_shard) for start in range(0, total, self._items_per_shard))
+            else:
+                shards.append(Shard(space))
+        return shards
+
+    def _run(self, execution: _QueryExecution, spaces: Optional[List[str]], sink: Callable[[Shard, Iterator[JsonLdDocument]], Any]) -> Dict[Shard, Any]:
+        shards = self._shards(execution, spaces)
+        if not shards:
+            return {}
+        with ProcessPoolExecutor(max_workers=self._processes, initializer=_initialize_worker, initargs=(self._client_factory,)) as executor:
+            futures = {executor.submit(_execute_shard, execution, shard, sink): shard for shard in shards}
+            return {futures[future]: future.result() for future in as_completed(futures)}
+
+    def _stream(self, execution: _QueryExecution, spaces: Optional[List[str]]) -> Iterator[JsonLdDocument]:
+        execution.shards = self._shards(execution, spaces)
+        if not execution.shards:
+            return
+        context = multiprocessing.get_context()
+        results = context.Queue(maxsize=2 * (self._processes or os.cpu_count() or 1))
+        stop = context.Event()
+        with ProcessPoolExecutor(max_workers=self._processes, mp_context=context, initializer=_initialize_worker, initargs=(self._client_factory, results, stop)) as executor:
+            futures: List[Future] = [executor.submit(_stream_shard, execution, index) for index in range(len(execution.shards))]
+            running = len(futures)
+            try:
+                while running:
+                    try:
+                        index, chunk = results.get(timeout=1)
+                    except queue.Empty:
+                        # A worker which died doesn't send its end marker
+                        for future in futures:
+                            if future.done() and future.exception():
+                                raise future.exception()  # type: ignore
+                        continue
+                    if chunk is None:
+                        running -= 1
+                        # Raises the error of the shard (if any)
+                        futures[index].result()
+                    else:
+                        yield from chunk
+            finally:
+                if running:
+                    # The iteration has been stopped (or failed) - the workers stop and their pending chunks are discarded, so they don't wait for the consumer
+                    stop.set()
+                    for future in futures:
+                        future.cancel()
+                    while not all(future.done() for future in futures):
+                        try:
+                            results.get(timeout=0.1)
+                        except queue.Empty:
+                            pass
+
+    def _execute(self, execution: _QueryExecution, spaces: Optional[List[str]], sink: Optional[Callable[[Shard, Iterator[JsonLdDocument]], Any]]) -> Any:
+        if sink:
+            return self._run(execution, spaces, sink)
+        return self._stream(execution, spaces)
+
+    def execute_query_by_id(self, query_id: UUID, spaces: Optional[List[str]] = None, additional_request_params: Optional[Dict[str, Any]] = None, instance_id: Optional[UUID] = None,
+                            stage: Stage = Stage.RELEASED, sink: Optional[Callable[[Shard, Iterator[JsonLdDocument]], Any]] = None) -> Any:
+        """ executes the stored query sharded by the given spaces (all accessible spaces by default). Returns an iterator of the results or - if a sink is
+        given - a dictionary of the return values of the sink by shard """
+        return self._execute(_QueryExecution(query_id, None, additional_request_params or {}, instance_id, stage, self._page_size), spaces, sink)
+
+    def test_query(self, payload: dict, spaces: Optional[List[str]] = None, additional_request_params: Optional[Dict[str, Any]] = None, instance_id: Optional[UUID] = None,
+                   stage: Stage = Stage.RELEASED, sink: Optional[Callable[[Shard, Iterator[JsonLdDocument]], Any]] = None) -> Any:
+        """ executes the query in the payload sharded by the given spaces (all accessible spaces by default). Returns an iterator of the results or - if a
+        sink is given - a dictionary of the return values of the sink by shard """
+        return self._execute(_QueryExecution(None, payload, additional_request_params or {}, instance_id, stage, self._page_size), spaces, sink)
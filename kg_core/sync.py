@@ -0,0 +1,191 @@
+#  Copyright 2022 EBRAINS AISBL
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0.
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+#  This open source software code was developed in part or in whole in the
+#  Human Brain Project, funded from the European Union's Horizon 2020
+#  Framework Programme for Research and Innovation under
+#  Specific Grant Agreements No. 720270, No. 785907, and No. 945539
+#  (Human Brain Project SGA1, SGA2 and SGA3).
+#
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+from uuid import UUID
+
+from kg_core.kg import Client
+from kg_core.request import Pagination, ResponseConfiguration, Stage
+from kg_core.response import Instance
+
+REVISION = "https://core.kg.ebrains.eu/vocab/meta/revision"
+TRANSACTION_ID = "https://core.kg.ebrains.eu/vocab/meta/transactionId"
+
+
+class SyncReport(object):
+
+    def __init__(self, target_type: str, space: Optional[str]):
+        self.target_type = target_type
+        self.space = space
+        self.created = 0
+        self.updated = 0
+        self.deleted = 0
+        self.unchanged = 0
+        self.missing = 0
+        self.fetched = 0
+        self.used_revisions = True
+        self.duration_in_ms = 0
+
+    def __str__(self):
+        return f"Sync of {self.target_type}{' in ' + self.space if self.space else ''}: {self.created} created, {self.updated} updated, {self.deleted} deleted, {self.unchanged} unchanged, {self.missing} missing ({self.fetched} documents fetched{'' if self.used_revisions else ' without revisions'} in {self.duration_in_ms}ms)"
+
+
+class InstanceMirror(object):
+    """
+    A local (SQLite-backed) replica of the instances of a type - optionally restricted to a space.
+
+    A sync first lists the instances without payload to receive their ids and revisions (or the id of the transaction
+    which wrote them) and then only fetches the new or changed instances in bulk. Instances which are not listed anymore
+    are removed from the mirror, listed instances which can't be fetched anymore are reported as missing. If the KG
+    doesn't provide either of them in the listing, the mirror falls back to listing the full documents and compares their
+    content - the report tells so ("used_revisions" is False), since the sync then costs as much as a full download.
+    """
+
+    def __init__(self, client: Client, path: str, stage: Stage = Stage.RELEASED, page_size: int = 1000, chunk_size: int = 200):
+        self._client = client
+        self._id_namespace = client.instances._kg_config.id_namespace
+        self._stage = stage
+        self._page_size = page_size
+        self._chunk_size = chunk_size
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("CREATE TABLE IF NOT EXISTS mirror (scope TEXT NOT NULL, instance_id TEXT NOT NULL, revision TEXT NOT NULL, document TEXT NOT NULL, PRIMARY KEY (scope, instance_id))")
+        self._connection.execute("CREATE TABLE IF NOT EXISTS sync_state (scope TEXT PRIMARY KEY, last_sync REAL NOT NULL)")
+
+    def _scope(self, target_type: str, space: Optional[str]) -> str:
+        return f"{self._stage}|{target_type}|{space or ''}"
+
+    @staticmethod
+    def _content_revision(document: Dict[str, Any]) -> str:
+        return hashlib.sha1(json.dumps(document, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+    def _stored_revisions(self, scope: str) -> Dict[str, str]:
+        with self._lock:
+            return {i: r for i, r in self._connection.execute("SELECT instance_id, revision FROM mirror WHERE scope = ?", (scope,))}
+
+    def _store(self, scope: str, documents: List[Instance], revisions: Dict[str, str]) -> None:
+        rows = [(scope, str(d.uuid), revisions[str(d.uuid)], json.dumps(d)) for d in documents if d.uuid]
+        with self._lock:
+            self._connection.executemany("INSERT OR REPLACE INTO mirror (scope, instance_id, revision, document) VALUES (?, ?, ?, ?)", rows)
+
+    @staticmethod
+    def _listed_revision(instance: Instance) -> Optional[str]:
+        revision = instance.get(REVISION)
+        if revision:
+            return str(revision)
+        transaction_id = instance.get(TRANSACTION_ID)
+        return f"transaction|{transaction_id}" if transaction_id else None
+
+    def _list(self, target_type: str, space: Optional[str], with_payload: bool) -> Iterator[Instance]:
+        result = self._client.instances.list(target_type, space=space, stage=self._stage, response_configuration=ResponseConfiguration(return_payload=with_payload),
+                                             pagination=Pagination(size=self._page_size, return_total_results=False))
+        for page in result.pages():
+            if page.data:
+                yield from page.data
+
+    def sync(self, target_type: str, space: Optional[str] = None) -> SyncReport:
+        """ brings the mirror of the given type (and space) up to date and returns a report about what has changed """
+        start = time.perf_counter()
+        report = SyncReport(target_type, space)
+        scope = self._scope(target_type, space)
+        stored = self._stored_revisions(scope)
+        listed: Dict[str, Optional[str]] = {str(i.uuid): self._listed_revision(i) for i in self._list(target_type, space, with_payload=False) if i.uuid}
+        if all(listed.values()):
+            changed = [i for i, r in listed.items() if stored.get(i) != r]
+            for chunk_start in range(0, len(changed), self._chunk_size):
+                chunk = changed[chunk_start:chunk_start + self._chunk_size]
+                result = self._client.instances.get_by_ids(chunk, stage=self._stage)
+                if result.error:
+                    raise ValueError(result.error.message)
+                documents = [r.data for r in (result.data or {}).values() if r.data and str(r.data.uuid) in listed]
+                report.fetched += len(documents)
+                # The revision of the listing is stored (rather than the one of the document) so the next sync compares like with like
+                self._store(scope, documents, {str(d.uuid): listed[str(d.uuid)] for d in documents})
+                for d in documents:
+                    if str(d.uuid) in stored:
+                        report.updated += 1
+                    else:
+                        report.created += 1
+            # Deleted since the listing or not readable - they are neither stored nor counted (the next sync tries again)
+            report.missing = len(changed) - report.created - report.updated
+            report.unchanged = len(listed) - len(changed)
+        else:
+            # No revisions available - we need to look at the documents themselves.
+            report.used_revisions = False
+            listed = {}
+            changed_documents: List[Instance] = []
+            revisions: Dict[str, str] = {}
+            for document in self._list(target_type, space, with_payload=True):
+                if document.uuid:
+                    report.fetched += 1
+                    instance_id = str(document.uuid)
+                    revision = self._content_revision(document)
+                    listed[instance_id] = revision
+                    if stored.get(instance_id) != revision:
+                        if instance_id in stored:
+                            report.updated += 1
+                        else:
+                            report.created += 1
+                        changed_documents.append(document)
+                        revisions[instance_id] = revision
+                        if len(changed_documents) >= self._chunk_size:
+                            self._store(scope, changed_documents, revisions)
+                            changed_documents = []
+                    else:
+                        report.unchanged += 1
+            self._store(scope, changed_documents, revisions)
+        deleted = [(scope, i) for i in stored if i not in listed]
+        with self._lock:
+            self._connection.executemany("DELETE FROM mirror WHERE scope = ? AND instance_id = ?", deleted)
+            self._connection.execute("INSERT OR REPLACE INTO sync_state (scope, last_sync) VALUES (?, ?)", (scope, time.time()))
+        report.deleted = len(deleted)
+        report.duration_in_ms = int((time.perf_counter() - start) * 1000)
+        return report
+
+    def last_sync(self, target_type: str, space: Optional[str] = None) -> Optional[float]:
+        """ returns the timestamp of the last successful sync of the given type (and space) """
+        with self._lock:
+            row = self._connection.execute("SELECT last_sync FROM sync_state WHERE scope = ?", (self._scope(target_type, space),)).fetchone()
+        return row[0] if row else None
+
+    def get(self, instance_id: UUID, target_type: str, space: Optional[str] = None) -> Optional[Instance]:
+        with self._lock:
+            row = self._connection.execute("SELECT document FROM mirror WHERE scope = ? AND instance_id = ?", (self._scope(target_type, space), str(instance_id))).fetchone()
+        return Instance(json.loads(row[0]), self._id_namespace) if row else None
+
+    def instances(self, target_type: str, space: Optional[str] = None) -> Iterator[Instance]:
+        """ iterates all mirrored instances of the given type (and space) """
+        with self._lock:
+            rows = self._connection.execute("SELECT document FROM mirror WHERE scope = ?", (self._scope(target_type, space),)).fetchall()
+        for row in rows:
+            yield Instance(json.loads(row[0]), self._id_namespace)
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,153 @@
+#  Copyright 2022 EBRAINS AISBL
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0.
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+#  This open source software code was developed in part or in whole in the
+#  Human Brain Project, funded from the European Union's Horizon 2020
+#  Framework Programme for Research and Innovation under
+#  Specific Grant Agreements No. 720270, No. 785907, and No. 945539
+#  (Human Brain Project SGA1, SGA2 and SGA3).
+#
+
+from __future__ import annotations
+
+import base64
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from kg_core.__communication import TokenHandler
+from kg_core.token_store import FileTokenStore
+
+# How long to wait before the owner retries a failed refresh
+_RETRY_INTERVAL_IN_SECONDS = 5
+
+
+def token_expiry(token: Optional[str]) -> Optional[float]:
+    """ the expiration time ("exp" claim) of a JWT access token - None if the token is not a JWT or doesn't expire """
+    try:
+        payload = token.split(".")[1]
+        claims: Dict[str, Any] = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        return float(claims["exp"]) if "exp" in claims else None
+    except (AttributeError, IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+class BrokeredTokenHandler(TokenHandler):
+    """
+    Shares the tokens of the wrapped token handler (e.g. ClientCredentials) with all processes using the same token
+    store - e.g. the workers of a multiprocessing pool - so the identity provider is contacted once per token
+    lifetime instead of once per process.
+
+    The process which creates the broker owns the token: it refreshes it in a background thread before it expires
+    ("refresh_margin_in_seconds" ahead). All other processes - including forked children which inherit the broker - only
+    read the current token from the store. If the owner is gone and the token is about to expire, the first process
+    noticing it fetches a new one (under the lock of the store, so the others pick up its result).
+
+    The expiration is read from the "exp" claim of the token - tokens which are not JWTs are used until they are rejected.
+    """
+
+    def __init__(self, token_handler: TokenHandler, key: str, token_store: Optional[FileTokenStore] = None, refresh_margin_in_seconds: float = 60,
+                 background_refresh: bool = True):
+        super(BrokeredTokenHandler, self).__init__()
+        self._token_handler = token_handler
+        self._key = key
+        self._token_store = token_store or FileTokenStore()
+        self._refresh_margin_in_seconds = refresh_margin_in_seconds
+        self._background_refresh = background_refresh
+        self._owner_pid = os.getpid()
+        self._pid = self._owner_pid
+        self._expires_at: Optional[float] = None
+        self._refresher: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def define_endpoint(self, kg_endpoint: str):
+        self._token_handler.define_endpoint(kg_endpoint)
+
+    def _reset_after_fork(self) -> None:
+        # Neither the lock (which could have been held by another thread) nor the refresher thread survive a fork
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._refresher = None
+        self._stopped = threading.Event()
+
+    def _needs_refresh(self, expires_at: Optional[float], margin_in_seconds: float) -> bool:
+        return expires_at is not None and expires_at < time.time() + margin_in_seconds
+
+    def _is_stale(self, entry: Optional[Dict[str, Any]]) -> bool:
+        """ the owner refreshes the token "refresh_margin_in_seconds" ahead - the others only step in if it hasn't done so within half of that time """
+        return not entry or not entry.get("access_token") or self._needs_refresh(entry.get("expires_at"), self._refresh_margin_in_seconds / 2)
+
+    def _use(self, entry: Dict[str, Any]) -> str:
+        self._token = entry["access_token"]
+        self._expires_at = entry.get("expires_at")
+        return self._token
+
+    def _fetch_token(self, rejected_token: Optional[str] = None, margin_in_seconds: float = 0) -> Optional[str]:
+        with self._token_store.locked():
+            entry = self._token_store.read(self._key)
+            # Another process could have replaced the token in the meantime
+            if entry and entry.get("access_token") and entry["access_token"] != rejected_token and not self._needs_refresh(entry.get("expires_at"), margin_in_seconds):
+                return self._use(entry)
+            token = self._token_handler._fetch_token()
+            if not token:
+                return None
+            entry = {"access_token": token, "expires_at": token_expiry(token)}
+            self._token_store.write(self._key, entry)
+            return self._use(entry)
+
+    def _refresh_in_background(self) -> None:
+        while not self._stopped.is_set():
+            if self._expires_at is None:
+                # There is nothing to refresh proactively - the token is replaced as soon as it is rejected
+                return
+            if self._needs_refresh(self._expires_at, self._refresh_margin_in_seconds):
+                try:
+                    with self._lock:
+                        token = self._fetch_token(margin_in_seconds=self._refresh_margin_in_seconds)
+                except Exception:
+                    token = None
+                if not token or self._needs_refresh(self._expires_at, self._refresh_margin_in_seconds):
+                    # Either the refresh failed or the tokens live shorter than the margin - we don't want to hammer the identity provider
+                    self._stopped.wait(_RETRY_INTERVAL_IN_SECONDS)
+                    continue
+            self._stopped.wait(self._expires_at - self._refresh_margin_in_seconds - time.time())
+
+    def _ensure_refresher(self) -> None:
+        if self._background_refresh and self._pid == self._owner_pid and not self._refresher and self._expires_at is not None:
+            self._refresher = threading.Thread(target=self._refresh_in_background, name="kg-token-broker", daemon=True)
+            self._refresher.start()
+
+    def get_token(self, force_fetch: bool = False) -> Optional[str]:
+        if self._pid != os.getpid():
+            self._reset_after_fork()
+        if self._token and not force_fetch and not self._needs_refresh(self._expires_at, self._refresh_margin_in_seconds):
+            return self._token
+        rejected_token = self._token if force_fetch else None
+        with self._lock:
+            if force_fetch:
+                self._fetch_token(rejected_token)
+            else:
+                entry = self._token_store.read(self._key)
+                if self._is_stale(entry):
+                    self._fetch_token(margin_in_seconds=self._refresh_margin_in_seconds / 2)
+                else:
+                    self._use(entry)
+        self._ensure_refresher()
+        return self._token
+
+    def close(self) -> None:
+        """ stops the proactive refresh of the owner """
+        self._stopped.set()
@@ -0,0 +1,164 @@
+#  Copyright 2022 EBRAINS AISBL
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0.
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+#  This open source software code was developed in part or in whole in the
+#  Human Brain Project, funded from the European Union's Horizon 2020
+#  Framework Programme for Research and Innovation under
+#  Specific Grant Agreements No. 720270, No. 785907, and No. 945539
+#  (Human Brain Project SGA1, SGA2 and SGA3).
+#
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+try:
+    import fcntl
+
+    def _lock(fd: int) -> None:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+
+    def _unlock(fd: int) -> None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+except ImportError:  # Windows
+    import msvcrt
+
+    def _lock(fd: int) -> None:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+
+    def _unlock(fd: int) -> None:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+def _default_path() -> str:
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "ebrains_kg_core", "tokens.json")
+
+
+class FileTokenStore(object):
+    """
+    Shares tokens (and the OpenID configurations) across processes through a JSON file which is only readable and
+    writable by the current user (0600, its directory 0700). Concurrent access is serialized by an exclusive lock on a
+    separate lock file, which is held across the whole "read - fetch - write" cycle, so a token is only fetched (or a
+    device flow only started) by one process at a time - the others pick up the result.
+
+    Attention: the refresh tokens are stored unencrypted - the protection relies on the file permissions.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or _default_path()
+        self._pid = os.getpid()
+        self._thread_lock = threading.RLock()
+        self._lock_fd: Optional[int] = None
+        self._lock_depth = 0
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+
+    def _reset_after_fork(self) -> None:
+        # The thread lock could have been held by another thread of the parent at the time of the fork and the inherited
+        # lock file descriptor shares the lock with the parent - so it is closed without unlocking it.
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+        self._pid = os.getpid()
+        self._thread_lock = threading.RLock()
+        self._lock_fd = None
+        self._lock_depth = 0
+
+    @contextmanager
+    def locked(self) -> Iterator[FileTokenStore]:
+        """ holds the exclusive lock of the store (re-entrant within the same process) """
+        if self._pid != os.getpid():
+            self._reset_after_fork()
+        with self._thread_lock:
+            if self._lock_depth == 0:
+                self._lock_fd = os.open(f"{self.path}.lock", os.O_RDWR | os.O_CREAT, 0o600)
+                _lock(self._lock_fd)
+            self._lock_depth += 1
+            try:
+                yield self
+            finally:
+                self._lock_depth -= 1
+                if self._lock_depth == 0 and self._lock_fd is not None:
+                    _unlock(self._lock_fd)
+                    os.close(self._lock_fd)
+                    self._lock_fd = None
+
+    def _read_all(self) -> Dict[str, Any]:
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _write_all(self, entries: Dict[str, Any]) -> None:
+        temporary = f"{self.path}.{os.getpid()}.tmp"
+        fd = os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump(entries, f)
+        os.replace(temporary, self.path)
+
+    def read(self, key: str) -> Optional[Dict[str, Any]]:
+        with self.locked():
+            return self._read_all().get(key)
+
+    def write(self, key: str, value: Dict[str, Any]) -> None:
+        with self.locked():
+            entries = self._read_all()
+            entries[key] = value
+            self._write_all(entries)
+
+    def delete(self, key: str) -> None:
+        with self.locked():
+            entries = self._read_all()
+            if entries.pop(key, None) is not None:
+                self._write_all(entries)
+
+    def cached(self, key: str, loader: Callable[[], Any], ttl_in_seconds: float) -> Any:
+        """ returns the stored value of the key if it's younger than the ttl - otherwise loads and stores it (e.g. for OpenID configurations) """
+        with self.locked():
+            entry = self.read(key)
+            if entry and entry.get("stored", 0) + ttl_in_seconds > time.time():
+                return entry["value"]
+            value = loader()
+            if value is not None:
+                self.write(key, {"value": value, "stored": time.time()})
+            return value
+
+    @staticmethod
+    def token_entry(token_response: Dict[str, Any]) -> Dict[str, Any]:
+        """ translates a token response of the IdP into an entry with absolute expiration times """
+        now = time.time()
+        return {
+            "access_token": token_response.get("access_token"),
+            "refresh_token": token_response.get("refresh_token"),
+            "expires_at": now + token_response["expires_in"] if token_response.get("expires_in") else None,
+            "refresh_expires_at": now + token_response["refresh_expires_in"] if token_response.get("refresh_expires_in") else None
+        }
+
+    @staticmethod
+    def is_valid(entry: Optional[Dict[str, Any]], token: str, margin_in_seconds: float = 30) -> bool:
+        """ checks if the given token ("access_token" or "refresh_token") of the entry exists and doesn't expire within the margin """
+        if not entry or not entry.get(token):
+            return False
+        expires_at = entry.get("expires_at" if token == "access_token" else "refresh_expires_at")
+        # Without an expiration time, the token is considered valid until it's rejected
+        return expires_at is None or expires_at > time.time() + margin_in_seconds
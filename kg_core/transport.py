@@ -0,0 +1,207 @@
+#  Copyright 2022 EBRAINS AISBL
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0.
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+#  This open source software code was developed in part or in whole in the
+#  Human Brain Project, funded from the European Union's Horizon 2020
+#  Framework Programme for Research and Innovation under
+#  Specific Grant Agreements No. 720270, No. 785907, and No. 945539
+#  (Human Brain Project SGA1, SGA2 and SGA3).
+#
+
+from __future__ import annotations
+
+import base64
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Type
+from urllib.parse import urlsplit
+
+import requests
+
+# Headers which are never written to a recording
+_SENSITIVE_HEADERS = ("authorization", "client-authorization", "set-cookie", "cookie")
+
+
+class TransportResponse(object):
+    """ The status, headers and body of a response - independent of the HTTP library which has been used """
+
+    def __init__(self, status_code: int, headers: Dict[str, str], content: bytes):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    def json(self) -> Any:
+        """ raises a ValueError if the body is not valid JSON (just as requests does) """
+        return json.loads(self.content)
+
+    def iter_content(self, chunk_size: int = 65536) -> Iterator[bytes]:
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+
+class Transport(ABC):
+    """
+    Sends the requests of the client. "offline" transports don't require any network communication - in this case, the
+    client doesn't contact the KG to resolve its authentication endpoint either. "transient_errors" are the exceptions
+    (e.g. of a dropped connection) after which idempotent operations are retried.
+    """
+    offline = False
+    transient_errors: Tuple[Type[BaseException], ...] = ()
+
+    @abstractmethod
+    def send(self, method: str, url: str, params: Optional[Dict[str, Any]] = None, headers: Optional[Dict[str, str]] = None, json: Optional[Any] = None) -> TransportResponse:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class RequestsTransport(Transport):
+    """ The default transport: every request is sent with requests on its own connection """
+    transient_errors = (requests.exceptions.ConnectionError,)
+
+    def send(self, method: str, url: str, params: Optional[Dict[str, Any]] = None, headers: Optional[Dict[str, str]] = None, json: Optional[Any] = None) -> TransportResponse:
+        r = requests.request(method, url, params=params, headers=headers, json=json, stream=True)
+        return TransportResponse(r.status_code, dict(r.headers), r.content)
+
+
+class Http2Transport(Transport):
+    """
+    An HTTP/2 capable connection pool (based on httpx) which multiplexes concurrent requests over a few connections
+    instead of opening one connection per request. It can be shared by any number of threads.
+
+    HTTP/2 is negotiated via TLS (ALPN) - for plain HTTP endpoints (e.g. a local KG) the pooled connections fall back
+    to HTTP/1.1. Requires httpx with HTTP/2 support to be installed ("pip install ebrains_kg_core[http2]").
+    """
+
+    def __init__(self, max_connections: int = 10, timeout_in_seconds: Optional[float] = None, http2: bool = True):
+        try:
+            import httpx
+        except ImportError:
+            raise ImportError("The HTTP/2 transport requires httpx - please install it with \"pip install ebrains_kg_core[http2]\"")
+        self._client = httpx.Client(http2=http2, limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections), timeout=timeout_in_seconds)
+        self.transient_errors = (httpx.TransportError,)
+
+    def send(self, method: str, url: str, params: Optional[Dict[str, Any]] = None, headers: Optional[Dict[str, str]] = None, json: Optional[Any] = None) -> TransportResponse:
+        # requests skips parameters without value - httpx would send them as empty strings
+        params = {k: v for k, v in params.items() if v is not None} if params else None
+        r = self._client.request(method, url, params=params, headers=headers, json=json)
+        return TransportResponse(r.status_code, dict(r.headers), r.content)
+
+    def close(self) -> None:
+        self._client.close()
+
+
+class DelayedTransport(Transport):
+    """ Adds a fixed latency to every request of the wrapped transport - e.g. to simulate a remote KG while working with a replay """
+
+    def __init__(self, transport: Transport, latency_in_ms: float):
+        self._transport = transport
+        self._latency_in_ms = latency_in_ms
+        self.offline = transport.offline
+        self.transient_errors = transport.transient_errors
+
+    def send(self, method: str, url: str, params: Optional[Dict[str, Any]] = None, headers: Optional[Dict[str, str]] = None, json: Optional[Any] = None) -> TransportResponse:
+        time.sleep(self._latency_in_ms / 1000)
+        return self._transport.send(method, url, params, headers, json)
+
+    def close(self) -> None:
+        self._transport.close()
+
+
+def _json_dumps(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"))
+
+
+def _exchange_key(method: str, url: str, params: Optional[Dict[str, Any]], payload: Optional[Any]) -> str:
+    """ identifies a request independently of the host (and the authentication) - parameters are compared by their string representation as sent over the wire """
+    normalized_params: List[Tuple[str, Any]] = []
+    for k, v in sorted((params or {}).items()):
+        if v is not None:
+            normalized_params.append((k, [str(i) for i in v] if isinstance(v, (list, tuple)) else str(v)))
+    return json.dumps([method.upper(), urlsplit(url).path, normalized_params, payload], sort_keys=True, default=str)
+
+
+class RecordingTransport(Transport):
+    """
+    Records the exchanges of the wrapped transport (by default the RequestsTransport) into a JSON lines file which can
+    be served by the ReplayTransport later on. Authentication headers are not recorded.
+    """
+
+    def __init__(self, path: str, transport: Optional[Transport] = None):
+        self.path = path
+        self._transport = transport or RequestsTransport()
+        self.transient_errors = self._transport.transient_errors
+        self._lock = threading.Lock()
+        self._file = open(path, "a")
+
+    def send(self, method: str, url: str, params: Optional[Dict[str, Any]] = None, headers: Optional[Dict[str, str]] = None, json: Optional[Any] = None) -> TransportResponse:
+        response = self._transport.send(method, url, params, headers, json)
+        try:
+            body, encoding = response.content.decode("utf-8"), "utf-8"
+        except UnicodeDecodeError:
+            body, encoding = base64.b64encode(response.content).decode("ascii"), "base64"
+        exchange = {
+            "key": _exchange_key(method, url, params, json),
+            "status": response.status_code,
+            "headers": {k: v for k, v in response.headers.items() if k.lower() not in _SENSITIVE_HEADERS},
+            "body": body,
+            "encoding": encoding
+        }
+        with self._lock:
+            self._file.write(f"{_json_dumps(exchange)}\n")
+            self._file.flush()
+        return response
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+        self._transport.close()
+
+
+class ReplayTransport(Transport):
+    """
+    Serves the exchanges recorded by a RecordingTransport - without any network communication and at full speed. If
+    the same request has been recorded several times, the responses are served in the recorded order (and the last one
+    is repeated afterwards). Requests which have not been recorded are answered with a 404 - or raise a KeyError if
+    "strict" is set.
+    """
+    offline = True
+
+    def __init__(self, path: str, strict: bool = False):
+        self.path = path
+        self.strict = strict
+        self._lock = threading.Lock()
+        self._exchanges: Dict[str, List[TransportResponse]] = {}
+        self._served: Dict[str, int] = {}
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    exchange = json.loads(line)
+                    content = base64.b64decode(exchange["body"]) if exchange.get("encoding") == "base64" else exchange["body"].encode("utf-8")
+                    self._exchanges.setdefault(exchange["key"], []).append(TransportResponse(exchange["status"], exchange.get("headers") or {}, content))
+
+    def send(self, method: str, url: str, params: Optional[Dict[str, Any]] = None, headers: Optional[Dict[str, str]] = None, json: Optional[Any] = None) -> TransportResponse:
+        key = _exchange_key(method, url, params, json)
+        responses = self._exchanges.get(key)
+        if not responses:
+            if self.strict:
+                raise KeyError(f"No recorded response for {method} {url}")
+            return TransportResponse(404, {"Content-Type": "application/json"}, _json_dumps({"error": {"code": 404, "message": f"No recorded response for {method} {url}"}}).encode("utf-8"))
+        with self._lock:
+            index = self._served.get(key, 0)
+            self._served[key] = index + 1
+        return responses[min(index, len(responses) - 1)]
@@ -0,0 +1,221 @@
+#  Copyright 2022 EBRAINS AISBL
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0.
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+#  This open source software code was developed in part or in whole in the
+#  Human Brain Project, funded from the European Union's Horizon 2020
+#  Framework Programme for Research and Innovation under
+#  Specific Grant Agreements No. 720270, No. 785907, and No. 945539
+#  (Human Brain Project SGA1, SGA2 and SGA3).
+#
+
+from __future__ import annotations
+
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+from uuid import UUID
+
+from kg_core.kg import Client
+from kg_core.request import ExtendedResponseConfiguration, Pagination, Stage
+from kg_core.response import Error, Instance
+
+INCOMING_LINKS = "https://core.kg.ebrains.eu/vocab/meta/incomingLinks"
+
+
+class Link(object):
+
+    def __init__(self, source: UUID, property_name: str, target: UUID):
+        self.source = source
+        self.property_name = property_name
+        self.target = target
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, Link) and (self.source, self.property_name, self.target) == (other.source, other.property_name, other.target)
+
+    def __hash__(self) -> int:
+        return hash((self.source, self.property_name, self.target))
+
+    def __repr__(self) -> str:
+        return f"Link({self.source} -[{self.property_name}]-> {self.target})"
+
+
+class Subgraph(object):
+
+    def __init__(self):
+        self.nodes: Dict[UUID, Instance] = {}
+        self.depths: Dict[UUID, int] = {}
+        self.links: Set[Link] = set()
+        self.errors: Dict[UUID, Error] = {}
+        self.requests = 0
+
+    def outgoing(self, instance_id: UUID) -> List[Link]:
+        return [l for l in self.links if l.source == instance_id]
+
+    def incoming(self, instance_id: UUID) -> List[Link]:
+        return [l for l in self.links if l.target == instance_id]
+
+    def __str__(self):
+        return f"Subgraph with {len(self.nodes)} nodes and {len(self.links)} links ({self.requests} requests)"
+
+
+class GraphTraversal(object):
+    """
+    Explores the graph around one or several start instances - following outgoing links (the references in the documents)
+    and optionally incoming links up to the given depth.
+
+    Instead of one request per hop and instance, the traversal collects the pending instances and fetches them with
+    chunked bulk requests (get_by_ids) which - just as the additional pages of incoming links - are executed concurrently.
+    The number of round trips therefore depends on the depth of the graph rather than on its number of nodes.
+
+    strategy "bfs" expands the pending instances in the order of their discovery (level by level), "dfs" expands the
+    most recently discovered ones first. This makes a difference when the traversal is limited by max_nodes.
+    """
+
+    def __init__(self, client: Client, stage: Stage = Stage.RELEASED, max_depth: int = 2, strategy: str = "bfs", follow_incoming: bool = False,
+                 properties: Optional[Iterable[str]] = None, types: Optional[Iterable[str]] = None, max_nodes: Optional[int] = None,
+                 chunk_size: int = 100, max_workers: int = 8, incoming_links_page_size: int = 100):
+        if strategy not in ("bfs", "dfs"):
+            raise ValueError(f"Unknown traversal strategy {strategy} - use either \"bfs\" or \"dfs\"")
+        self._client = client
+        self._stage = stage
+        self._max_depth = max_depth
+        self._strategy = strategy
+        self._follow_incoming = follow_incoming
+        self._properties = set(properties) if properties is not None else None
+        self._types = set(types) if types is not None else None
+        self._max_nodes = max_nodes
+        self._chunk_size = chunk_size
+        self._max_workers = max_workers
+        self._incoming_links_page_size = incoming_links_page_size
+
+    def _follow(self, property_name: str) -> bool:
+        return self._properties is None or property_name in self._properties
+
+    def _accept(self, instance: Instance) -> bool:
+        if self._types is None:
+            return True
+        types = instance.get("@type", [])
+        return any(t in self._types for t in (types if isinstance(types, list) else [types]))
+
+    def _references(self, value: Any) -> Iterator[UUID]:
+        if isinstance(value, dict):
+            if "@id" in value:
+                reference = self._client.identifiers.to_uuid(value["@id"])
+                if reference:
+                    yield reference
+            else:
+                # embedded documents
+                for v in value.values():
+                    yield from self._references(v)
+        elif isinstance(value, list):
+            for v in value:
+                yield from self._references(v)
+
+    def _outgoing(self, instance: Instance) -> Iterator[Tuple[str, UUID]]:
+        for property_name, value in instance.items():
+            if not property_name.startswith("@") and property_name != INCOMING_LINKS and self._follow(property_name):
+                for reference in self._references(value):
+                    yield property_name, reference
+
+    def _fetch(self, ids: List[UUID]) -> Tuple[Dict[UUID, Instance], Dict[UUID, Error]]:
+        configuration = ExtendedResponseConfiguration(return_incoming_links=self._follow_incoming, incoming_links_page_size=self._incoming_links_page_size if self._follow_incoming else None)
+        result = self._client.instances.get_by_ids([str(i) for i in ids], stage=self._stage, extended_response_configuration=configuration)
+        if result.error:
+            return {}, {i: result.error for i in ids}
+        instances: Dict[UUID, Instance] = {}
+        errors: Dict[UUID, Error] = {}
+        for key, r in (result.data or {}).items():
+            instance_id = self._client.identifiers.to_uuid(key)
+            if instance_id and r.data:
+                instances[instance_id] = r.data
+            elif instance_id and r.error:
+                errors[instance_id] = r.error
+        return instances, errors
+
+    def _incoming_page(self, instance_id: UUID, property_name: str, source_type: str, start: int) -> List[UUID]:
+        result = self._client.instances.get_incoming_links(instance_id, property_name, source_type, stage=self._stage,
+                                                           pagination=Pagination(start=start, size=self._incoming_links_page_size, return_total_results=False))
+        return [i.uuid for i in result.data or [] if i.uuid]
+
+    def _incoming(self, instance_id: UUID, instance: Instance, executor: ThreadPoolExecutor, subgraph: Subgraph) -> Tuple[List[Tuple[str, UUID]], List[Tuple[str, Future]]]:
+        """ returns the incoming links embedded in the instance and the futures of the additional pages of incoming links """
+        incoming_links = instance.get(INCOMING_LINKS) or {}
+        embedded: List[Tuple[str, UUID]] = []
+        additional_pages: List[Tuple[str, Future]] = []
+        for property_name, by_type in incoming_links.items():
+            if not self._follow(property_name) or not isinstance(by_type, dict):
+                continue
+            for source_type, links in by_type.items():
+                data = links.get("data") or []
+                embedded.extend((property_name, r) for r in self._references(data))
+                total = links.get("total") or 0
+                for start in range(len(data), total, self._incoming_links_page_size):
+                    subgraph.requests += 1
+                    additional_pages.append((property_name, executor.submit(self._incoming_page, instance_id, property_name, source_type, start)))
+        return embedded, additional_pages
+
+    def traverse(self, start: Union[UUID, Iterable[UUID]]) -> Subgraph:
+        subgraph = Subgraph()
+        start_ids = [start] if isinstance(start, UUID) else list(start)
+        pending: Deque[Tuple[int, UUID]] = deque((0, i) for i in start_ids)
+        visited: Set[UUID] = set(start_ids)
+        discovered: List[Tuple[UUID, str, UUID, bool]] = []
+        batch_size = self._chunk_size * self._max_workers
+        with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+            while pending and (self._max_nodes is None or len(subgraph.nodes) < self._max_nodes):
+                batch: List[Tuple[int, UUID]] = []
+                while pending and len(batch) < batch_size:
+                    batch.append(pending.popleft() if self._strategy == "bfs" else pending.pop())
+                if self._max_nodes is not None:
+                    batch = batch[:self._max_nodes - len(subgraph.nodes)]
+                depths = {i: d for d, i in batch}
+                ids = [i for _, i in batch]
+                chunks = [ids[c:c + self._chunk_size] for c in range(0, len(ids), self._chunk_size)]
+                subgraph.requests += len(chunks)
+                next_level: List[Tuple[int, UUID]] = []
+
+                def discover(instance_id: UUID, depth: int, property_name: str, neighbor: UUID, outgoing: bool) -> None:
+                    discovered.append((instance_id, property_name, neighbor, outgoing))
+                    if neighbor not in visited:
+                        visited.add(neighbor)
+                        next_level.append((depth + 1, neighbor))
+
+                additional_pages: List[Tuple[UUID, int, str, Future]] = []
+                for instances, errors in executor.map(self._fetch, chunks):
+                    subgraph.errors.update(errors)
+                    for instance_id, instance in instances.items():
+                        if not self._accept(instance):
+                            continue
+                        depth = depths[instance_id]
+                        subgraph.nodes[instance_id] = instance
+                        subgraph.depths[instance_id] = depth
+                        if depth >= self._max_depth:
+                            continue
+                        for property_name, neighbor in self._outgoing(instance):
+                            discover(instance_id, depth, property_name, neighbor, True)
+                        if self._follow_incoming:
+                            embedded, pages = self._incoming(instance_id, instance, executor, subgraph)
+                            for property_name, neighbor in embedded:
+                                discover(instance_id, depth, property_name, neighbor, False)
+                            additional_pages.extend((instance_id, depth, property_name, page) for property_name, page in pages)
+                # The additional pages of incoming links of the whole batch have been requested concurrently - we now collect them.
+                for instance_id, depth, property_name, page in additional_pages:
+                    for neighbor in page.result():
+                        discover(instance_id, depth, property_name, neighbor, False)
+                pending.extend(next_level)
+        for instance_id, property_name, neighbor, outgoing in discovered:
+            # We only keep the links between nodes which are part of the subgraph (e.g. not filtered by type or beyond the maximal depth)
+            if neighbor in subgraph.nodes:
+                subgraph.links.add(Link(instance_id, property_name, neighbor) if outgoing else Link(neighbor, property_name, instance_id))
+        return subgraph
@@ -0,0 +1,210 @@
+#  Copyright 2022 EBRAINS AISBL
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0.
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+#  This open source software code was developed in part or in whole in the
+#  Human Brain Project, funded from the European Union's Horizon 2020
+#  Framework Programme for Research and Innovation under
+#  Specific Grant Agreements No. 720270, No. 785907, and No. 945539
+#  (Human Brain Project SGA1, SGA2 and SGA3).
+#
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from kg_core.jsonld import JsonLdNormalizer, UnsupportedJsonLd
+from kg_core.kg import Client
+from kg_core.request import ExtendedResponseConfiguration, Stage
+from kg_core.response import Error
+
+# Properties managed by the KG itself - they are never compared nor removed
+KG_VOCAB = "https://core.kg.ebrains.eu/vocab/"
+
+
+def canonical(value: Any) -> Optional[str]:
+    """
+    A canonical representation of a normalized JSON-LD value: arrays (except for @list) are compared as sets, a single
+    value is equivalent to an array containing it, plain value objects are equivalent to their literal and null is
+    equivalent to an empty array (both mean "no value"). Numbers are compared by value (1 is equivalent to 1.0).
+    """
+    if value is None:
+        return None
+    if isinstance(value, list):
+        items = [c for c in (canonical(v) for v in value) if c is not None]
+        if not items:
+            return None
+        return items[0] if len(items) == 1 else f"[{','.join(sorted(items))}]"
+    if isinstance(value, dict):
+        if set(value) == {"@value"}:
+            return canonical(value["@value"])
+        if set(value) == {"@list"}:
+            return f"{{\"@list\":[{','.join(canonical(v) or 'null' for v in value['@list'] or [])}]}}"
+        properties = [f"{json.dumps(k)}:{c}" for k, c in sorted((k, canonical(v)) for k, v in value.items()) if c is not None]
+        return f"{{{','.join(properties)}}}"
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return json.dumps(value)
+
+
+def diff(current: Dict[str, Any], payload: Dict[str, Any], remove_missing_properties: bool = False) -> Dict[str, Any]:
+    """
+    The minimal patch (for a partial replacement) which turns the current document into the normalized payload - empty
+    if they are canonically equal. Properties which are not part of the payload are only removed (set to null) if
+    "remove_missing_properties" is set - note that the current document also contains the contributions of others.
+    """
+    patch: Dict[str, Any] = {}
+    for key, value in payload.items():
+        if key == "@id" or key.startswith(KG_VOCAB):
+            continue
+        if canonical(value) != canonical(current.get(key)):
+            patch[key] = value
+    if remove_missing_properties:
+        for key, value in current.items():
+            if not key.startswith("@") and not key.startswith(KG_VOCAB) and key not in payload and canonical(value) is not None:
+                patch[key] = None
+    return patch
+
+
+class UpsertReport(object):
+
+    def __init__(self):
+        self.created = 0
+        self.patched = 0
+        self.replaced = 0
+        self.skipped = 0
+        self.failed = 0
+        self.patched_properties = 0
+        self.errors: Dict[UUID, Error] = {}
+        self.duration_in_ms = 0
+        self._lock = threading.Lock()
+
+    def _count(self, outcome: str, instance_id: UUID, error: Optional[Error] = None, properties: int = 0) -> None:
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+            self.patched_properties += properties
+            if error:
+                self.errors[instance_id] = error
+
+    def __str__(self):
+        return f"Upsert: {self.created} created, {self.patched} patched ({self.patched_properties} properties), {self.replaced} replaced, {self.skipped} skipped, {self.failed} failed ({self.duration_in_ms}ms)"
+
+
+class DiffAwareUpsert(object):
+    """
+    Writes records (pairs of instance id and JSON-LD payload) to a space, but only touches the KG for the records which
+    actually changed - so unchanged records don't trigger any event processing on the server:
+
+    - the current documents are fetched in bulk (get_by_ids of the IN_PROGRESS stage in chunks of "chunk_size" - always
+      from the KG, bypassing the instance cache of the client, since a stale document would skip a needed write) or
+      provided by "current_documents" (e.g. reading from an InstanceMirror)
+    - the payloads are normalized locally and compared canonically with the current documents
+    - unchanged records are skipped, changed ones are patched with their changed properties only and missing ones are
+      created. Payloads the local normalizer can't handle are sent as full replacement.
+
+    The writes of a chunk are sent by "max_workers" threads. A record which can't be written (e.g. an invalid payload or
+    a failed request) is counted as failed with its error - the others are written anyway. With "dry_run", nothing is
+    written but the report tells what would have happened.
+    """
+
+    def __init__(self, client: Client, space: str, normalizer: Optional[JsonLdNormalizer] = None, chunk_size: int = 200, max_workers: int = 4,
+                 remove_missing_properties: bool = False, current_documents: Optional[Callable[[List[UUID]], Dict[UUID, Dict[str, Any]]]] = None, dry_run: bool = False):
+        self._client = client
+        self._space = space
+        self._normalizer = normalizer or JsonLdNormalizer()
+        self._chunk_size = chunk_size
+        self._max_workers = max_workers
+        self._remove_missing_properties = remove_missing_properties
+        self._current_documents = current_documents
+        self._dry_run = dry_run
+        self._write_configuration = ExtendedResponseConfiguration(return_payload=False)
+
+    def _fetch(self, ids: List[UUID]) -> Tuple[Dict[UUID, Dict[str, Any]], Dict[UUID, Error]]:
+        if self._current_documents:
+            return self._current_documents(ids), {}
+        cache = self._client.instances._kg_config.instance_cache
+        with cache.bypassed() if cache else nullcontext():
+            result = self._client.instances.get_by_ids([str(i) for i in ids], stage=Stage.IN_PROGRESS, extended_response_configuration=ExtendedResponseConfiguration(return_payload=True))
+        if result.error:
+            return {}, {i: result.error for i in ids}
+        documents: Dict[UUID, Dict[str, Any]] = {}
+        errors: Dict[UUID, Error] = {}
+        for key, r in (result.data or {}).items():
+            instance_id = self._client.identifiers.to_uuid(key)
+            if instance_id and r.data is not None:
+                documents[instance_id] = r.data
+            elif instance_id and r.error and r.error.code != 404:
+                errors[instance_id] = r.error
+        return documents, errors
+
+    def _write(self, instance_id: UUID, payload: Dict[str, Any], current: Optional[Dict[str, Any]], report: UpsertReport) -> None:
+        try:
+            normalized = self._normalizer.normalize(payload)
+        except UnsupportedJsonLd:
+            normalized = None
+        except ValueError as e:
+            report._count("failed", instance_id, Error(code=0, message=f"The payload is not valid JSON-LD: {e}"))
+            return
+        if current is None:
+            outcome, properties = "created", 0
+            write = lambda: self._client.instances.create_new_with_id(normalized if normalized is not None else payload, instance_id, self._space, self._write_configuration)
+        elif normalized is None:
+            outcome, properties = "replaced", 0
+            write = lambda: self._client.instances.contribute_to_full_replacement(payload, instance_id, self._write_configuration)
+        else:
+            patch = diff(current, normalized, self._remove_missing_properties)
+            if not patch:
+                report._count("skipped", instance_id)
+                return
+            outcome, properties = "patched", len(patch)
+            write = lambda: self._client.instances.contribute_to_partial_replacement(patch, instance_id, self._write_configuration)
+        try:
+            error = None if self._dry_run else write().error
+        except Exception as e:
+            error = Error(code=0, message=str(e))
+        report._count("failed" if error else outcome, instance_id, error, 0 if error else properties)
+
+    def upsert(self, records: Iterable[Tuple[UUID, Dict[str, Any]]]) -> UpsertReport:
+        start = time.time()
+        report = UpsertReport()
+        chunk: List[Tuple[UUID, Dict[str, Any]]] = []
+        with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+            for record in records:
+                chunk.append(record)
+                if len(chunk) >= self._chunk_size:
+                    self._upsert_chunk(chunk, report, executor)
+                    chunk = []
+            if chunk:
+                self._upsert_chunk(chunk, report, executor)
+        report.duration_in_ms = int((time.time() - start) * 1000)
+        return report
+
+    def _upsert_chunk(self, chunk: List[Tuple[UUID, Dict[str, Any]]], report: UpsertReport, executor: ThreadPoolExecutor) -> None:
+        try:
+            current, errors = self._fetch([instance_id for instance_id, _ in chunk])
+        except Exception as e:
+            current, errors = {}, {instance_id: Error(code=0, message=str(e)) for instance_id, _ in chunk}
+        writes = []
+        for instance_id, payload in chunk:
+            if instance_id in errors:
+                report._count("failed", instance_id, errors[instance_id])
+            else:
+                writes.append(executor.submit(self._write, instance_id, payload, current.get(instance_id), report))
+        for w in writes:
+            w.result()
@@ -0,0 +1,222 @@
+#  Copyright 2022 EBRAINS AISBL
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0.
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+#  This open source software code was developed in part or in whole in the
+#  Human Brain Project, funded from the European Union's Horizon 2020
+#  Framework Programme for Research and Innovation under
+#  Specific Grant Agreements No. 720270, No. 785907, and No. 945539
+#  (Human Brain Project SGA1, SGA2 and SGA3).
+#
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple, Union
+from uuid import UUID
+
+from kg_core.kg import Client
+from kg_core.request import ExtendedResponseConfiguration
+from kg_core.response import Error, Result
+
+PARTIAL_REPLACEMENT = "contribute_to_partial_replacement"
+FULL_REPLACEMENT = "contribute_to_full_replacement"
+MOVE = "move"
+RELEASE = "release"
+UNRELEASE = "unrelease"
+DELETE = "delete"
+
+
+class PendingWrite(object):
+    """ A buffered mutation of an instance - the future resolves to the return value of the corresponding client method """
+
+    def __init__(self, instance_id: UUID, operation: str, payload: Optional[Dict[str, Any]] = None, argument: Optional[str] = None):
+        self.instance_id = instance_id
+        self.operation = operation
+        self.payload = payload
+        self.argument = argument
+        self.merged = 0
+        self.future: Future = Future()
+
+    def merge(self, other: PendingWrite) -> bool:
+        """ merges a following partial replacement into this write (if possible) - the properties of the later one win """
+        if other.operation != PARTIAL_REPLACEMENT or self.operation not in (PARTIAL_REPLACEMENT, FULL_REPLACEMENT):
+            return False
+        self.payload = {**(self.payload or {}), **(other.payload or {})}
+        self.merged += 1
+        return True
+
+    def __str__(self):
+        return f"{self.operation} of {self.instance_id}{f' ({self.merged} merged)' if self.merged else ''}"
+
+
+class WriteBehindBuffer(object):
+    """
+    Queues mutations of instances and sends them in the background, so the caller (e.g. the UI thread of a curation
+    tool) doesn't wait for the round trips. The buffer
+
+    - keeps the order of the writes per instance (only one write per instance is in flight at a time) while writes to
+      different instances are sent concurrently by up to "max_workers" threads
+    - merges a partial replacement into the preceding queued partial (or full) replacement of the same instance -
+      writes are held back for "linger_in_seconds" to give successive updates the chance to be merged
+    - reports failed writes to "on_error" (with the write and either the error of the KG or the raised exception).
+      Failed writes don't stop the following writes of the same instance.
+
+    Every mutation returns a future of the result of the corresponding client method. Use flush() to wait for all
+    queued writes - or the buffer as a context manager which flushes and closes it at the end. Note that reads
+    through the client don't see the writes which are still buffered.
+    """
+
+    def __init__(self, client: Client, max_workers: int = 4, linger_in_seconds: float = 0.05,
+                 on_error: Optional[Callable[[PendingWrite, Union[Error, Exception]], None]] = None):
+        self._client = client
+        self._max_workers = max_workers
+        self._linger_in_seconds = linger_in_seconds
+        self._on_error = on_error
+        self._queues: Dict[UUID, Deque[PendingWrite]] = {}
+        self._ready: Deque[Tuple[float, UUID]] = deque()
+        self._in_flight: Set[UUID] = set()
+        self._condition = threading.Condition()
+        self._flushing = 0
+        self._closed = False
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="kg-write-behind")
+        self._write_configuration = ExtendedResponseConfiguration(return_payload=False)
+        self.sent = 0
+        self.merged = 0
+        self.failed: List[Tuple[PendingWrite, Union[Error, Exception]]] = []
+        self._dispatcher = threading.Thread(target=self._dispatch, name="kg-write-behind-dispatcher", daemon=True)
+        self._dispatcher.start()
+
+    def _enqueue(self, write: PendingWrite) -> Future:
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("The write-behind buffer is closed")
+            queue = self._queues.get(write.instance_id)
+            if queue is None:
+                queue = self._queues[write.instance_id] = deque()
+            if queue and queue[-1].merge(write):
+                self.merged += 1
+                return queue[-1].future
+            queue.append(write)
+            if len(queue) == 1 and write.instance_id not in self._in_flight:
+                self._ready.append((time.monotonic() + self._linger_in_seconds, write.instance_id))
+                self._condition.notify_all()
+            return write.future
+
+    def contribute_to_partial_replacement(self, payload: dict, instance_id: UUID) -> Future:
+        return self._enqueue(PendingWrite(instance_id, PARTIAL_REPLACEMENT, dict(payload)))
+
+    def contribute_to_full_replacement(self, payload: dict, instance_id: UUID) -> Future:
+        return self._enqueue(PendingWrite(instance_id, FULL_REPLACEMENT, dict(payload)))
+
+    def move(self, instance_id: UUID, space: str) -> Future:
+        return self._enqueue(PendingWrite(instance_id, MOVE, argument=space))
+
+    def release(self, instance_id: UUID, revision: Optional[str] = None) -> Future:
+        return self._enqueue(PendingWrite(instance_id, RELEASE, argument=revision))
+
+    def unrelease(self, instance_id: UUID) -> Future:
+        return self._enqueue(PendingWrite(instance_id, UNRELEASE))
+
+    def delete(self, instance_id: UUID) -> Future:
+        return self._enqueue(PendingWrite(instance_id, DELETE))
+
+    def _send(self, write: PendingWrite) -> Any:
+        instances = self._client.instances
+        if write.operation == PARTIAL_REPLACEMENT:
+            return instances.contribute_to_partial_replacement(write.payload or {}, write.instance_id, self._write_configuration)
+        elif write.operation == FULL_REPLACEMENT:
+            return instances.contribute_to_full_replacement(write.payload or {}, write.instance_id, self._write_configuration)
+        elif write.operation == MOVE:
+            return instances.move(write.instance_id, write.argument, self._write_configuration)
+        elif write.operation == RELEASE:
+            return instances.release(write.instance_id, write.argument)
+        elif write.operation == UNRELEASE:
+            return instances.unrelease(write.instance_id)
+        return instances.delete(write.instance_id)
+
+    def _execute(self, write: PendingWrite) -> None:
+        failure: Optional[Union[Error, Exception]] = None
+        try:
+            result = self._send(write)
+            failure = result.error if isinstance(result, Result) else result
+            write.future.set_result(result)
+        except Exception as e:
+            failure = e
+            write.future.set_exception(e)
+        if failure is not None:
+            if self._on_error:
+                try:
+                    self._on_error(write, failure)
+                except Exception:
+                    pass
+        with self._condition:
+            self.sent += 1
+            if failure is not None:
+                self.failed.append((write, failure))
+            self._in_flight.discard(write.instance_id)
+            queue = self._queues.get(write.instance_id)
+            if queue:
+                # The following write of the instance has already waited for this one - no need to linger again
+                self._ready.append((time.monotonic(), write.instance_id))
+            else:
+                self._queues.pop(write.instance_id, None)
+            self._condition.notify_all()
+
+    def _dispatch(self) -> None:
+        with self._condition:
+            while True:
+                if self._closed and not self._queues and not self._in_flight:
+                    return
+                timeout = None
+                if self._ready and len(self._in_flight) < self._max_workers:
+                    due, instance_id = self._ready[0]
+                    timeout = due - time.monotonic()
+                    if timeout <= 0 or self._flushing or self._closed:
+                        self._ready.popleft()
+                        self._in_flight.add(instance_id)
+                        write = self._queues[instance_id].popleft()
+                        self._executor.submit(self._execute, write)
+                        continue
+                self._condition.wait(timeout)
+
+    def _is_idle(self) -> bool:
+        return not self._queues and not self._in_flight
+
+    def flush(self, timeout_in_seconds: Optional[float] = None) -> bool:
+        """ sends all queued writes immediately and waits for them - returns False if they are not done within the timeout """
+        with self._condition:
+            self._flushing += 1
+            self._condition.notify_all()
+            try:
+                return self._condition.wait_for(self._is_idle, timeout_in_seconds)
+            finally:
+                self._flushing -= 1
+
+    def close(self) -> None:
+        """ flushes the buffer and stops the background threads - no writes are accepted anymore """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self.flush()
+        self._dispatcher.join()
+        self._executor.shutdown()
+
+    def __enter__(self) -> WriteBehindBuffer:
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
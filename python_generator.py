@@ -20,7 +20,8 @@
 #
 
 import json
-from typing import Any, Dict, List, Optional
+import keyword
+from typing import Any, Dict, List, Optional, Tuple
 
 import requests
 import re
@@ -41,6 +42,34 @@ class PythonClientGenerator(ClientGenerator):
         "property": "property_name"
     }
     target = "kg_core/kg.py"
+    operations_target = "kg_core/operations.py"
+    models_target = "kg_core/models.py"
+    # The semantics of an operation are read from the vendor extensions "x-safe" / "x-idempotent" of its OpenAPI
+    # definition. Without them, they follow the HTTP method (GET is safe, PUT and DELETE are idempotent) - except for the
+    # operations listed here (by method and path) and the modifying operations of the "non_idempotent_categories"
+    operation_semantics: Dict[Tuple[str, str], Dict[str, bool]] = {
+        # POST operations which only read (bulk reads, queries, normalization)
+        ("POST", "instancesByIds"): {"safe": True, "idempotent": True},
+        ("POST", "instancesByIdentifiers"): {"safe": True, "idempotent": True},
+        ("POST", "instancesByIds/release/status"): {"safe": True, "idempotent": True},
+        ("POST", "instances/{instance_id}/suggestedLinksForProperty"): {"safe": True, "idempotent": True},
+        ("POST", "jsonld/normalizedPayload"): {"safe": True, "idempotent": True},
+        ("POST", "queries"): {"safe": True, "idempotent": True},
+        ("POST", "typesByName"): {"safe": True, "idempotent": True},
+        ("POST", "users/pictures"): {"safe": True, "idempotent": True},
+        # Operations triggering processing on the server - executing them again (e.g. after a gateway timeout) does the work twice
+        ("PUT", "spaces/{space}/eventHistory"): {"safe": False, "idempotent": False},
+        ("POST", "spaces/{space}/inference"): {"safe": False, "idempotent": False},
+        ("PUT", "instances/{instance_id}/invitationScope"): {"safe": False, "idempotent": False},
+    }
+    # Categories whose modifying operations are never considered idempotent (and therefore never retried)
+    non_idempotent_categories = ("admin",)
+    # Categories whose responses depend on the calling user
+    user_specific_categories = ("users", "admin")
+    # Component schemas of response envelopes - they are represented by Result, ResultsById and ResultPage
+    envelope_schema_prefixes = ("Result", "PaginatedResult", "PaginatedStreamResult", "TermsOfUseResult")
+    # Component schemas of free-form JSON-LD documents - they are rendered as JsonLdRecord
+    jsonld_schemas = ("NormalizedJsonLd", "JsonLdDoc")
 
     def __init__(self, kg_root:str, open_api_spec_subpath:str, id_namespace:str, default_client_id_for_device_flow:str):
         super(PythonClientGenerator, self).__init__(kg_root, open_api_spec_subpath, id_namespace)
@@ -52,6 +81,8 @@ class PythonClientGenerator(ClientGenerator):
             autoescape=select_autoescape()
         )
         template = env.get_template("kg.py.j2")
+        operations_template = env.get_template("operations.py.j2")
+        models_template = env.get_template("models.py.j2")
         api_version = None
 
         all_specs: List[Dict[str, Dict[str, Any]]] = []
@@ -130,9 +161,12 @@ class PythonClientGenerator(ClientGenerator):
                         if len(generics) > 0:
                             generic_response_type = generics[0]
 
+                    safe, idempotent = self._semantics(category, operation, self._translate_path(relative_path, path_parameters), definition)
                     method: Dict[str, Any] = {"operation": operation, "summary": definition["summary"] if "summary" in definition else None, "has_payload": "requestBody" in definition and definition["requestBody"],
                               "path": {"name": self._translate_path(relative_path, path_parameters), "has_path_params": len(path_parameters) > 0}, "name": method_name,
-                              "parameters": method_parameters, "query_parameters": query_parameters, "dynamic_parameters": dynamic_parameters, "response_type": response_type, "generic_response_type": generic_response_type}
+                              "parameters": method_parameters, "query_parameters": query_parameters, "dynamic_parameters": dynamic_parameters, "response_type": response_type, "generic_response_type": generic_response_type,
+                              "safe": safe, "idempotent": idempotent, "cacheable": safe and category not in self.user_specific_categories,
+                              "paginated": any(p["name"] == "pagination" for p in method_parameters), "bulk": self._is_bulk_payload(definition.get("requestBody"))}
                     methods_by_category[category].append(method)
                     print(f"Operation: {operation}, Path: {relative_path}")
             # Todo sort by operationId
@@ -140,8 +174,11 @@ class PythonClientGenerator(ClientGenerator):
                 methods.sort(key=lambda m: m['name'])
         with open(self.target, "w") as file:
             file.write(template.render(default_kg_root=self.default_kg_root, methods_by_category=sorted(methods_by_category.items()), api_version=api_version, id_namespace=self.id_namespace, default_client_id_for_device_flow=self.default_client_id_for_device_flow))
+        with open(self.operations_target, "w") as file:
+            file.write(operations_template.render(methods_by_category=sorted(methods_by_category.items())))
+        with open(self.models_target, "w") as file:
+            file.write(models_template.render(models=self._models(all_schemas)))
         print(json.dumps(paths_by_categories, indent=4))
-        print(json.dumps(all_schemas, indent=4))
 
     def _to_snake_case(self, input: str) -> str:
         if input in self.keyword_translations:
@@ -215,6 +252,59 @@ class PythonClientGenerator(ClientGenerator):
             sort = 0
         return f"{sort} {input_['name']}"
 
+    def _semantics(self, category: str, operation: str, path: str, definition: Dict[str, Any]) -> Tuple[bool, bool]:
+        """ whether the operation is safe and whether it is idempotent """
+        semantics = self.operation_semantics.get((operation.upper(), path), {})
+        safe = definition.get("x-safe", semantics.get("safe", operation == "get"))
+        idempotent = operation in ("put", "delete") and category not in self.non_idempotent_categories
+        idempotent = definition.get("x-idempotent", semantics.get("idempotent", safe or idempotent))
+        return bool(safe), bool(idempotent)
+
+    def _is_bulk_payload(self, request_body: Optional[Dict[str, Any]]) -> bool:
+        for content in ((request_body or {}).get("content") or {}).values():
+            if content and (content.get("schema") or {}).get("type") == "array":
+                return True
+        return False
+
+    def _attribute_name(self, key: str) -> str:
+        name = self._to_snake_case(re.split("[/#]", key.lstrip("@"))[-1])
+        name = re.sub("[^a-z0-9_]", "_", name)
+        return f"{name}_" if keyword.iskeyword(name) or not name or name[0].isdigit() else name
+
+    def _models(self, all_schemas: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+        models: List[Dict[str, Any]] = []
+        for name, schema in sorted(all_schemas.items()):
+            if name.startswith(self.envelope_schema_prefixes):
+                continue
+            if name in self.jsonld_schemas:
+                models.append({"name": name, "jsonld": True, "fields": []})
+                continue
+            properties: Dict[str, Dict[str, Any]] = schema.get("properties") or {}
+            if not properties:
+                # Enums and free-form maps stay plain values / dicts
+                continue
+            fields: List[Dict[str, Any]] = []
+            attributes: List[str] = []
+            for key, definition in properties.items():
+                attribute = self._attribute_name(key)
+                while attribute in attributes:
+                    attribute = f"{attribute}_"
+                attributes.append(attribute)
+                is_list = definition.get("type") == "array"
+                reference: Optional[str] = (definition.get("items") or {}).get("$ref") if is_list else definition.get("$ref")
+                model = reference.split("/")[-1] if reference else None
+                if model and (model not in all_schemas or not (all_schemas[model].get("properties") or model in self.jsonld_schemas)):
+                    model = None
+                if model:
+                    type_ = f"List[{model}]" if is_list else model
+                else:
+                    type_ = self._find_type(definition.get("type"), definition.get("items"), definition.get("format"), True, None, definition.get("enum")) or "Any"
+                    if type_.startswith("Stage") or type_ == "ReleaseTreeScope":
+                        type_ = "str"
+                fields.append({"attribute": attribute, "key": key, "type": f"Optional[{type_}]", "model": model, "is_list": is_list, "uuid": definition.get("format") == "uuid"})
+            models.append({"name": name, "jsonld": False, "fields": fields, "description": schema.get("description")})
+        return models
+
     def _response_type(self, responses: Dict[str, Dict[str, Any]]) -> Optional[str]:
         response_reference = None
         if "200" in responses and responses["200"]:
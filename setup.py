@@ -49,6 +49,11 @@ setup(
         'kg_core': ['py.typed'],
     },
     install_requires=['requests', 'pydantic'],
+    extras_require={
+        'arrow': ['pyarrow'],
+        'pandas': ['pandas'],
+        'http2': ['httpx[http2]']
+    },
     author='EBRAINS',
     scripts=[],
     author_email = 'kg@ebrains.eu',